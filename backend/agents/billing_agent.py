@@ -1,52 +1,128 @@
 """Billing Support Agent - Hybrid RAG/CAG."""
-from typing import Dict, Any, List, Optional
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+import asyncio
+from typing import Dict, Any, List, AsyncIterator, Optional, Tuple
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.documents import Document
 from llm_providers import get_generator_llm
-from vector_store import search_documents
+from vector_store import (
+    asearch_documents,
+    asearch_documents_batch,
+    get_kb_version,
+    search_documents,
+    search_documents_batch,
+)
+from metrics import span
+from agents.context_builder import build_context, build_static_context
+from agents.prompt_prefix import register_prompt_prefix
+from agents.cag_cache import CAGContext, get_cag_cache
+from session_store import history_to_messages
 
 
 class BillingAgent:
     """Agent for handling billing questions using Hybrid RAG/CAG."""
     
+    POLICY_QUERY = "billing policy pricing subscription invoice payment terms"
+    POLICY_K = 10
+    DYNAMIC_K = 3
+    
+    # Bump when the system prompt template changes
+    PROMPT_VERSION = "2"
+    
     def __init__(self):
         self.llm = get_generator_llm()
+        self.chain = self._build_chain()
         self.collection_name = f"{self._get_collection_name()}_billing"
-        self.cached_policy: Optional[str] = None
-        self._initial_rag_done = False
+        self.prefix_hash = ""
+        self.cag_cache = get_cag_cache()
+        self.cag_cache.register("billing", self._load_policy)
     
     def _get_collection_name(self) -> str:
         """Get the base collection name from settings."""
         from config import settings
         return settings.chroma_collection_name
     
-    def _initial_rag_retrieval(self) -> str:
-        """Perform initial RAG to cache static policy information."""
-        if self._initial_rag_done and self.cached_policy:
-            return self.cached_policy
-        
+    def _load_policy(self) -> Tuple[str, List[Document]]:
+        """Perform the initial RAG for the static policy (the CAG cache's loader)."""
         # Retrieve billing policies and pricing information
         policy_docs = search_documents(
-            query="billing policy pricing subscription invoice payment terms",
+            query=self.POLICY_QUERY,
             collection_name=self.collection_name,
-            k=10
+            k=self.POLICY_K
         )
         
+        return self._format_policy(policy_docs)
+    
+    def _format_policy(self, policy_docs: List[Document]) -> Tuple[str, List[Document]]:
+        """Pack retrieved policy documents into the static context."""
+        policy_docs = build_static_context(policy_docs)
         cached_content = "\n\n".join([
             f"Document {i+1}:\n{doc.page_content}" 
             for i, doc in enumerate(policy_docs)
         ])
         
-        self.cached_policy = cached_content if cached_content else "No billing policy found."
-        self._initial_rag_done = True
+        cached_policy = cached_content if cached_content else "No billing policy found."
+        self.prefix_hash = register_prompt_prefix(
+            "billing", self.PROMPT_VERSION, self.prompt, static_context=cached_policy
+        )
         
-        return self.cached_policy
+        return cached_policy, policy_docs
     
-    def _retrieve_dynamic_context(self, question: str, k: int = 3) -> str:
+    def _retrieve_dynamic_context(self, question: str, policy: CAGContext, k: int = DYNAMIC_K) -> str:
         """Retrieve dynamic context relevant to the specific question."""
         docs = search_documents(question, self.collection_name, k=k)
+        with span("prompt_assembly"):
+            return self._format_dynamic_context(docs, policy)
+    
+    async def _aretrieve_dynamic_context(self, question: str, policy: CAGContext, k: int = DYNAMIC_K) -> str:
+        """Retrieve dynamic context asynchronously."""
+        docs = await asearch_documents(question, self.collection_name, k=k)
+        with span("prompt_assembly"):
+            return self._format_dynamic_context(docs, policy)
+    
+    def _retrieve_contexts(self, question: str) -> Tuple[str, str]:
+        """Get the static policy and the dynamic context for a question.
+        
+        The policy normally comes preloaded from the CAG cache. If it is not
+        loaded yet, both lookups go out as one batched search instead of two
+        separate embedding and search round trips.
+        """
+        policy = self.cag_cache.peek("billing")
+        if policy is not None:
+            return policy.text, self._retrieve_dynamic_context(question, policy)
+        
+        kb_version = get_kb_version()
+        policy_docs, docs = search_documents_batch(
+            [self.POLICY_QUERY, question],
+            self.collection_name,
+            k=[self.POLICY_K, self.DYNAMIC_K]
+        )
+        policy = self.cag_cache.put("billing", *self._format_policy(policy_docs), kb_version)
+        with span("prompt_assembly"):
+            return policy.text, self._format_dynamic_context(docs, policy)
+    
+    async def _aretrieve_contexts(self, question: str) -> Tuple[str, str]:
+        """Get the static policy and the dynamic context for a question asynchronously."""
+        policy = self.cag_cache.peek("billing")
+        if policy is not None:
+            return policy.text, await self._aretrieve_dynamic_context(question, policy)
         
+        kb_version = get_kb_version()
+        policy_docs, docs = await asearch_documents_batch(
+            [self.POLICY_QUERY, question],
+            self.collection_name,
+            k=[self.POLICY_K, self.DYNAMIC_K]
+        )
+        policy = self.cag_cache.put("billing", *self._format_policy(policy_docs), kb_version)
+        with span("prompt_assembly"):
+            return policy.text, self._format_dynamic_context(docs, policy)
+    
+    def _format_dynamic_context(self, docs: List[Document], policy: CAGContext) -> str:
+        """Format dynamically retrieved documents into a context block.
+        
+        Chunks already in the cached policy are left out.
+        """
+        docs = build_context(docs, exclude=policy.documents)
         if not docs:
             return ""
         
@@ -58,7 +134,11 @@ class BillingAgent:
         return context
     
     def _create_prompt(self) -> ChatPromptTemplate:
-        """Create the prompt template for billing agent."""
+        """Create the prompt template for billing agent.
+        
+        The cached policy is part of the system message, so the long invariant
+        prefix is identical across requests and only the tail varies.
+        """
         return ChatPromptTemplate.from_messages([
             ("system", """You are a Billing Support specialist for a customer service system.
 Your role is to help customers with billing, invoicing, pricing, and payment questions.
@@ -69,11 +149,12 @@ subscription terms, and payment policies. The dynamic context may contain specif
 invoice details or recent updates.
 
 Be precise with numbers, dates, and payment terms. If you cannot find the answer, 
-suggest contacting the billing department directly."""),
-            ("human", """Cached Billing Policy (Static):
-{static_context}
+suggest contacting the billing department directly.
 
-Dynamic Context (if available):
+Cached Billing Policy (Static):
+{static_context}"""),
+            MessagesPlaceholder("history", optional=True),
+            ("human", """Dynamic Context (if available):
 {dynamic_context}
 
 User Question: {question}
@@ -81,28 +162,81 @@ User Question: {question}
 Please provide a helpful billing response based on the information above.""")
         ])
     
-    def process(self, question: str, chat_history: List[Dict[str, str]] = None) -> str:
-        """Process a billing question using Hybrid RAG/CAG."""
-        # Get cached static policy (CAG - from initial RAG)
-        static_context = self._initial_rag_retrieval()
+    def _build_chain(self):
+        """Build the generation chain for this agent (called once, in __init__)."""
+        self.prompt = self._create_prompt()
         
-        # Retrieve dynamic context for specific question (RAG)
-        dynamic_context = self._retrieve_dynamic_context(question)
+        return self.prompt | self.llm | StrOutputParser()
+    
+    def retrieve(self, question: str) -> Tuple[str, str]:
+        """The retrieval step on its own, so it can run speculatively during routing."""
+        return self._retrieve_contexts(question)
+    
+    async def aretrieve(self, question: str) -> Tuple[str, str]:
+        """The retrieval step on its own, asynchronously."""
+        return await self._aretrieve_contexts(question)
+    
+    async def aretrieve_batch(self, questions: List[str]) -> List[Tuple[str, str]]:
+        """The retrieval step for many questions, with one batched embedding and search."""
+        policy = self.cag_cache.peek("billing")
+        if policy is None:
+            policy = await asyncio.to_thread(self.cag_cache.get, "billing")
         
-        prompt = self._create_prompt()
+        results = await asearch_documents_batch(questions, self.collection_name, k=self.DYNAMIC_K)
+        with span("prompt_assembly"):
+            return [(policy.text, self._format_dynamic_context(docs, policy)) for docs in results]
+    
+    def process(
+        self,
+        question: str,
+        chat_history: List[Dict[str, str]] = None,
+        retrieved: Optional[Tuple[str, str]] = None
+    ) -> str:
+        """Process a billing question using Hybrid RAG/CAG.
         
-        chain = (
-            RunnablePassthrough()
-            | prompt
-            | self.llm
-            | StrOutputParser()
-        )
+        retrieved is the result of retrieve() if it already ran for this question.
+        """
+        # Cached static policy (CAG - from initial RAG) plus dynamic context for
+        # the specific question (RAG)
+        static_context, dynamic_context = self._retrieve_contexts(question) if retrieved is None else retrieved
         
-        result = chain.invoke({
-            "static_context": static_context,
-            "dynamic_context": dynamic_context if dynamic_context else "No additional dynamic context found.",
-            "question": question
-        })
+        with span("generate"):
+            result = self.chain.invoke({
+                "static_context": static_context,
+                "dynamic_context": dynamic_context if dynamic_context else "No additional dynamic context found.",
+                "history": history_to_messages(chat_history),
+                "question": question
+            })
         
         return result
+    
+    async def astream(
+        self,
+        question: str,
+        chat_history: List[Dict[str, str]] = None,
+        retrieved: Optional[Tuple[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a billing answer chunk by chunk as the LLM generates it."""
+        if retrieved is None:
+            retrieved = await self._aretrieve_contexts(question)
+        static_context, dynamic_context = retrieved
+        
+        with span("generate"):
+            async for chunk in self.chain.astream({
+                "static_context": static_context,
+                "dynamic_context": dynamic_context if dynamic_context else "No additional dynamic context found.",
+                "history": history_to_messages(chat_history),
+                "question": question
+            }):
+                yield chunk
+    
+    async def aprocess(
+        self,
+        question: str,
+        chat_history: List[Dict[str, str]] = None,
+        retrieved: Optional[Tuple[str, str]] = None
+    ) -> str:
+        """Process a billing question using Hybrid RAG/CAG without blocking the event loop."""
+        chunks = [chunk async for chunk in self.astream(question, chat_history, retrieved)]
+        return "".join(chunks)
 
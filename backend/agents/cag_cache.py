@@ -0,0 +1,157 @@
+"""Versioned static contexts of the CAG agents, preloaded and refreshed in the background."""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from config import settings
+from metrics import record_error, span
+from vector_store import get_kb_version, reload_vector_stores
+
+
+logger = logging.getLogger(__name__)
+
+
+# Builds a context: the prompt text and the documents it was made from
+ContextLoader = Callable[[], Tuple[str, List[Document]]]
+
+
+class CAGContext:
+    """An immutable snapshot of one static context."""
+    
+    __slots__ = ("text", "documents", "kb_version", "loaded_at")
+    
+    def __init__(self, text: str, documents: List[Document], kb_version: str):
+        self.text = text
+        self.documents = documents
+        self.kb_version = kb_version
+        self.loaded_at = time.time()
+
+
+class CAGCacheManager:
+    """Static contexts of the CAG agents, tagged with the knowledge-base version.
+
+    Agents register a loader per context. Contexts are preloaded at startup;
+    a background thread polls the version written by ingest_data and, when it
+    changes, reopens the vector stores and rebuilds every context. Each new
+    snapshot replaces the old one in a single assignment, so a request sees
+    either the old or the new context, never a partial one, and never waits
+    for a refresh. A failed refresh keeps serving the previous snapshot and
+    is retried on the next poll.
+    """
+    
+    def __init__(self, refresh_interval: Optional[float] = None):
+        self.refresh_interval = (
+            settings.cag_refresh_interval_seconds if refresh_interval is None else refresh_interval
+        )
+        self._loaders: Dict[str, ContextLoader] = {}
+        self._contexts: Dict[str, CAGContext] = {}
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def register(self, name: str, loader: ContextLoader) -> None:
+        """Register (or replace) the loader of a context."""
+        self._loaders[name] = loader
+    
+    def _load(self, name: str) -> CAGContext:
+        """Build a snapshot with the registered loader and swap it in."""
+        # Read the version first, so an ingestion finishing mid-load is picked up by the next poll
+        kb_version = get_kb_version()
+        with span("cag_load", agent_type=name):
+            text, documents = self._loaders[name]()
+        context = CAGContext(text, documents, kb_version)
+        self._contexts[name] = context
+        return context
+    
+    def peek(self, name: str) -> Optional[CAGContext]:
+        """The current snapshot of a context, or None if it was never loaded."""
+        return self._contexts.get(name)
+    
+    def get(self, name: str) -> CAGContext:
+        """The current snapshot of a context, loading it if it was never loaded."""
+        context = self._contexts.get(name)
+        if context is not None:
+            return context
+        
+        with self._load_lock:
+            context = self._contexts.get(name)
+            if context is None:
+                context = self._load(name)
+            return context
+    
+    def put(self, name: str, text: str, documents: List[Document], kb_version: str) -> CAGContext:
+        """Install a snapshot built by the caller (e.g. alongside a batched request)."""
+        context = CAGContext(text, documents, kb_version)
+        self._contexts[name] = context
+        return context
+    
+    def preload(self) -> None:
+        """Load every registered context that is not loaded yet."""
+        for name in list(self._loaders):
+            self.get(name)
+    
+    def refresh(self, force: bool = False) -> List[str]:
+        """Rebuild the contexts built from an older knowledge base; returns their names."""
+        kb_version = get_kb_version()
+        stale = [
+            name for name in list(self._loaders)
+            if force or name not in self._contexts or self._contexts[name].kb_version != kb_version
+        ]
+        if not stale:
+            return []
+        
+        # Collections and exported indexes may have been rewritten by another process
+        reload_vector_stores()
+        refreshed = []
+        with self._load_lock:
+            for name in stale:
+                try:
+                    self._load(name)
+                    refreshed.append(name)
+                except Exception as e:
+                    logger.error("Error refreshing %s context: %s", name, e)
+                    record_error("cag_refresh")
+        return refreshed
+    
+    def _run(self) -> None:
+        """Background loop: poll the knowledge-base version until stopped."""
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                refreshed = self.refresh()
+                if refreshed:
+                    logger.info("Refreshed cached contexts for knowledge base %s: %s", get_kb_version(), ', '.join(refreshed))
+            except Exception as e:
+                logger.error("Error refreshing cached contexts: %s", e)
+                record_error("cag_refresh")
+    
+    def start(self) -> None:
+        """Start the background refresher (a no-op if disabled or already running)."""
+        if self.refresh_interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cag-refresh", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the background refresher."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """Knowledge-base version and age of every loaded context."""
+        now = time.time()
+        return {
+            name: {"kb_version": context.kb_version, "age_seconds": round(now - context.loaded_at, 1)}
+            for name, context in list(self._contexts.items())
+        }
+
+
+_cag_cache = CAGCacheManager()
+
+
+def get_cag_cache() -> CAGCacheManager:
+    """Get the process-wide CAG cache manager."""
+    return _cag_cache
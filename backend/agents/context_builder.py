@@ -0,0 +1,121 @@
+"""Context packing shared by the agents: deduplicate, merge adjacent chunks, fit a token budget."""
+from typing import Dict, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from config import settings
+from session_store import estimate_tokens
+
+
+# Shortest text shared by two chunks that counts as splitter overlap
+MIN_OVERLAP_CHARS = 20
+
+# Longest overlap searched for; the ingestion splitter uses 200 characters
+MAX_OVERLAP_CHARS = 400
+
+
+def _normalize(text: str) -> str:
+    """Collapse whitespace so formatting differences don't hide duplicates."""
+    return " ".join(text.split())
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is also a prefix of right."""
+    longest = min(len(left), len(right), MAX_OVERLAP_CHARS)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _join(left: str, right: str) -> str:
+    """Concatenate consecutive chunks, dropping the text they share."""
+    overlap = _overlap(left, right)
+    if overlap:
+        return left + right[overlap:]
+    return f"{left}\n{right}"
+
+
+def deduplicate(docs: Sequence[Document], exclude: Sequence[Document] = ()) -> List[Document]:
+    """Drop chunks that repeat, or are contained in, a more relevant chunk or an excluded one."""
+    seen = [_normalize(doc.page_content) for doc in exclude]
+    kept: List[Document] = []
+    for doc in docs:
+        text = _normalize(doc.page_content)
+        if not text or any(text in other for other in seen):
+            continue
+        seen.append(text)
+        kept.append(doc)
+    return kept
+
+
+def merge_adjacent(docs: Sequence[Document]) -> List[Document]:
+    """Merge consecutive chunks of the same source into one, ranked by its best chunk.
+
+    Chunks without a chunk_index (ingested before it was recorded) are kept as is.
+    """
+    by_source: Dict[str, List[Tuple[int, int, Document]]] = {}
+    standalone: List[Tuple[int, Document]] = []
+    for rank, doc in enumerate(docs):
+        index = doc.metadata.get("chunk_index")
+        if index is None:
+            standalone.append((rank, doc))
+        else:
+            by_source.setdefault(doc.metadata.get("source", ""), []).append((int(index), rank, doc))
+    
+    merged: List[Tuple[int, Document]] = list(standalone)
+    for chunks in by_source.values():
+        chunks.sort(key=lambda chunk: chunk[0])
+        run_rank, run_doc, last_index = chunks[0][1], chunks[0][2], chunks[0][0]
+        for index, rank, doc in chunks[1:]:
+            if index == last_index + 1:
+                run_doc = Document(
+                    page_content=_join(run_doc.page_content, doc.page_content),
+                    metadata={**run_doc.metadata, "chunk_end": index},
+                )
+                run_rank = min(run_rank, rank)
+            else:
+                merged.append((run_rank, run_doc))
+                run_rank, run_doc = rank, doc
+            last_index = index
+        merged.append((run_rank, run_doc))
+    
+    merged.sort(key=lambda item: item[0])
+    return [doc for _, doc in merged]
+
+
+def pack(docs: Sequence[Document], token_budget: int) -> List[Document]:
+    """The most relevant documents that fit the token budget together.
+
+    Documents that don't fit are skipped so smaller, less relevant ones can
+    still use the space; a single oversized top document is truncated.
+    """
+    packed: List[Document] = []
+    used = 0
+    for doc in docs:
+        tokens = estimate_tokens(doc.page_content)
+        if used + tokens <= token_budget:
+            packed.append(doc)
+            used += tokens
+        elif not packed:
+            text = doc.page_content[:token_budget * 4].rsplit(" ", 1)[0]
+            packed.append(Document(page_content=text, metadata=doc.metadata))
+            used = estimate_tokens(text)
+    return packed
+
+
+def build_context(
+    docs: Sequence[Document],
+    token_budget: Optional[int] = None,
+    exclude: Sequence[Document] = ()
+) -> List[Document]:
+    """Deduplicate, merge and pack retrieved documents, most relevant first.
+
+    docs must be ordered by relevance. Chunks already present in exclude
+    (e.g. a cached static context in the same prompt) are dropped.
+    """
+    budget = settings.context_token_budget if token_budget is None else token_budget
+    return pack(merge_adjacent(deduplicate(docs, exclude)), budget)
+
+
+def build_static_context(docs: Sequence[Document]) -> List[Document]:
+    """Like build_context(), with the budget for cached static (CAG) context."""
+    return build_context(docs, settings.static_context_token_budget)
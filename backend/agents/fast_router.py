@@ -0,0 +1,180 @@
+"""Fast-path Router - In-process TF-IDF classifier in front of the router LLM."""
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from metrics import record_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "has", "have", "how", "i", "if", "in", "is", "it", "me", "my", "of",
+    "on", "or", "our", "so", "that", "the", "this", "to", "we", "what", "when",
+    "where", "which", "who", "why", "will", "with", "you", "your",
+}
+
+# Below this similarity the query shares too little vocabulary with the corpus to trust
+MIN_SCORE = 0.05
+
+# Wording that may join separate requests in one message ("..., and also ...", "; ", two questions)
+CLAUSE_BOUNDARY = re.compile(
+    r"\b(?:also|as well as|in addition|additionally|separately|another (?:question|issue|problem))\b|[;?]",
+    re.IGNORECASE,
+)
+
+# Clauses with fewer knowledge base terms than this ("Can I", "thanks") have no topic of their own
+MIN_CLAUSE_TERMS = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and fold plurals."""
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class FastPathRouter:
+    """Routes obvious queries locally using TF-IDF centroids of the knowledge base.
+
+    Centroids are built lazily from the same data/ corpus and categorization
+    that ingestion uses. A query is answered locally only when the margin
+    between the best and second-best category clears the confidence threshold;
+    otherwise the caller falls back to the router LLM.
+    """
+    
+    def __init__(self, data_dir: Optional[str] = None, threshold: Optional[float] = None):
+        self.data_dir = data_dir
+        self.threshold = settings.fast_router_confidence_threshold if threshold is None else threshold
+        self._lock = threading.Lock()
+        self._built = False
+        self._idf: Dict[str, float] = {}
+        self._centroids: Dict[str, Dict[str, float]] = {}
+    
+    def _build(self) -> None:
+        """Build per-category TF-IDF centroids from the knowledge base documents."""
+        from ingest_data import DATA_DIR, load_documents, categorize_documents
+        
+        documents = load_documents(self.data_dir or DATA_DIR)
+        categorized = categorize_documents(documents)
+        
+        doc_tokens = [
+            (category, Counter(tokenize(doc.page_content)))
+            for category, docs in categorized.items()
+            for doc in docs
+        ]
+        if not doc_tokens:
+            return
+        
+        # Inverse document frequency across all knowledge base documents
+        doc_freq: Counter = Counter()
+        for _, counts in doc_tokens:
+            doc_freq.update(counts.keys())
+        n_docs = len(doc_tokens)
+        self._idf = {
+            term: math.log((1 + n_docs) / (1 + df)) + 1.0
+            for term, df in doc_freq.items()
+        }
+        
+        # Average the normalized document vectors of each category
+        sums: Dict[str, Counter] = {}
+        for category, counts in doc_tokens:
+            vector = self._normalize({term: tf * self._idf[term] for term, tf in counts.items()})
+            sums.setdefault(category, Counter()).update(vector)
+        self._centroids = {category: self._normalize(dict(vector)) for category, vector in sums.items()}
+    
+    def _ensure_built(self) -> None:
+        """Build the centroids on first use."""
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            try:
+                self._build()
+            except Exception as e:
+                logger.error("Error building fast-path router: %s", e)
+            self._built = True
+    
+    def warm_up(self) -> None:
+        """Build the centroids ahead of the first query."""
+        self._ensure_built()
+    
+    @staticmethod
+    def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+        """Scale a sparse vector to unit length."""
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if not norm:
+            return vector
+        return {term: value / norm for term, value in vector.items()}
+    
+    def score(self, query: str) -> Dict[str, float]:
+        """Cosine similarity between the query and each category centroid."""
+        self._ensure_built()
+        
+        counts = Counter(tokenize(query))
+        query_vector = self._normalize({
+            term: tf * self._idf[term]
+            for term, tf in counts.items()
+            if term in self._idf
+        })
+        
+        return {
+            category: sum(weight * centroid.get(term, 0.0) for term, weight in query_vector.items())
+            for category, centroid in self._centroids.items()
+        }
+    
+    def _decide(self, scores: Dict[str, float]) -> Tuple[Optional[str], float]:
+        """Best category and its margin over the runner-up; None if below the threshold."""
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        
+        agent_type, confidence = None, 0.0
+        if ranked and ranked[0][1] >= MIN_SCORE:
+            best = ranked[0][1]
+            runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+            confidence = (best - runner_up) / best
+            if confidence >= self.threshold:
+                agent_type = ranked[0][0]
+        return agent_type, confidence
+    
+    def clause_topics(self, query: str) -> List[Optional[str]]:
+        """Category of each clause of the query that has a topic of its own (None when unclear)."""
+        self._ensure_built()
+        
+        topics = []
+        for clause in CLAUSE_BOUNDARY.split(query):
+            known_terms = [term for term in tokenize(clause) if term in self._idf]
+            if len(known_terms) < MIN_CLAUSE_TERMS:
+                continue
+            topics.append(self._decide(self.score(clause))[0])
+        return topics
+    
+    def is_multi_intent(self, query: str) -> bool:
+        """Whether the query joins requests on different topics, which only the router LLM can split.
+        
+        "Can I also pay by card?" has a single clause with a topic and stays
+        local; "My invoice is wrong, and also the API crashes" has two clauses
+        that do not share a confident category.
+        """
+        topics = self.clause_topics(query)
+        return len(topics) > 1 and (None in topics or len(set(topics)) > 1)
+    
+    def classify(self, query: str) -> Tuple[Optional[str], float]:
+        """Classify a query locally.
+
+        Returns (agent_type, confidence). agent_type is None when the local
+        classifier is not confident enough and the router LLM should decide.
+        """
+        agent_type, confidence = self._decide(self.score(query))
+        record_cache("fast_router", hit=agent_type is not None)
+        return agent_type, confidence
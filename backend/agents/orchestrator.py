@@ -1,35 +1,131 @@
 """Orchestrator Agent - Routes queries to specialized worker agents using LangGraph."""
-from typing import Dict, Any, List, Literal, TypedDict
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Dict, Any, List, Literal, Optional, TypedDict, AsyncIterator, Callable
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.graph import StateGraph, END
+try:
+    from langgraph.utils.runnable import RunnableCallable
+except ImportError:  # langgraph < 0.2.20
+    from langgraph.utils import RunnableCallable
 from langchain_core.output_parsers import JsonOutputParser
 from llm_providers import get_router_llm
+from config import settings
+from metrics import ROUTING_DECISIONS, SPECULATIVE_DISCARDS, agent_scope, record_cache, record_error, span
 from agents.policy_agent import PolicyAgent
 from agents.technical_agent import TechnicalAgent
 from agents.billing_agent import BillingAgent
+from agents.fast_router import FastPathRouter
+from agents.cag_cache import get_cag_cache
+from agents.prompt_prefix import register_prompt_prefix
+from response_cache import SemanticResponseCache
+from session_store import SessionStore
+from vector_store import get_registry, get_kb_version
+
+
+logger = logging.getLogger(__name__)
+
+
+def merge_responses(left: Dict[str, str], right: Dict[str, str]) -> Dict[str, str]:
+    """Combine the answers written by agent nodes running in parallel."""
+    return {**left, **right}
 
 
 class AgentState(TypedDict):
     """State for the agent workflow."""
     messages: List[Dict[str, str]]
     query: str
-    agent_type: str
+    previous_agent_type: str
+    agent_type: str  # Primary agent, the first of agent_types
+    agent_types: List[str]
+    responses: Annotated[Dict[str, str], merge_responses]
     response: str
     session_id: str
+    speculative: Dict[str, Any]
+
+
+# Workflow nodes whose LLM output is the user-facing answer
+AGENT_NODES = ("billing", "technical", "policy")
+
+# Section headings of a multi-intent answer
+SECTION_TITLES = {
+    "billing": "Billing",
+    "technical": "Technical support",
+    "policy": "Policy & compliance",
+}
+
+# Agents whose retrieval step can run on its own (retrieve/aretrieve/aretrieve_batch),
+# e.g. while the router LLM is still deciding
+RETRIEVING_AGENTS = ("billing", "technical")
+
+# Runs speculative retrievals of synchronous requests next to the router call
+_speculation_executor = ThreadPoolExecutor(thread_name_prefix="speculative-retrieval")
+
+AGENT_CLASSES = {
+    "billing": BillingAgent,
+    "technical": TechnicalAgent,
+    "policy": PolicyAgent,
+}
 
 
 class OrchestratorAgent:
     """Orchestrator that routes queries to specialized agents."""
     
+    # Bump when the router's system prompt changes
+    ROUTER_PROMPT_VERSION = "2"
+    
     def __init__(self):
         self.router_llm = get_router_llm()
-        self.policy_agent = PolicyAgent()
-        self.technical_agent = TechnicalAgent()
-        self.billing_agent = BillingAgent()
+        self.router_chain = self._build_router_chain()
+        self.fast_router = FastPathRouter() if settings.fast_router_enabled else None
+        # Splits multi-topic queries off the local routes, even with the fast path disabled
+        self.intent_router = self.fast_router or FastPathRouter()
+        self.response_cache = SemanticResponseCache() if settings.response_cache_enabled else None
+        self.sessions = SessionStore()
+        self._agents: Dict[str, Any] = {}
+        self._agents_lock = threading.Lock()
         self.workflow = self._build_workflow()
     
-    def _classify_query(self, query: str) -> str:
-        """Classify the query to determine which agent should handle it."""
+    def get_agent(self, agent_type: str):
+        """Get a worker agent, constructing it on first use."""
+        agent = self._agents.get(agent_type)
+        if agent is None:
+            with self._agents_lock:
+                agent = self._agents.get(agent_type)
+                if agent is None:
+                    agent = AGENT_CLASSES[agent_type]()
+                    self._agents[agent_type] = agent
+        return agent
+    
+    @property
+    def policy_agent(self) -> PolicyAgent:
+        """Policy & compliance agent."""
+        return self.get_agent("policy")
+    
+    @property
+    def technical_agent(self) -> TechnicalAgent:
+        """Technical support agent."""
+        return self.get_agent("technical")
+    
+    @property
+    def billing_agent(self) -> BillingAgent:
+        """Billing support agent."""
+        return self.get_agent("billing")
+    
+    def warm_up(self) -> None:
+        """Construct every agent and preload the contexts they cache."""
+        if self.fast_router is not None:
+            self.fast_router.warm_up()
+        for agent_type in AGENT_NODES:
+            self.get_agent(agent_type)
+        # Constructing the agents registered their context loaders
+        get_cag_cache().preload()
+    
+    def _build_router_chain(self):
+        """Build the routing chain (called once, in __init__)."""
         prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a query router for a customer service system.
 Analyze the user's query and determine which specialized agent should handle it.
@@ -39,79 +135,353 @@ Available agents:
 2. "technical" - For technical support, bugs, product issues, troubleshooting, feature questions
 3. "policy" - For questions about Terms of Service, Privacy Policy, compliance, legal matters
 
-Respond with ONLY the agent name (billing, technical, or policy) in JSON format:
-{{"agent": "agent_name"}}"""),
+A query can raise several distinct issues (e.g. a wrong invoice and an API
+error); list every agent needed, the one for the main issue first. Most
+queries need only one agent.
+
+Respond with ONLY the agent names (billing, technical, policy) in JSON format:
+{{"agents": ["agent_name", ...]}}"""),
             ("human", "Query: {query}")
         ])
+        register_prompt_prefix("router", self.ROUTER_PROMPT_VERSION, prompt)
         
         parser = JsonOutputParser()
         
-        chain = prompt | self.router_llm | parser
+        return prompt | self.router_llm | parser
+    
+    def _parse_agent_types(self, result: Dict[str, Any]) -> List[str]:
+        """Extract and validate the agent types from the router output, primary first."""
+        agents = result.get("agents")
+        if agents is None:
+            agents = [result.get("agent", "technical")]  # Single-agent answer
+        elif isinstance(agents, str):
+            agents = [agents]
         
-        try:
-            result = chain.invoke({"query": query})
-            agent_type = result.get("agent", "technical").lower()
-            
-            # Validate agent type
-            if agent_type not in ["billing", "technical", "policy"]:
-                agent_type = "technical"  # Default fallback
-            
-            return agent_type
-        except Exception as e:
-            print(f"Error classifying query: {e}")
-            return "technical"  # Default fallback
+        # Validate agent types, dropping unknown and repeated ones
+        agent_types: List[str] = []
+        for agent in agents:
+            agent_type = str(agent).lower()
+            if agent_type in AGENT_NODES and agent_type not in agent_types:
+                agent_types.append(agent_type)
+        
+        return agent_types[:max(settings.max_agents_per_query, 1)] or ["technical"]  # Default fallback
+    
+    def _llm_route(self, result: Dict[str, Any]) -> List[str]:
+        """Agent types of a router LLM answer, counted in the routing metrics."""
+        agent_types = self._parse_agent_types(result)
+        for agent_type in agent_types:
+            ROUTING_DECISIONS.inc(method="llm", agent_type=agent_type)
+        return agent_types
+    
+    def _fallback_route(self, error: Exception) -> List[str]:
+        """Route used when the router LLM fails."""
+        logger.error("Error classifying query: %s", error)
+        record_error("router")
+        ROUTING_DECISIONS.inc(method="fallback", agent_type="technical")
+        return ["technical"]  # Default fallback
+    
+    def _fast_classify(self, query: str) -> Optional[str]:
+        """Try the local classifier; None means the router LLM must decide."""
+        if self.fast_router is None:
+            return None
+        
+        agent_type, _ = self.fast_router.classify(query)
+        return agent_type
+    
+    def _sticky_agent(self, query: str, previous_agent_type: str) -> Optional[str]:
+        """Reuse the previous turn's agent for a follow-up, per the stickiness policy.
+        
+        Only consulted when the local classifier found no clear topic, so a
+        follow-up that obviously changes topic is still rerouted.
+        """
+        if not previous_agent_type or settings.sticky_routing == "off":
+            return None
+        if settings.sticky_routing == "always":
+            return previous_agent_type
+        if len(query.split()) <= settings.sticky_routing_max_words:
+            return previous_agent_type
+        return None
+    
+    def _local_route(self, query: str, previous_agent_type: str) -> Optional[str]:
+        """Route without the LLM (fast path, then stickiness); None if the LLM must decide.
+        
+        Both local routes pick a single agent, so a query that joins requests
+        on different topics always goes to the router LLM, which can fan it out.
+        """
+        method = "fast_path"
+        agent_type = self._fast_classify(query)
+        if not agent_type:
+            method = "sticky"
+            agent_type = self._sticky_agent(query, previous_agent_type)
+        if not agent_type or self.intent_router.is_multi_intent(query):
+            return None
+        
+        ROUTING_DECISIONS.inc(method=method, agent_type=agent_type)
+        return agent_type
+    
+    def _classify_query(
+        self,
+        query: str,
+        previous_agent_type: str = "",
+        before_llm: Optional[Callable[[], None]] = None
+    ) -> List[str]:
+        """Classify the query to determine which agents should handle it, primary first.
+        
+        Only the router LLM can split a query across several agents, so
+        queries that look like several requests skip the local routes.
+        before_llm is called when the router LLM is needed, right before the call.
+        """
+        with span("route") as labels:
+            agent_type = self._local_route(query, previous_agent_type)
+            if not agent_type:
+                if before_llm is not None:
+                    before_llm()
+                try:
+                    agent_types = self._llm_route(self.router_chain.invoke({"query": query}))
+                except Exception as e:
+                    agent_types = self._fallback_route(e)
+            else:
+                agent_types = [agent_type]
+            labels["agent_type"] = agent_types[0]
+            return agent_types
+    
+    async def _aclassify_query(
+        self,
+        query: str,
+        previous_agent_type: str = "",
+        before_llm: Optional[Callable[[], None]] = None
+    ) -> List[str]:
+        """Classify the query without blocking the event loop."""
+        with span("route") as labels:
+            agent_type = self._local_route(query, previous_agent_type)
+            if not agent_type:
+                if before_llm is not None:
+                    before_llm()
+                try:
+                    agent_types = self._llm_route(await self.router_chain.ainvoke({"query": query}))
+                except Exception as e:
+                    agent_types = self._fallback_route(e)
+            else:
+                agent_types = [agent_type]
+            labels["agent_type"] = agent_types[0]
+            return agent_types
+    
+    async def aclassify_batch(self, queries: List[str]) -> List[List[str]]:
+        """Classify stand-alone queries together, primary agent first for each.
+        
+        Queries the local router can't decide go to the router LLM as one
+        request each, run concurrently with at most
+        settings.batch_max_concurrency requests in flight.
+        """
+        routes: List[List[str]] = []
+        pending: List[int] = []
+        for i, query in enumerate(queries):
+            agent_type = self._local_route(query, "")
+            routes.append([agent_type] if agent_type else [])
+            if not agent_type:
+                pending.append(i)
+        
+        if pending:
+            results = await self.router_chain.abatch(
+                [{"query": queries[i]} for i in pending],
+                config={"max_concurrency": settings.batch_max_concurrency},
+                return_exceptions=True
+            )
+            for i, result in zip(pending, results):
+                if isinstance(result, Exception):
+                    routes[i] = self._fallback_route(result)
+                else:
+                    routes[i] = self._llm_route(result)
+        return routes
+    
+    def _speculative_retrieve(self, agent_type: str, query: str) -> Any:
+        """Run one agent's retrieval step, attributed to that agent."""
+        with agent_scope(agent_type):
+            return self.get_agent(agent_type).retrieve(query)
+    
+    async def _aspeculative_retrieve(self, agent_type: str, query: str) -> Any:
+        """Run one agent's retrieval step asynchronously, attributed to that agent."""
+        with agent_scope(agent_type):
+            return await self.get_agent(agent_type).aretrieve(query)
+    
+    def _start_speculation(self, state: AgentState) -> None:
+        """Start every retrieving agent's retrieval in worker threads while the router LLM runs."""
+        for agent_type in RETRIEVING_AGENTS:
+            context = contextvars.copy_context()
+            state["speculative"][agent_type] = _speculation_executor.submit(
+                context.run, self._speculative_retrieve, agent_type, state["query"]
+            )
+    
+    def _astart_speculation(self, state: AgentState) -> None:
+        """Start every retrieving agent's retrieval as a task while the router LLM runs."""
+        for agent_type in RETRIEVING_AGENTS:
+            state["speculative"][agent_type] = asyncio.create_task(
+                self._aspeculative_retrieve(agent_type, state["query"])
+            )
+    
+    def _settle_speculation(self, state: AgentState) -> None:
+        """Keep the speculative retrievals of the routed agents and cancel the others.
+        
+        A task is stopped at its next await, but a thread that has started
+        can't be stopped: in threadpool mode the losing retrieval runs to
+        completion and is counted as wasted.
+        """
+        speculative = state["speculative"]
+        if not speculative:
+            return
+        
+        for agent_type in list(speculative):
+            if agent_type not in state["agent_types"]:
+                cancelled = speculative.pop(agent_type).cancel()
+                SPECULATIVE_DISCARDS.inc(agent_type=agent_type, outcome="cancelled" if cancelled else "wasted")
+        for agent_type in state["agent_types"]:
+            record_cache("speculative_retrieval", hit=agent_type in speculative)
     
     def _route_to_agent(self, state: AgentState) -> AgentState:
-        """Route the query to the appropriate agent."""
+        """Route the query to the appropriate agent.
+        
+        With speculative retrieval on, the retrieving agents start searching as
+        soon as it is clear the router LLM is needed, so retrieval overlaps the
+        LLM call instead of following it.
+        """
         query = state["query"]
-        agent_type = self._classify_query(query)
+        before_llm = (lambda: self._start_speculation(state)) if settings.speculative_retrieval else None
+        agent_types = self._classify_query(query, state.get("previous_agent_type", ""), before_llm=before_llm)
         
-        state["agent_type"] = agent_type
+        state["agent_types"] = agent_types
+        state["agent_type"] = agent_types[0]
+        self._settle_speculation(state)
+        return state
+    
+    async def _aroute_to_agent(self, state: AgentState) -> AgentState:
+        """Route the query to the appropriate agent asynchronously."""
+        before_llm = (lambda: self._astart_speculation(state)) if settings.speculative_retrieval else None
+        agent_types = await self._aclassify_query(
+            state["query"], state.get("previous_agent_type", ""), before_llm=before_llm
+        )
+        state["agent_types"] = agent_types
+        state["agent_type"] = agent_types[0]
+        self._settle_speculation(state)
         return state
     
-    def _handle_billing(self, state: AgentState) -> AgentState:
+    def _speculative_result(self, state: AgentState, agent_type: str) -> Optional[Any]:
+        """Wait for the routed agent's speculative retrieval, if one was started.
+        
+        Returns None when nothing was started for it, so the agent retrieves itself.
+        """
+        pending = state["speculative"].get(agent_type)
+        if pending is None:
+            return None
+        try:
+            return pending.result()
+        except Exception as e:
+            logger.warning("Error in speculative retrieval: %s", e)
+            record_error("speculative_retrieval")
+            return None
+    
+    async def _aspeculative_result(self, state: AgentState, agent_type: str) -> Optional[Any]:
+        """Await the routed agent's speculative retrieval, if one was started."""
+        pending = state["speculative"].get(agent_type)
+        if pending is None:
+            return None
+        try:
+            return await pending
+        except Exception as e:
+            logger.warning("Error in speculative retrieval: %s", e)
+            record_error("speculative_retrieval")
+            return None
+    
+    # Agent nodes may run in parallel branches, so each returns only its own
+    # answer; the responses reducer collects them for the merge node.
+    
+    def _handle_billing(self, state: AgentState) -> Dict[str, Any]:
         """Handle billing queries."""
         query = state["query"]
         chat_history = state.get("messages", [])
-        response = self.billing_agent.process(query, chat_history)
-        state["response"] = response
-        return state
+        with agent_scope("billing"):
+            retrieved = self._speculative_result(state, "billing")
+            response = self.billing_agent.process(query, chat_history, retrieved)
+        return {"responses": {"billing": response}}
     
-    def _handle_technical(self, state: AgentState) -> AgentState:
+    def _handle_technical(self, state: AgentState) -> Dict[str, Any]:
         """Handle technical queries."""
         query = state["query"]
         chat_history = state.get("messages", [])
-        response = self.technical_agent.process(query, chat_history)
-        state["response"] = response
-        return state
+        with agent_scope("technical"):
+            retrieved = self._speculative_result(state, "technical")
+            response = self.technical_agent.process(query, chat_history, retrieved)
+        return {"responses": {"technical": response}}
     
-    def _handle_policy(self, state: AgentState) -> AgentState:
+    def _handle_policy(self, state: AgentState) -> Dict[str, Any]:
         """Handle policy queries."""
         query = state["query"]
         chat_history = state.get("messages", [])
-        response = self.policy_agent.process(query, chat_history)
-        state["response"] = response
-        return state
+        with agent_scope("policy"):
+            response = self.policy_agent.process(query, chat_history)
+        return {"responses": {"policy": response}}
+    
+    async def _ahandle_billing(self, state: AgentState) -> Dict[str, Any]:
+        """Handle billing queries asynchronously."""
+        with agent_scope("billing"):
+            retrieved = await self._aspeculative_result(state, "billing")
+            response = await self.billing_agent.aprocess(state["query"], state.get("messages", []), retrieved)
+        return {"responses": {"billing": response}}
+    
+    async def _ahandle_technical(self, state: AgentState) -> Dict[str, Any]:
+        """Handle technical queries asynchronously."""
+        with agent_scope("technical"):
+            retrieved = await self._aspeculative_result(state, "technical")
+            response = await self.technical_agent.aprocess(state["query"], state.get("messages", []), retrieved)
+        return {"responses": {"technical": response}}
+    
+    async def _ahandle_policy(self, state: AgentState) -> Dict[str, Any]:
+        """Handle policy queries asynchronously."""
+        with agent_scope("policy"):
+            response = await self.policy_agent.aprocess(state["query"], state.get("messages", []))
+        return {"responses": {"policy": response}}
+    
+    @staticmethod
+    def _section_heading(agent_type: str) -> str:
+        """Heading of an agent's section in a multi-intent answer."""
+        return f"**{SECTION_TITLES[agent_type]}**\n"
+    
+    def response_sections(self, agent_types: List[str], responses: Dict[str, str]) -> List[str]:
+        """The answer of every routed agent, primary first; a lone answer gets no heading."""
+        if len(agent_types) == 1:
+            return [responses.get(agent_types[0], "")]
+        return [self._section_heading(agent_type) + responses.get(agent_type, "") for agent_type in agent_types]
+    
+    def _merge_responses(self, state: AgentState) -> Dict[str, Any]:
+        """Join the agents' answers into the final response, without another LLM call."""
+        return {"response": "\n\n".join(self.response_sections(state["agent_types"], state["responses"]))}
     
     def _build_workflow(self) -> StateGraph:
         """Build the LangGraph workflow."""
         workflow = StateGraph(AgentState)
         
+        # Each node has a sync and an async implementation, so the compiled
+        # graph serves both invoke() and ainvoke(). RunnableCallable rather than
+        # RunnableLambda: LangGraph serializes the graph on every run, and
+        # RunnableLambda's repr parses source code each time.
+        
         # Add routing node
-        workflow.add_node("route", self._route_to_agent)
+        workflow.add_node("route", RunnableCallable(self._route_to_agent, self._aroute_to_agent, name="route"))
         
         # Add agent nodes
-        workflow.add_node("billing", self._handle_billing)
-        workflow.add_node("technical", self._handle_technical)
-        workflow.add_node("policy", self._handle_policy)
+        workflow.add_node("billing", RunnableCallable(self._handle_billing, self._ahandle_billing, name="billing"))
+        workflow.add_node("technical", RunnableCallable(self._handle_technical, self._ahandle_technical, name="technical"))
+        workflow.add_node("policy", RunnableCallable(self._handle_policy, self._ahandle_policy, name="policy"))
+        
+        # Add merge node
+        workflow.add_node("merge", RunnableCallable(self._merge_responses, name="merge"))
         
         # Set entry point
         workflow.set_entry_point("route")
         
-        # Add conditional edges based on agent type
+        # Add conditional edges based on agent types; several run as parallel branches
         workflow.add_conditional_edges(
             "route",
-            lambda state: state["agent_type"],
+            lambda state: state["agent_types"],
             {
                 "billing": "billing",
                 "technical": "technical",
@@ -119,29 +489,182 @@ Respond with ONLY the agent name (billing, technical, or policy) in JSON format:
             }
         )
         
-        # All agents end
-        workflow.add_edge("billing", END)
-        workflow.add_edge("technical", END)
-        workflow.add_edge("policy", END)
+        # All agents meet in the merge node, which runs once every branch is done
+        workflow.add_edge("billing", "merge")
+        workflow.add_edge("technical", "merge")
+        workflow.add_edge("policy", "merge")
+        workflow.add_edge("merge", END)
         
         return workflow.compile()
     
-    def process(self, query: str, session_id: str, chat_history: List[Dict[str, str]] = None) -> Dict[str, Any]:
-        """Process a query through the orchestrator workflow."""
-        initial_state: AgentState = {
+    def _initial_state(self, query: str, session_id: str, chat_history: List[Dict[str, str]] = None) -> AgentState:
+        """Build the initial workflow state for a query."""
+        return {
             "messages": chat_history or [],
             "query": query,
+            "previous_agent_type": self._previous_agent_type(session_id),
             "agent_type": "",
+            "agent_types": [],
+            "responses": {},
             "response": "",
+            "session_id": session_id,
+            "speculative": {}
+        }
+    
+    def _conversation(self, session_id: str, chat_history: List[Dict[str, str]] = None) -> List[Dict[str, str]]:
+        """History for a request: the server-side session, or what a legacy client sent."""
+        if chat_history:
+            return self.sessions.window(chat_history)
+        return self.sessions.history(session_id)
+    
+    def _previous_agent_type(self, session_id: str) -> str:
+        """Agent that answered the session's previous turn, if any."""
+        session = self.sessions.get(session_id)
+        return session.last_agent_type if session else ""
+    
+    def _finish(self, session_id: str, query: str, agent_types: List[str], response: str) -> Dict[str, Any]:
+        """Record the turn in the session and build the result."""
+        self.sessions.append_turn(session_id, query, response, agent_types[0])
+        return {
+            "response": response,
+            "agent_type": agent_types[0],
+            "agent_types": agent_types,
             "session_id": session_id
         }
+    
+    def _store_response(
+        self,
+        query_vector: Optional[List[float]],
+        kb_version: str,
+        agent_types: List[str],
+        response: str
+    ) -> None:
+        """Cache a single-agent answer; multi-intent answers are not cached."""
+        if query_vector is not None and len(agent_types) == 1:
+            self.response_cache.store(query_vector, kb_version, agent_types[0], response)
+    
+    def _use_response_cache(self, chat_history: List[Dict[str, str]] = None) -> bool:
+        """Only stand-alone questions are cached; follow-ups depend on the conversation."""
+        return self.response_cache is not None and not chat_history
+    
+    def _embed_query(self, query: str) -> Optional[List[float]]:
+        """Embed a query for the response cache, or None if embedding fails."""
+        try:
+            return get_registry().get_embeddings().embed_query(query)
+        except Exception as e:
+            logger.warning("Error embedding query for response cache: %s", e)
+            record_error("embedding")
+            return None
+    
+    async def _aembed_query(self, query: str) -> Optional[List[float]]:
+        """Embed a query for the response cache without blocking the event loop."""
+        try:
+            return await get_registry().get_embeddings().aembed_query(query)
+        except Exception as e:
+            logger.warning("Error embedding query for response cache: %s", e)
+            record_error("embedding")
+            return None
+    
+    def process(self, query: str, session_id: str, chat_history: List[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Process a query through the orchestrator workflow.
+        
+        History comes from the server-side session; chat_history is only
+        used when an older client still sends the conversation itself.
+        """
+        history = self._conversation(session_id, chat_history)
+        
+        query_vector = None
+        if self._use_response_cache(history):
+            query_vector = self._embed_query(query)
+        
+        kb_version = get_kb_version()
+        if query_vector is not None:
+            cached = self.response_cache.lookup(query_vector, kb_version)
+            if cached:
+                return self._finish(session_id, query, [cached.agent_type], cached.response)
+        
+        initial_state = self._initial_state(query, session_id, history)
         
         # Run the workflow
         result = self.workflow.invoke(initial_state)
         
-        return {
-            "response": result["response"],
-            "agent_type": result["agent_type"],
-            "session_id": session_id
-        }
-
+        self._store_response(query_vector, kb_version, result["agent_types"], result["response"])
+        
+        return self._finish(session_id, query, result["agent_types"], result["response"])
+    
+    async def aprocess(self, query: str, session_id: str, chat_history: List[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Process a query through the orchestrator workflow without blocking the event loop."""
+        history = self._conversation(session_id, chat_history)
+        
+        query_vector = None
+        if self._use_response_cache(history):
+            query_vector = await self._aembed_query(query)
+        
+        kb_version = get_kb_version()
+        if query_vector is not None:
+            cached = self.response_cache.lookup(query_vector, kb_version)
+            if cached:
+                return self._finish(session_id, query, [cached.agent_type], cached.response)
+        
+        initial_state = self._initial_state(query, session_id, history)
+        
+        result = await self.workflow.ainvoke(initial_state)
+        
+        self._store_response(query_vector, kb_version, result["agent_types"], result["response"])
+        
+        return self._finish(session_id, query, result["agent_types"], result["response"])
+    
+    async def astream(self, query: str, session_id: str, chat_history: List[Dict[str, str]] = None) -> AsyncIterator[Dict[str, str]]:
+        """Stream a query through the orchestrator workflow.
+        
+        Yields {"agent_type": ..., "agent_types": [...]} as soon as routing is
+        done, followed by {"token": ...} for every chunk the primary agent's
+        LLM generates. The answers of the other agents of a multi-intent query
+        follow as one chunk each once every branch is done.
+        """
+        history = self._conversation(session_id, chat_history)
+        
+        query_vector = None
+        if self._use_response_cache(history):
+            query_vector = await self._aembed_query(query)
+        
+        kb_version = get_kb_version()
+        if query_vector is not None:
+            cached = self.response_cache.lookup(query_vector, kb_version)
+            if cached:
+                self._finish(session_id, query, [cached.agent_type], cached.response)
+                yield {"agent_type": cached.agent_type, "agent_types": [cached.agent_type]}
+                yield {"token": cached.response}
+                return
+        
+        initial_state = self._initial_state(query, session_id, history)
+        agent_types: List[str] = []
+        responses: Dict[str, str] = {}
+        tokens = []
+        
+        async for event in self.workflow.astream_events(initial_state, version="v2"):
+            node = event.get("metadata", {}).get("langgraph_node")
+            
+            if event["event"] == "on_chain_end" and event["name"] == "route" and not agent_types:
+                agent_types = event["data"]["output"]["agent_types"]
+                yield {"agent_type": agent_types[0], "agent_types": agent_types}
+                if len(agent_types) > 1:
+                    tokens.append(self._section_heading(agent_types[0]))
+                    yield {"token": tokens[-1]}
+            elif event["event"] == "on_chain_end" and event["name"] in AGENT_NODES and node == event["name"]:
+                responses.update(event["data"]["output"]["responses"])
+            elif event["event"] == "on_chat_model_stream" and agent_types and node == agent_types[0]:
+                token = event["data"]["chunk"].content
+                if token:
+                    tokens.append(token)
+                    yield {"token": token}
+        
+        # The primary answer was streamed live; the others are sent whole
+        for section in self.response_sections(agent_types, responses)[1:]:
+            tokens.append(f"\n\n{section}")
+            yield {"token": tokens[-1]}
+        
+        response = "".join(tokens)
+        self._finish(session_id, query, agent_types, response)
+        if tokens:
+            self._store_response(query_vector, kb_version, agent_types, response)
@@ -1,41 +1,67 @@
 """Policy & Compliance Agent - Pure CAG (Context Augmented Generation)."""
-from typing import Dict, Any, List
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.runnables import RunnablePassthrough
+import asyncio
+from typing import Dict, Any, List, AsyncIterator, Tuple
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.documents import Document
 from llm_providers import get_generator_llm
 from vector_store import search_documents
+from metrics import span
+from agents.context_builder import build_static_context
+from agents.prompt_prefix import register_prompt_prefix
+from agents.cag_cache import get_cag_cache
+from session_store import history_to_messages
 
 
 class PolicyAgent:
     """Agent for handling policy and compliance questions using Pure CAG."""
     
+    # Bump when the system prompt template changes
+    PROMPT_VERSION = "1"
+    
     def __init__(self):
         self.llm = get_generator_llm()
+        self.chain = self._build_chain()
         self.collection_name = f"{self._get_collection_name()}_policy"
-        self.static_context = self._load_static_context()
+        self.prefix_hash = ""
+        self.cag_cache = get_cag_cache()
+        self.cag_cache.register("policy", self._load_static_context)
+    
+    @property
+    def static_context(self) -> str:
+        """Static policy context for the current knowledge base (loaded on first use)."""
+        return self.cag_cache.get("policy").text
+    
+    async def astatic_context(self) -> str:
+        """Static policy context, loaded off the event loop if it was never loaded."""
+        context = self.cag_cache.peek("policy")
+        if context is None:
+            context = await asyncio.to_thread(self.cag_cache.get, "policy")
+        return context.text
     
     def _get_collection_name(self) -> str:
         """Get the base collection name from settings."""
         from config import settings
         return settings.chroma_collection_name
     
-    def _load_static_context(self) -> str:
-        """Load static policy documents into context."""
+    def _load_static_context(self) -> Tuple[str, List[Document]]:
+        """Load static policy documents into context (the CAG cache's loader)."""
         # For Pure CAG, we load static documents upfront
         policy_docs = search_documents(
             query="terms of service privacy policy compliance",
             collection_name=self.collection_name,
             k=10
         )
+        policy_docs = build_static_context(policy_docs)
         
         context = "\n\n".join([
             f"Document {i+1}:\n{doc.page_content}" 
             for i, doc in enumerate(policy_docs)
         ])
         
-        return context if context else "No policy documents found."
+        context = context if context else "No policy documents found."
+        self.prefix_hash = register_prompt_prefix("policy", self.PROMPT_VERSION, self.prompt, context=context)
+        return context, policy_docs
     
     def _create_prompt(self) -> ChatPromptTemplate:
         """Create the prompt template for policy agent."""
@@ -52,25 +78,41 @@ Context:
 {context}
 
 Be concise, professional, and accurate."""),
+            MessagesPlaceholder("history", optional=True),
             ("human", "{question}")
         ])
     
+    def _build_chain(self):
+        """Build the generation chain for this agent (called once, in __init__)."""
+        self.prompt = self._create_prompt()
+        
+        return self.prompt | self.llm | StrOutputParser()
+    
     def process(self, question: str, chat_history: List[Dict[str, str]] = None) -> str:
         """Process a policy question using Pure CAG."""
         # Use static context (no retrieval at query time for Pure CAG)
-        prompt = self._create_prompt()
-        
-        chain = (
-            RunnablePassthrough()
-            | prompt
-            | self.llm
-            | StrOutputParser()
-        )
-        
-        result = chain.invoke({
-            "context": self.static_context,
-            "question": question
-        })
+        with span("generate"):
+            result = self.chain.invoke({
+                "context": self.static_context,
+                "history": history_to_messages(chat_history),
+                "question": question
+            })
         
         return result
+    
+    async def astream(self, question: str, chat_history: List[Dict[str, str]] = None) -> AsyncIterator[str]:
+        """Stream a policy answer chunk by chunk as the LLM generates it."""
+        context = await self.astatic_context()
+        with span("generate"):
+            async for chunk in self.chain.astream({
+                "context": context,
+                "history": history_to_messages(chat_history),
+                "question": question
+            }):
+                yield chunk
+    
+    async def aprocess(self, question: str, chat_history: List[Dict[str, str]] = None) -> str:
+        """Process a policy question using Pure CAG without blocking the event loop."""
+        chunks = [chunk async for chunk in self.astream(question, chat_history)]
+        return "".join(chunks)
 
@@ -0,0 +1,28 @@
+"""Static prompt prefixes, kept byte-stable so provider-side prompt caching can reuse them.
+
+Every agent prompt starts with a system message holding only invariant text
+(instructions, plus the cached static context of CAG agents); history and
+per-request content follow it. The prefix is hashed and published in metrics,
+so a prefix that changes between requests is visible.
+"""
+import hashlib
+from langchain_core.prompts import ChatPromptTemplate
+from metrics import record_prompt_prefix
+from session_store import estimate_tokens
+
+
+def prefix_hash(text: str) -> str:
+    """Short content hash of a prompt prefix."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def register_prompt_prefix(agent_type: str, version: str, prompt: ChatPromptTemplate, **static_values: str) -> str:
+    """Render the static system message of a prompt, publish its hash and return it.
+
+    version identifies the prompt template; bump it whenever the template text
+    changes, so the metric distinguishes template edits from context refreshes.
+    """
+    prefix = prompt.messages[0].format(**static_values).content
+    digest = prefix_hash(prefix)
+    record_prompt_prefix(agent_type, version, digest, estimate_tokens(prefix))
+    return digest
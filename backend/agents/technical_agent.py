@@ -1,17 +1,26 @@
 """Technical Support Agent - Pure RAG (Retrieval Augmented Generation)."""
-from typing import Dict, Any, List
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from typing import Dict, Any, List, AsyncIterator, Optional
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.documents import Document
 from llm_providers import get_generator_llm
-from vector_store import search_documents
+from retrieval import retrieve_documents, aretrieve_documents, aretrieve_documents_batch
+from metrics import span
+from agents.context_builder import build_context
+from agents.prompt_prefix import register_prompt_prefix
+from session_store import history_to_messages
 
 
 class TechnicalAgent:
     """Agent for handling technical support questions using Pure RAG."""
     
+    # Bump when the system prompt template changes
+    PROMPT_VERSION = "1"
+    
     def __init__(self):
         self.llm = get_generator_llm()
+        self.chain = self._build_chain()
+        self.prefix_hash = register_prompt_prefix("technical", self.PROMPT_VERSION, self.prompt)
         self.collection_name = f"{self._get_collection_name()}_technical"
     
     def _get_collection_name(self) -> str:
@@ -20,9 +29,20 @@ class TechnicalAgent:
         return settings.chroma_collection_name
     
     def _retrieve_context(self, question: str, k: int = 5) -> str:
-        """Retrieve relevant context from vector store."""
-        docs = search_documents(question, self.collection_name, k=k)
-        
+        """Retrieve relevant context (vector, keyword or hybrid search)."""
+        docs = retrieve_documents(question, self.collection_name, k=k)
+        with span("prompt_assembly"):
+            return self._format_context(docs)
+    
+    async def _aretrieve_context(self, question: str, k: int = 5) -> str:
+        """Retrieve relevant context asynchronously."""
+        docs = await aretrieve_documents(question, self.collection_name, k=k)
+        with span("prompt_assembly"):
+            return self._format_context(docs)
+    
+    def _format_context(self, docs: List[Document]) -> str:
+        """Deduplicate and pack retrieved documents into a context block."""
+        docs = build_context(docs)
         if not docs:
             return "No relevant technical documentation found."
         
@@ -43,6 +63,7 @@ Use the retrieved technical documentation to provide accurate solutions. If the
 doesn't contain the answer, suggest troubleshooting steps or escalate to human support.
 
 Be helpful, clear, and provide step-by-step instructions when possible."""),
+            MessagesPlaceholder("history", optional=True),
             ("human", """Context from knowledge base:
 {context}
 
@@ -51,24 +72,67 @@ User Question: {question}
 Please provide a helpful technical response based on the context above.""")
         ])
     
-    def process(self, question: str, chat_history: List[Dict[str, str]] = None) -> str:
-        """Process a technical question using Pure RAG."""
-        # Retrieve relevant context (RAG)
-        context = self._retrieve_context(question)
+    def _build_chain(self):
+        """Build the generation chain for this agent (called once, in __init__)."""
+        self.prompt = self._create_prompt()
         
-        prompt = self._create_prompt()
+        return self.prompt | self.llm | StrOutputParser()
+    
+    def retrieve(self, question: str) -> str:
+        """The retrieval step on its own, so it can run speculatively during routing."""
+        return self._retrieve_context(question)
+    
+    async def aretrieve(self, question: str) -> str:
+        """The retrieval step on its own, asynchronously."""
+        return await self._aretrieve_context(question)
+    
+    async def aretrieve_batch(self, questions: List[str]) -> List[str]:
+        """The retrieval step for many questions, with one batched embedding and search."""
+        results = await aretrieve_documents_batch(questions, self.collection_name, k=5)
+        with span("prompt_assembly"):
+            return [self._format_context(docs) for docs in results]
+    
+    def process(self, question: str, chat_history: List[Dict[str, str]] = None, retrieved: Optional[str] = None) -> str:
+        """Process a technical question using Pure RAG.
         
-        chain = (
-            RunnablePassthrough()
-            | prompt
-            | self.llm
-            | StrOutputParser()
-        )
+        retrieved is the result of retrieve() if it already ran for this question.
+        """
+        # Retrieve relevant context (RAG)
+        context = self._retrieve_context(question) if retrieved is None else retrieved
         
-        result = chain.invoke({
-            "context": context,
-            "question": question
-        })
+        with span("generate"):
+            result = self.chain.invoke({
+                "context": context,
+                "history": history_to_messages(chat_history),
+                "question": question
+            })
         
         return result
+    
+    async def astream(
+        self,
+        question: str,
+        chat_history: List[Dict[str, str]] = None,
+        retrieved: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream a technical answer chunk by chunk as the LLM generates it."""
+        context = await self._aretrieve_context(question) if retrieved is None else retrieved
+        
+        with span("generate"):
+            async for chunk in self.chain.astream({
+                "context": context,
+                "history": history_to_messages(chat_history),
+                "question": question
+            }):
+                yield chunk
+    
+    async def aprocess(
+        self,
+        question: str,
+        chat_history: List[Dict[str, str]] = None,
+        retrieved: Optional[str] = None
+    ) -> str:
+        """Process a technical question using Pure RAG without blocking the event loop."""
+        chunks = [chunk async for chunk in self.astream(question, chat_history, retrieved)]
+        return "".join(chunks)
 
@@ -0,0 +1,290 @@
+"""Bulk answering: many stand-alone questions with batched routing and retrieval."""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+from config import settings
+from llm_providers import is_rate_limit_error
+from metrics import agent_scope, record_error
+from agents.orchestrator import RETRIEVING_AGENTS, OrchestratorAgent
+
+
+logger = logging.getLogger(__name__)
+
+
+def _ms(seconds: float) -> float:
+    """Seconds as rounded milliseconds."""
+    return round(seconds * 1000, 1)
+
+
+class BatchItem:
+    """One question of a batch, with its answers and stage timings."""
+    
+    __slots__ = ("id", "message", "agent_types", "retrieved", "responses", "timing", "error", "started", "pending")
+    
+    def __init__(self, item_id: str, message: str):
+        self.id = item_id
+        self.message = message
+        self.agent_types: List[str] = []
+        self.retrieved: Dict[str, Any] = {}
+        self.responses: Dict[str, str] = {}
+        self.timing: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.started = time.perf_counter()
+        self.pending = 0
+    
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any], index: int) -> "BatchItem":
+        """Build an item from an input record; "question" is accepted for "message"."""
+        item_id = raw.get("id")
+        message = raw.get("message") or raw.get("question") or ""
+        return cls(str(index) if item_id is None else str(item_id), str(message).strip())
+
+
+class BatchRunner:
+    """Answers batches of stand-alone questions through the worker agents.
+
+    Questions are taken in chunks of settings.batch_chunk_size. Each chunk is
+    classified together (local router first, concurrent router LLM calls for
+    the rest), grouped by agent and retrieved with one batched embedding and
+    search per agent. Generation then runs with at most `concurrency` calls in
+    flight while the next chunk is already being routed and retrieved. A
+    generation rejected by a provider rate limit pauses every worker for an
+    exponential backoff and is retried.
+
+    No session history is read or written, and the response cache is not
+    used, so every question gets a fresh answer. Route and retrieve timings
+    are those of the batch an item was part of.
+    """
+    
+    def __init__(self, orchestrator: OrchestratorAgent, concurrency: Optional[int] = None):
+        self.orchestrator = orchestrator
+        self.concurrency = max(concurrency or settings.batch_max_concurrency, 1)
+        self._paused_until = 0.0
+    
+    async def _retrieve(self, agent_type: str, items: List[BatchItem]) -> None:
+        """Retrieve the context of every question routed to one agent in one batch."""
+        started = time.perf_counter()
+        try:
+            with agent_scope(agent_type):
+                retrieved = await self.orchestrator.get_agent(agent_type).aretrieve_batch(
+                    [item.message for item in items]
+                )
+        except Exception as e:
+            # Each generation then retrieves its own context
+            logger.error("Error in batched %s retrieval: %s", agent_type, e)
+            record_error("batch_retrieval")
+            return
+        
+        elapsed = _ms(time.perf_counter() - started)
+        for item, context in zip(items, retrieved):
+            item.retrieved[agent_type] = context
+            item.timing["retrieve_ms"] = max(item.timing.get("retrieve_ms", 0.0), elapsed)
+    
+    async def _prepare(self, chunk: List[BatchItem]) -> List[Tuple[BatchItem, str]]:
+        """Route and retrieve a chunk; returns its (item, agent type) generation jobs."""
+        started = time.perf_counter()
+        routes = await self.orchestrator.aclassify_batch([item.message for item in chunk])
+        elapsed = _ms(time.perf_counter() - started)
+        
+        groups: Dict[str, List[BatchItem]] = {}
+        for item, agent_types in zip(chunk, routes):
+            item.agent_types = agent_types
+            item.pending = len(agent_types)
+            item.timing["route_ms"] = elapsed
+            for agent_type in agent_types:
+                groups.setdefault(agent_type, []).append(item)
+        
+        await asyncio.gather(*(
+            self._retrieve(agent_type, items)
+            for agent_type, items in groups.items()
+            if agent_type in RETRIEVING_AGENTS
+        ))
+        return [(item, agent_type) for item in chunk for agent_type in item.agent_types]
+    
+    async def _wait_for_rate_limit(self) -> None:
+        """Sleep while a rate-limit pause is in effect."""
+        delay = self._paused_until - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._paused_until - time.monotonic()
+    
+    async def _generate(self, item: BatchItem, agent_type: str) -> None:
+        """Generate one agent's answer to an item, retrying on rate limits."""
+        agent = self.orchestrator.get_agent(agent_type)
+        retrieved = item.retrieved.get(agent_type)
+        for attempt in range(settings.batch_max_retries + 1):
+            await self._wait_for_rate_limit()
+            started = time.perf_counter()
+            try:
+                with agent_scope(agent_type):
+                    if retrieved is None:
+                        response = await agent.aprocess(item.message)
+                    else:
+                        response = await agent.aprocess(item.message, None, retrieved)
+            except Exception as e:
+                if is_rate_limit_error(e) and attempt < settings.batch_max_retries:
+                    delay = settings.batch_retry_backoff_seconds * 2 ** attempt
+                    logger.warning("Rate limited by the LLM provider, pausing batch generations for %.1fs", delay)
+                    record_error("batch_rate_limited")
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    continue
+                logger.error("Error answering batch item %s: %s", item.id, e)
+                record_error("batch_generate")
+                item.error = str(e)
+                return
+            
+            item.responses[agent_type] = response
+            item.timing["generate_ms"] = max(item.timing.get("generate_ms", 0.0), _ms(time.perf_counter() - started))
+            return
+    
+    def _result(self, item: BatchItem) -> Dict[str, Any]:
+        """Output record of a finished item."""
+        response = ""
+        if item.error is None:
+            response = "\n\n".join(self.orchestrator.response_sections(item.agent_types, item.responses))
+        item.timing["total_ms"] = _ms(time.perf_counter() - item.started)
+        return {
+            "id": item.id,
+            "message": item.message,
+            "response": response,
+            "agent_type": item.agent_types[0] if item.agent_types else "",
+            "agent_types": item.agent_types,
+            "error": item.error,
+            "timing": item.timing,
+        }
+    
+    async def _produce(self, items: Iterable[Dict[str, Any]], jobs: asyncio.Queue, results: asyncio.Queue) -> None:
+        """Route and retrieve the input chunk by chunk, queueing generation jobs."""
+        chunk: List[BatchItem] = []
+        for index, raw in enumerate(items):
+            item = BatchItem.from_dict(raw, index)
+            if not item.message:
+                item.error = "Missing message"
+                await results.put(self._result(item))
+                continue
+            
+            chunk.append(item)
+            if len(chunk) >= settings.batch_chunk_size:
+                for job in await self._prepare(chunk):
+                    await jobs.put(job)
+                chunk = []
+        
+        if chunk:
+            for job in await self._prepare(chunk):
+                await jobs.put(job)
+    
+    async def _work(self, jobs: asyncio.Queue, results: asyncio.Queue) -> None:
+        """Generate answers until the end-of-input marker."""
+        while True:
+            job = await jobs.get()
+            if job is None:
+                return
+            
+            item, agent_type = job
+            await self._generate(item, agent_type)
+            item.pending -= 1
+            if item.pending == 0:
+                await results.put(self._result(item))
+    
+    async def _run_all(self, items: Iterable[Dict[str, Any]], jobs: asyncio.Queue, results: asyncio.Queue) -> None:
+        """Run the producer and the workers, then mark the end of the results."""
+        workers = [asyncio.create_task(self._work(jobs, results)) for _ in range(self.concurrency)]
+        try:
+            await self._produce(items, jobs, results)
+            for _ in workers:
+                await jobs.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await results.put(None)
+    
+    async def run(self, items: Iterable[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Answer every input record, yielding each result as soon as it is done.
+
+        Records are {"id": ..., "message": ...}; results arrive in completion
+        order, not input order, and carry the id to match them up.
+        """
+        jobs: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue()
+        runner = asyncio.create_task(self._run_all(items, jobs, results))
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield result
+            await runner
+        finally:
+            runner.cancel()
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Input records of a JSONL file, skipping blank and malformed lines."""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_number}: {e}", file=sys.stderr)
+                continue
+            if isinstance(record, dict):
+                record.setdefault("id", str(line_number))
+                yield record
+
+
+async def arun(input_path: str, output_path: Optional[str] = None, concurrency: Optional[int] = None) -> Dict[str, int]:
+    """Answer a JSONL file of questions, writing JSONL results as they complete."""
+    orchestrator = OrchestratorAgent()
+    orchestrator.warm_up()
+    runner = BatchRunner(orchestrator, concurrency)
+    
+    stats = {"ok": 0, "error": 0}
+    out = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    try:
+        async for result in runner.run(read_jsonl(input_path)):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            stats["error" if result["error"] else "ok"] += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return stats
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in bulk.")
+    parser.add_argument("input", help='JSONL file with one {"id": ..., "message": ...} record per line')
+    parser.add_argument("--output", "-o", help="JSONL file for the results (default: stdout)")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help=f"Generations in flight at once (default: {settings.batch_max_concurrency})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(input_path: str, output_path: Optional[str] = None, concurrency: Optional[int] = None):
+    """Bulk answering entry point; progress goes to stderr so results can go to stdout."""
+    started = time.perf_counter()
+    stats = asyncio.run(arun(input_path, output_path, concurrency))
+    elapsed = time.perf_counter() - started
+    answered = stats["ok"] + stats["error"]
+    print(
+        f"Answered {answered} questions in {elapsed:.1f}s ({answered / elapsed if elapsed else 0:.1f}/s), "
+        f"{stats['error']} failed",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.input, args.output, args.concurrency)
@@ -0,0 +1 @@
+"""Offline benchmarks that run without API keys or network access."""
@@ -0,0 +1,206 @@
+"""Offline load test of the HTTP API with stubbed LLMs and local embeddings.
+
+The LLMs are replaced by stubs with configurable latency and the OpenAI
+embeddings by a deterministic hashing embedder, so the whole stack (FastAPI,
+orchestrator, Chroma retrieval) runs without network access or API keys. The
+knowledge base in data/ is ingested into a temporary Chroma directory with the
+hashing embedder first. /chat and /chat/stream are driven in-process through
+httpx's ASGI transport at fixed concurrency levels.
+
+Usage (from backend/):
+    python benchmarks/bench_api.py --concurrency 1,8,32 --requests 200
+"""
+import argparse
+import asyncio
+import functools
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from config import settings
+from benchmarks.stats import StageRecorder, format_ms, summarize
+from benchmarks.stubs import install_stub_embeddings, install_stub_llms
+
+QUERIES = [
+    "How do I get my invoice?",
+    "Can I get a refund for my subscription?",
+    "What payment methods do you accept?",
+    "How do I upgrade my plan?",
+    "The API keeps timing out",
+    "How do I reset my password?",
+    "My integration returns a 401 error",
+    "How do I configure webhooks?",
+    "What data do you collect?",
+    "How do you handle GDPR requests?",
+    "What are your terms of service?",
+    "How long do you retain my data?",
+]
+
+
+def install_stage_timers(recorder: StageRecorder) -> None:
+    """Time routing and retrieval by wrapping the functions the request path calls.
+
+    Generation is timed by the stub LLMs themselves.
+    """
+    from agents import billing_agent, policy_agent, technical_agent
+    from agents.orchestrator import OrchestratorAgent
+    
+    def timed(stage, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with recorder.time(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    
+    def atimed(stage, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with recorder.time(stage):
+                return await func(*args, **kwargs)
+        return wrapper
+    
+    OrchestratorAgent._classify_query = timed("route", OrchestratorAgent._classify_query)
+    OrchestratorAgent._aclassify_query = atimed("route", OrchestratorAgent._aclassify_query)
+    for module in (billing_agent, policy_agent, technical_agent):
+        for name in ("search_documents", "search_documents_batch", "retrieve_documents"):
+            if hasattr(module, name):
+                setattr(module, name, timed("retrieve", getattr(module, name)))
+            if hasattr(module, f"a{name}"):
+                setattr(module, f"a{name}", atimed("retrieve", getattr(module, f"a{name}")))
+
+
+def ingest_knowledge_base(db_path: str) -> None:
+    """Ingest data/ into a scratch Chroma directory with the active embeddings."""
+    import ingest_data
+    from vector_store import get_registry, reload_vector_stores
+    
+    settings.chroma_db_path = db_path
+    started = time.perf_counter()
+    ingest_data.ingest(ingest_data.DATA_DIR, get_registry().get_embeddings(), full=True)
+    reload_vector_stores()
+    print(f"Ingested knowledge base in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+def install_first_token_timer(api, recorder: StageRecorder) -> None:
+    """Record time to the first answer token of /chat/stream on the server side.
+
+    httpx's ASGI transport hands the body over only once the response is
+    complete, so the client cannot observe when the first token was sent.
+    """
+    stream_chat_response = api.stream_chat_response
+    
+    async def timed_stream(*args, **kwargs):
+        started = time.perf_counter()
+        first_token_seen = False
+        async for chunk in stream_chat_response(*args, **kwargs):
+            if not first_token_seen and '"token": ""' not in chunk:
+                recorder.record("first_token", time.perf_counter() - started)
+                first_token_seen = True
+            yield chunk
+    
+    api.stream_chat_response = timed_stream
+
+
+async def send_chat(client: httpx.AsyncClient, query: str, session_id: str) -> float:
+    """POST /chat and time the full response."""
+    started = time.perf_counter()
+    response = await client.post("/chat", json={"message": query, "session_id": session_id})
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def send_stream(client: httpx.AsyncClient, query: str, session_id: str) -> float:
+    """POST /chat/stream and time the full stream."""
+    started = time.perf_counter()
+    async with client.stream("POST", "/chat/stream", json={"message": query, "session_id": session_id}) as response:
+        response.raise_for_status()
+        async for _ in response.aiter_lines():
+            pass
+    return time.perf_counter() - started
+
+
+async def run_level(app, endpoint: str, concurrency: int, total: int) -> Dict[str, object]:
+    """Send `total` requests with at most `concurrency` in flight."""
+    send = send_stream if endpoint == "stream" else send_chat
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    
+    # Fresh sessions every level and run, so no request is routed by the previous turn
+    run_id = f"{endpoint}-{concurrency}-{uuid.uuid4().hex[:6]}"
+    
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i: int) -> float:
+            async with semaphore:
+                return await send(client, QUERIES[i % len(QUERIES)], f"bench-{run_id}-{i}")
+        
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(total)))
+        wall = time.perf_counter() - started
+    
+    return {
+        "latency": summarize(results),
+        "rps": total / wall if wall else 0.0,
+    }
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--endpoint", choices=["chat", "stream", "both"], default="both")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per generator call")
+    parser.add_argument("--router-latency", type=float, default=0.05, help="Seconds per router call")
+    parser.add_argument("--embedding-latency", type=float, default=0.01, help="Seconds per embedding call")
+    parser.add_argument("--mode", choices=["async", "threadpool"], default=settings.orchestrator_mode)
+    parser.add_argument("--fast-router", action="store_true", help="Route with the local classifier first")
+    parser.add_argument("--response-cache", action="store_true", help="Allow answers to be served from cache")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    levels: List[int] = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    endpoints = ["chat", "stream"] if args.endpoint == "both" else [args.endpoint]
+    
+    settings.orchestrator_mode = args.mode
+    settings.fast_router_enabled = args.fast_router
+    settings.response_cache_enabled = args.response_cache
+    settings.embedding_cache_path = None
+    settings.warmup_on_startup = False
+    
+    recorder = StageRecorder()
+    install_stub_llms(latency=args.llm_latency, router_latency=args.router_latency, recorder=recorder)
+    install_stub_embeddings(latency=args.embedding_latency)
+    install_stage_timers(recorder)
+    
+    db_path = tempfile.mkdtemp(prefix="bench-chroma-")
+    try:
+        ingest_knowledge_base(db_path)
+        
+        import main as api
+        api.warm_up()
+        install_first_token_timer(api, recorder)
+        
+        for endpoint in endpoints:
+            for concurrency in levels:
+                recorder.reset()
+                result = asyncio.run(run_level(api.app, endpoint, concurrency, args.requests))
+                print(f"\n/{'chat/stream' if endpoint == 'stream' else 'chat'} concurrency={concurrency} rps={result['rps']:.1f}")
+                print(f"  latency     {format_ms(result['latency'])}")
+                for stage, summary in sorted(recorder.summaries().items()):
+                    print(f"  {stage:<11} {format_ms(summary)}")
+    finally:
+        shutil.rmtree(db_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Micro-benchmark of the orchestrator's per-request Python overhead.
+
+The LLMs and retrieval are stubbed to answer instantly, so the measured time
+is what LangGraph, the LangChain runnables and our own glue code cost per
+request. Run it before and after touching the request path to catch
+regressions.
+
+Usage (from backend/):
+    python benchmarks/bench_orchestrator.py --iterations 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from benchmarks.stats import format_ms, summarize
+from benchmarks.stubs import install_stub_llms, install_stub_retrieval
+
+QUERIES = [
+    "How do I get my invoice?",
+    "The API keeps timing out",
+    "What data do you collect?",
+]
+
+
+def bench_sync(orchestrator, iterations: int) -> list:
+    """Time orchestrator.process()."""
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        orchestrator.process(QUERIES[i % len(QUERIES)], session_id="bench")
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def bench_async(orchestrator, iterations: int) -> list:
+    """Time orchestrator.aprocess()."""
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await orchestrator.aprocess(QUERIES[i % len(QUERIES)], session_id="bench")
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def bench_stream(orchestrator, iterations: int) -> list:
+    """Time a fully consumed orchestrator.astream()."""
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        async for _ in orchestrator.astream(QUERIES[i % len(QUERIES)], session_id="bench"):
+            pass
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--fast-router", action="store_true", help="Route with the local classifier first")
+    args = parser.parse_args()
+    
+    # Measure the full path every time: no answer reuse, LLM routing unless asked
+    settings.response_cache_enabled = False
+    settings.fast_router_enabled = args.fast_router
+    
+    install_stub_llms()
+    install_stub_retrieval()
+    
+    from agents.orchestrator import OrchestratorAgent
+    
+    started = time.perf_counter()
+    orchestrator = OrchestratorAgent()
+    orchestrator.warm_up()
+    print(f"Construction + warm-up: {(time.perf_counter() - started) * 1000:.1f}ms")
+    
+    bench_sync(orchestrator, args.warmup)
+    asyncio.run(bench_async(orchestrator, args.warmup))
+    
+    print(f"process()  {format_ms(summarize(bench_sync(orchestrator, args.iterations)))}")
+    print(f"aprocess() {format_ms(summarize(asyncio.run(bench_async(orchestrator, args.iterations))))}")
+    print(f"astream()  {format_ms(summarize(asyncio.run(bench_stream(orchestrator, args.iterations))))}")
+
+
+if __name__ == "__main__":
+    main()
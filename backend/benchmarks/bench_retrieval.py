@@ -0,0 +1,149 @@
+"""Compare retrieval latency and overlap of the Chroma and NumPy backends.
+
+The knowledge base in data/ is ingested into a temporary directory with the
+deterministic hashing embedder, optionally padded with noisy copies of the
+real chunks to simulate a larger collection. Query embeddings are cached after the first
+lookup, so the timings are dominated by the vector search itself.
+
+Usage (from backend/):
+    python benchmarks/bench_retrieval.py --synthetic 100000 --iterations 200
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+import numpy as np
+from config import settings
+from benchmarks.stats import format_ms, summarize
+from benchmarks.stubs import install_stub_embeddings
+
+QUERIES = [
+    "The API keeps timing out",
+    "How do I reset my password?",
+    "My integration returns a 401 error",
+    "How do I configure webhooks?",
+    "What are the system requirements?",
+]
+
+
+def add_synthetic_vectors(collection_name: str, count: int, noise: float = 0.5, batch_size: int = 5000) -> None:
+    """Pad a collection with noisy copies of its real chunk vectors.
+    
+    The padding clusters around real content the way a larger knowledge base
+    would, unlike uniformly random vectors that no index can partition.
+    """
+    client = chromadb.PersistentClient(path=settings.chroma_db_path)
+    collection = client.get_collection(collection_name)
+    bases = np.asarray(collection.get(include=["embeddings"])["embeddings"], dtype=np.float32)
+    rng = np.random.default_rng(0)
+    
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        jitter = rng.standard_normal((size, bases.shape[1])).astype(np.float32)
+        jitter *= noise / np.sqrt(bases.shape[1])
+        vectors = bases[rng.integers(len(bases), size=size)] + jitter
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        collection.add(
+            ids=[f"synthetic-{start + i}" for i in range(size)],
+            embeddings=vectors.tolist(),
+            documents=[f"Synthetic chunk {start + i}" for i in range(size)],
+            metadatas=[{"source": "synthetic"} for _ in range(size)],
+        )
+
+
+def bench_backend(backend: str, collection_name: str, iterations: int, k: int) -> tuple:
+    """Time search_documents() and search_documents_batch() with one backend.
+    
+    Returns (single-query samples, batch samples, results per query).
+    """
+    from vector_store import reload_vector_stores, search_documents, search_documents_batch
+    
+    settings.retrieval_backend = backend
+    reload_vector_stores()
+    results = {query: search_documents(query, collection_name, k=k) for query in QUERIES}
+    
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        search_documents(QUERIES[i % len(QUERIES)], collection_name, k=k)
+        samples.append(time.perf_counter() - started)
+    
+    # One batch answers every query, so it is compared per query
+    batch_samples = []
+    for _ in range(max(1, iterations // len(QUERIES))):
+        started = time.perf_counter()
+        search_documents_batch(QUERIES, collection_name, k=k)
+        batch_samples.append((time.perf_counter() - started) / len(QUERIES))
+    return samples, batch_samples, results
+
+
+def exact_results(collection_name: str, embeddings, k: int) -> dict:
+    """Brute-force top-k documents per query, the ground truth for recall."""
+    from numpy_index import NumpyIndex
+    
+    index = NumpyIndex.load(collection_name)
+    index.ivf = None
+    return {
+        query: index.search_documents(embeddings.embed_query(query), k)[0]
+        for query in QUERIES
+    }
+
+
+def recall(results: dict, exact: dict) -> float:
+    """Average share of the exact top-k that a backend returned."""
+    shares = []
+    for query, expected_docs in exact.items():
+        expected = {doc.page_content for doc in expected_docs}
+        found = {doc.page_content for doc in results[query]}
+        shares.append(len(expected & found) / len(expected) if expected else 1.0)
+    return sum(shares) / len(shares)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--synthetic", type=int, default=0, help="Noisy copies of real chunks added to the technical collection")
+    parser.add_argument("--ivf-threshold", type=int, default=settings.numpy_index_ivf_threshold)
+    parser.add_argument("--nprobe", type=int, default=settings.numpy_index_ivf_nprobe)
+    args = parser.parse_args()
+    
+    settings.numpy_index_ivf_threshold = args.ivf_threshold
+    settings.numpy_index_ivf_nprobe = args.nprobe
+    settings.embedding_cache_path = None
+    install_stub_embeddings(dimensions=args.dimensions)
+    
+    import ingest_data
+    from vector_store import get_registry
+    
+    settings.chroma_db_path = tempfile.mkdtemp(prefix="bench-retrieval-")
+    collection_name = f"{settings.chroma_collection_name}_technical"
+    try:
+        embeddings = get_registry().get_embeddings()
+        ingest_data.ingest(ingest_data.DATA_DIR, embeddings, full=True)
+        if args.synthetic:
+            started = time.perf_counter()
+            add_synthetic_vectors(collection_name, args.synthetic)
+            print(f"Added {args.synthetic} synthetic vectors in {time.perf_counter() - started:.1f}s")
+            client = chromadb.PersistentClient(path=settings.chroma_db_path)
+            ingest_data.export_indexes(client, embeddings.model_name, force=True)
+        
+        exact = exact_results(collection_name, embeddings, args.k)
+        for backend in ("chroma", "numpy"):
+            samples, batch_samples, results = bench_backend(backend, collection_name, args.iterations, args.k)
+            print(f"{backend:<6} {format_ms(summarize(samples))} recall@{args.k}={recall(results, exact):.2%}")
+            print(f"{backend:<6} batch of {len(QUERIES)}, per query: {format_ms(summarize(batch_samples))}")
+    finally:
+        shutil.rmtree(settings.chroma_db_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Latency summary helpers for the benchmarks."""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Mean and tail percentiles of a list of durations in seconds."""
+    return {
+        "count": len(samples),
+        "mean": sum(samples) / len(samples) if samples else 0.0,
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
+
+
+def format_ms(summary: Dict[str, float]) -> str:
+    """Render a summary in milliseconds."""
+    return (
+        f"n={summary['count']:<6} mean={summary['mean'] * 1000:8.3f}ms "
+        f"p50={summary['p50'] * 1000:8.3f}ms p95={summary['p95'] * 1000:8.3f}ms "
+        f"p99={summary['p99'] * 1000:8.3f}ms"
+    )
+
+
+class StageRecorder:
+    """Thread-safe collector of durations per named stage."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+    
+    def record(self, stage: str, seconds: float) -> None:
+        """Add one duration sample for a stage."""
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+    
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one sample of a stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+    
+    def reset(self) -> None:
+        """Drop all samples."""
+        with self._lock:
+            self.samples = {}
+    
+    def summaries(self) -> Dict[str, Dict[str, float]]:
+        """Latency summary of every stage."""
+        with self._lock:
+            return {stage: summarize(samples) for stage, samples in self.samples.items()}
@@ -0,0 +1,230 @@
+"""Stub LLMs and retrieval so the orchestrator can run without network access."""
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence, Union
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+ROUTER_KEYWORDS = {
+    "billing": ("invoice", "bill", "price", "pricing", "payment", "refund", "subscription", "plan"),
+    "policy": ("privacy", "terms", "gdpr", "compliance", "policy", "data"),
+}
+
+STUB_DOCUMENTS = [
+    Document(
+        page_content="Stubbed knowledge base passage used for offline benchmarking.",
+        metadata={"source": "stub.txt", "category": "stub", "chunk_index": 0},
+    )
+]
+
+
+def route_by_keyword(text: str) -> str:
+    """Deterministic stand-in for the router LLM's decision."""
+    lowered = text.lower()
+    for agent_type, keywords in ROUTER_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return agent_type
+    return "technical"
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that replies after a fixed latency without calling any API.
+    
+    Router prompts get a JSON routing decision; everything else gets a canned
+    answer, streamed word by word when streaming is requested. If a recorder
+    is set, the duration of every call is reported under `stage`.
+    """
+    
+    latency: float = 0.0
+    answer: str = "Thanks for reaching out. Here is a stubbed answer to your question."
+    stage: str = "generate"
+    recorder: Optional[Any] = None
+    
+    def _record(self, started: float) -> None:
+        """Report a call's duration to the recorder, if any."""
+        if self.recorder is not None:
+            self.recorder.record(self.stage, time.perf_counter() - started)
+    
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+    
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        """Pick the reply for a prompt."""
+        if messages and "query router" in str(messages[0].content):
+            return json.dumps({"agent": route_by_keyword(str(messages[-1].content))})
+        return self.answer
+    
+    def _chunks(self, text: str) -> List[str]:
+        """Split a reply into streamed chunks."""
+        words = text.split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+    
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        result = ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+        self._record(started)
+        return result
+    
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        started = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        result = ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+        self._record(started)
+        return result
+    
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        chunks = self._chunks(self._reply(messages))
+        for text in chunks:
+            if self.latency:
+                time.sleep(self.latency / len(chunks))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+        self._record(started)
+    
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        chunks = self._chunks(self._reply(messages))
+        for text in chunks:
+            if self.latency:
+                await asyncio.sleep(self.latency / len(chunks))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+        self._record(started)
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings via feature hashing.
+    
+    Texts sharing words get similar vectors, which is enough for retrieval to
+    behave plausibly offline. `latency` simulates one API round-trip per call.
+    """
+    
+    def __init__(self, dimensions: int = 256, latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.model = f"hashing-{dimensions}"
+    
+    def _embed(self, text: str) -> List[float]:
+        """Hash each token into a signed bucket and L2-normalize."""
+        vector = [0.0] * self.dimensions
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def install_stub_llms(latency: float = 0.0, router_latency: Optional[float] = None, recorder: Optional[Any] = None) -> None:
+    """Make the LLM provider factories return stub models.
+    
+    Agent modules import the factories by name, so they are patched there too.
+    Must be called before the orchestrator is constructed.
+    """
+    import llm_providers
+    from agents import billing_agent, orchestrator, policy_agent, technical_agent
+    
+    from metrics import LLMMetricsCallback
+    
+    router_latency = latency if router_latency is None else router_latency
+    
+    def stub_router_llm(*args, **kwargs) -> StubChatModel:
+        return StubChatModel(
+            latency=router_latency, stage="route_llm", recorder=recorder,
+            callbacks=[LLMMetricsCallback("router")],
+        )
+    
+    def stub_generator_llm(*args, **kwargs) -> StubChatModel:
+        return StubChatModel(
+            latency=latency, stage="generate", recorder=recorder,
+            callbacks=[LLMMetricsCallback("generator")],
+        )
+    
+    llm_providers.get_router_llm = stub_router_llm
+    llm_providers.get_generator_llm = stub_generator_llm
+    orchestrator.get_router_llm = stub_router_llm
+    for module in (billing_agent, policy_agent, technical_agent):
+        module.get_generator_llm = stub_generator_llm
+
+
+def install_stub_embeddings(dimensions: int = 256, latency: float = 0.0) -> HashingEmbeddings:
+    """Make the vector store registry (and thus ingestion) use hashing embeddings."""
+    from vector_store import CachedEmbeddings, get_registry
+    
+    embeddings = HashingEmbeddings(dimensions=dimensions, latency=latency)
+    get_registry().set_embeddings(CachedEmbeddings(embeddings))
+    return embeddings
+
+
+def install_stub_retrieval(documents: Optional[List[Document]] = None) -> None:
+    """Make every retrieval path return fixed documents instantly.
+    
+    The search functions are patched where they are defined and in every
+    module that imports them by name, so single, hybrid, speculative and
+    batched retrieval never embed or search anything.
+    """
+    import retrieval
+    import vector_store
+    from agents import billing_agent, policy_agent, technical_agent
+    
+    documents = STUB_DOCUMENTS if documents is None else documents
+    
+    def search(query: str, collection_name: str, k: int = 5) -> List[Document]:
+        return documents[:k]
+    
+    async def asearch(query: str, collection_name: str, k: int = 5) -> List[Document]:
+        return documents[:k]
+    
+    def search_batch(queries: Sequence[str], collection_name: str, k: Union[int, Sequence[int]] = 5) -> List[List[Document]]:
+        sizes = [k] * len(queries) if isinstance(k, int) else list(k)
+        return [documents[:size] for size in sizes]
+    
+    async def asearch_batch(queries: Sequence[str], collection_name: str, k: Union[int, Sequence[int]] = 5) -> List[List[Document]]:
+        return search_batch(queries, collection_name, k)
+    
+    stubs = {
+        "search_documents": search,
+        "asearch_documents": asearch,
+        "search_documents_batch": search_batch,
+        "asearch_documents_batch": asearch_batch,
+        "retrieve_documents": search,
+        "aretrieve_documents": asearch,
+        "aretrieve_documents_batch": asearch_batch,
+    }
+    for module in (vector_store, retrieval, billing_agent, policy_agent, technical_agent):
+        for name, stub in stubs.items():
+            if hasattr(module, name):
+                setattr(module, name, stub)
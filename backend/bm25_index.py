@@ -0,0 +1,135 @@
+"""BM25 keyword index over a collection's chunks, for exact terms dense retrieval misses."""
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from config import index_dir
+
+
+# Subdirectory of the index files, see config.index_dir()
+INDEX_DIR = "bm25_index"
+
+# Okapi BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words and numbers, keeping identifiers joined by . _ - : / whole
+# (error codes like ERR-429, config keys like api.timeout_ms)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._\-:/][a-z0-9]+)*")
+TOKEN_SEPARATORS = re.compile(r"[._\-:/]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it my of on or so "
+    "that the this to was what when where which why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound identifiers also contribute their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = TOKEN_SEPARATORS.split(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part not in STOPWORDS)
+    return tokens
+
+
+def build_index(
+    collection_name: str,
+    documents: List[str],
+    metadatas: List[Dict[str, Any]],
+    directory: Optional[str] = None
+) -> None:
+    """Write the term postings and documents of a collection."""
+    directory = directory or index_dir(INDEX_DIR)
+    os.makedirs(directory, exist_ok=True)
+    
+    postings: Dict[str, List[List[int]]] = {}
+    lengths = []
+    for row, text in enumerate(documents):
+        counts = Counter(tokenize(text or ""))
+        lengths.append(sum(counts.values()))
+        for term, count in counts.items():
+            postings.setdefault(term, []).append([row, count])
+    
+    payload = {"documents": documents, "metadatas": metadatas, "lengths": lengths, "postings": postings}
+    path = os.path.join(directory, f"{collection_name}.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def export_collection(collection, directory: Optional[str] = None) -> int:
+    """Export a Chroma collection to a BM25 index; returns the number of chunks."""
+    data = collection.get(include=["documents", "metadatas"])
+    build_index(collection.name, data["documents"], data["metadatas"], directory)
+    return len(data["ids"])
+
+
+class BM25Index:
+    """Okapi BM25 scoring with per-term weights precomputed at load time."""
+    
+    def __init__(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        lengths: List[int],
+        postings: Dict[str, List[List[int]]]
+    ):
+        self.documents = documents
+        self.metadatas = metadatas
+        
+        n_docs = len(documents)
+        lengths_array = np.asarray(lengths, dtype=np.float32)
+        average_length = float(lengths_array.mean()) if n_docs and lengths_array.sum() else 1.0
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths_array / average_length)
+        
+        # term -> (rows containing it, BM25 contribution to each row's score)
+        self.weights: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, entries in postings.items():
+            pairs = np.asarray(entries, dtype=np.int64)
+            rows, tf = pairs[:, 0], pairs[:, 1].astype(np.float32)
+            idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            self.weights[term] = (rows, idf * tf * (BM25_K1 + 1) / (tf + length_norm[rows]))
+    
+    @classmethod
+    def load(cls, collection_name: str, directory: Optional[str] = None) -> Optional["BM25Index"]:
+        """Open an exported index, or None if the collection was never exported."""
+        path = os.path.join(directory or index_dir(INDEX_DIR), f"{collection_name}.json")
+        if not os.path.exists(path):
+            return None
+        
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        return cls(payload["documents"], payload["metadatas"], payload["lengths"], payload["postings"])
+    
+    def __len__(self) -> int:
+        return len(self.documents)
+    
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Top-k (row, BM25 score) pairs; rows sharing no term with the query are left out."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term in self.weights:
+                rows, weights = self.weights[term]
+                scores[rows] += weights
+        
+        matched = np.flatnonzero(scores)
+        if k < len(matched):
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(row), float(scores[row])) for row in matched[:max(k, 0)]]
+    
+    def search_documents(self, query: str, k: int = 5) -> List[Document]:
+        """Top-k documents by BM25 score."""
+        return [
+            Document(page_content=self.documents[row], metadata=self.metadatas[row] or {})
+            for row, _ in self.search(query, k)
+        ]
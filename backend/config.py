@@ -1,4 +1,5 @@
 """Configuration settings for the application."""
+import os
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -21,9 +22,91 @@ class Settings(BaseSettings):
     chroma_db_path: str = "./chroma_db"
     chroma_collection_name: str = "customer_service_kb"
     
+    # Embeddings
+    embedding_provider: str = "openai"  # "openai" or "local" (sentence-transformers on CPU)
+    openai_embedding_model: str = "text-embedding-ada-002"
+    local_embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    local_embedding_device: str = "cpu"
+    local_embedding_batch_size: int = 32
+    
+    # Ingestion Pipeline
+    ingest_workers: int = 4  # Processes parsing and splitting files
+    ingest_queue_size: int = 8  # Batches buffered between pipeline stages
+    embedding_batch_size: int = 64  # Chunks per embedding request
+    embedding_concurrency: int = 4  # Embedding requests in flight
+    upsert_batch_size: int = 256  # Chunks per Chroma upsert
+    
+    # Retrieval
+    retrieval_backend: str = "chroma"  # "chroma" or "numpy" (in-process index exported at ingest)
+    numpy_index_ivf_threshold: int = 50000  # Vectors per collection above which an IVF partition is built
+    numpy_index_ivf_nprobe: int = 8  # Inverted lists scanned per query
+    retrieval_mode: str = "hybrid"  # "vector", "hybrid" (vector + BM25, rank-fused) or "lexical" (BM25 only, no embedding call)
+    hybrid_candidates: int = 20  # Results taken from each retriever before fusion
+    hybrid_vector_timeout_seconds: Optional[float] = 2.0  # Use keyword results alone when vector search is slower; None waits forever
+    
+    # Prompt Context
+    context_token_budget: int = 1500  # Retrieved context per prompt, after deduplication and merging
+    static_context_token_budget: int = 2500  # Cached (CAG) policy context of the policy and billing agents
+    
+    # CAG Context Caches
+    cag_refresh_interval_seconds: float = 30.0  # How often to check for a new KB version (0 disables refreshing)
+    
+    # Query Embedding Cache
+    embedding_cache_max_entries: int = 10000
+    embedding_cache_path: Optional[str] = None  # SQLite file to persist the cache across restarts
+    
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    log_level: str = "INFO"  # Level of the backend's own log messages
+    
+    # Routing
+    fast_router_enabled: bool = True  # Try the local classifier before the router LLM
+    fast_router_confidence_threshold: float = 0.5  # Minimum top-1 vs top-2 margin to skip the LLM
+    sticky_routing: str = "short_followups"  # Reuse the session's previous agent: "off", "short_followups" or "always"
+    sticky_routing_max_words: int = 8  # Longest message treated as a short follow-up
+    max_agents_per_query: int = 3  # Agents a multi-intent query can fan out to; 1 disables fan-out
+    speculative_retrieval: bool = True  # Start billing/technical retrieval while the router LLM runs (a thread already running for the agent not picked is not stopped)
+    
+    # Response Cache
+    response_cache_enabled: bool = True
+    response_cache_similarity_threshold: float = 0.95  # Cosine similarity needed to reuse an answer
+    response_cache_max_entries: int = 500  # Per agent type
+    response_cache_ttl_seconds: int = 3600
+    
+    # Sessions
+    session_max_entries: int = 10000  # Sessions kept in memory
+    session_ttl_seconds: int = 86400  # Inactivity before a session is forgotten
+    session_history_token_budget: int = 1000  # Recent messages kept verbatim
+    session_summary_token_budget: int = 300  # Rolling summary of older messages
+    session_store_path: Optional[str] = None  # SQLite file to persist sessions across restarts
+    
+    # Startup
+    warmup_on_startup: bool = True  # Preload agents and contexts in the background; see /ready
+    
+    # Request Execution
+    orchestrator_mode: str = "async"  # "async" or "threadpool"
+    orchestrator_max_workers: int = 8  # Thread pool size in "threadpool" mode
+    
+    # LLM Gateway
+    llm_router_providers: str = "bedrock,openai"  # Failover order of the router LLM
+    llm_generator_providers: str = "openai,bedrock"  # Failover order of the generator LLM
+    llm_max_connections: int = 100  # HTTP connection pool size per provider
+    llm_openai_max_concurrency: int = 32  # OpenAI requests in flight at once
+    llm_bedrock_max_concurrency: int = 16  # Bedrock requests in flight at once
+    llm_openai_requests_per_second: float = 0  # 0 disables the rate limit
+    llm_bedrock_requests_per_second: float = 0  # 0 disables the rate limit
+    llm_max_retries: int = 2  # Retries per provider of a transient error before failing over
+    llm_retry_backoff_seconds: float = 0.5  # First retry delay, doubled on every retry
+    llm_hedge_after_seconds: Optional[float] = None  # Send a duplicate request after this long; None disables
+    llm_failover_cooldown_seconds: float = 30.0  # How long a failing provider is skipped
+    llm_request_timeout_seconds: float = 60.0
+    
+    # Batch Processing (/chat/batch and run_batch.py)
+    batch_chunk_size: int = 32  # Questions classified and retrieved together
+    batch_max_concurrency: int = 8  # Generations (and router calls) in flight at once
+    batch_max_retries: int = 3  # Retries of a generation rejected by a provider rate limit
+    batch_retry_backoff_seconds: float = 2.0  # First rate-limit pause, doubled on every retry
     
     class Config:
         env_file = ".env"
@@ -32,3 +115,8 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
+
+def index_dir(name: str) -> str:
+    """Directory of an exported in-process index, next to the Chroma store it was exported from."""
+    return os.path.join(settings.chroma_db_path, name)
+
@@ -0,0 +1,72 @@
+"""Embedding provider integrations for OpenAI and local CPU models."""
+from typing import List, Optional
+import numpy as np
+from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from config import settings
+
+
+class LocalEmbeddings(Embeddings):
+    """Sentence-transformers model run in-process, with batched, L2-normalized output.
+
+    Requires the optional sentence-transformers package. Async calls use the
+    base class's executor offload, so the event loop is never blocked.
+    """
+    
+    def __init__(self, model_name: Optional[str] = None, device: Optional[str] = None, batch_size: Optional[int] = None):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "Local embeddings require sentence-transformers: pip install sentence-transformers"
+            ) from e
+        
+        self.model = model_name or settings.local_embedding_model
+        self.batch_size = batch_size or settings.local_embedding_batch_size
+        self._model = SentenceTransformer(self.model, device=device or settings.local_embedding_device)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in batches into unit-length float32 vectors."""
+        vectors = np.asarray(
+            self._model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False),
+            dtype=np.float32,
+        )
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents locally."""
+        if not texts:
+            return []
+        return self._encode(texts).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query locally."""
+        return self._encode([text])[0].tolist()
+
+
+def get_openai_embeddings(model_name: Optional[str] = None) -> Embeddings:
+    """Get OpenAI embeddings instance."""
+    if not settings.openai_api_key:
+        raise ValueError("OpenAI API key not configured")
+    
+    return OpenAIEmbeddings(
+        model=model_name or settings.openai_embedding_model,
+        openai_api_key=settings.openai_api_key,
+    )
+
+
+def get_local_embeddings(model_name: Optional[str] = None) -> Embeddings:
+    """Get a local CPU embedding model instance."""
+    return LocalEmbeddings(model_name=model_name)
+
+
+def get_embedding_model() -> Embeddings:
+    """Get the embedding model selected by settings.embedding_provider."""
+    provider = settings.embedding_provider.lower()
+    if provider == "openai":
+        return get_openai_embeddings()
+    if provider == "local":
+        return get_local_embeddings()
+    raise ValueError(f"Unknown embedding provider: {settings.embedding_provider}")
@@ -1,57 +1,98 @@
 """Data ingestion pipeline for processing documents and creating vector embeddings."""
+import argparse
+import hashlib
+import json
 import os
 import sys
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from langchain_community.document_loaders import TextLoader, PyPDFLoader, Docx2txtLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from config import settings
+from config import index_dir, settings
+import bm25_index
+import numpy_index
+from vector_store import (
+    EMBEDDING_MODEL_KEY,
+    EmbeddingModelMismatch,
+    check_embedding_model,
+    embedding_model_name,
+    get_registry,
+    reload_vector_stores,
+    write_kb_version,
+)
 
+# Knowledge base location, shared with components that read the raw corpus
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
 
-def load_documents(data_dir: str) -> List[Document]:
-    """Load documents from the data directory."""
-    documents = []
+
+# Per-file content and chunk hashes, stored next to the Chroma store
+MANIFEST_FILE = "ingest_manifest.json"
+
+# Supported file extensions
+SUPPORTED_EXTENSIONS = {'.txt', '.pdf', '.docx'}
+
+# One collection per category, named f"{settings.chroma_collection_name}_{category}"
+CATEGORIES = ('billing', 'technical', 'policy')
+
+
+def iter_data_files(data_dir: str) -> List[Path]:
+    """List supported files under the data directory in a stable order."""
     data_path = Path(data_dir)
     
     if not data_path.exists():
         print(f"Data directory {data_dir} does not exist. Creating it...")
         data_path.mkdir(parents=True, exist_ok=True)
-        return documents
+        return []
     
-    # Supported file extensions
-    supported_extensions = {'.txt', '.pdf', '.docx'}
+    return sorted(
+        file_path for file_path in data_path.rglob('*')
+        if file_path.is_file() and file_path.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
+
+
+def load_file(file_path: Path) -> List[Document]:
+    """Load the documents contained in a single file."""
+    if file_path.suffix.lower() == '.txt':
+        loader = TextLoader(str(file_path), encoding='utf-8')
+    elif file_path.suffix.lower() == '.pdf':
+        loader = PyPDFLoader(str(file_path))
+    elif file_path.suffix.lower() == '.docx':
+        loader = Docx2txtLoader(str(file_path))
+    else:
+        return []
     
-    for file_path in data_path.rglob('*'):
-        if file_path.suffix.lower() in supported_extensions:
-            try:
-                if file_path.suffix.lower() == '.txt':
-                    loader = TextLoader(str(file_path), encoding='utf-8')
-                elif file_path.suffix.lower() == '.pdf':
-                    loader = PyPDFLoader(str(file_path))
-                elif file_path.suffix.lower() == '.docx':
-                    loader = Docx2txtLoader(str(file_path))
-                else:
-                    continue
-                
-                docs = loader.load()
-                # Add metadata about source file
-                for doc in docs:
-                    doc.metadata['source'] = str(file_path)
-                    doc.metadata['file_type'] = file_path.suffix.lower()[1:]
-                
-                documents.extend(docs)
-                print(f"Loaded {len(docs)} documents from {file_path.name}")
-            except Exception as e:
-                print(f"Error loading {file_path}: {e}")
+    docs = loader.load()
+    # Add metadata about source file
+    for doc in docs:
+        doc.metadata['source'] = str(file_path)
+        doc.metadata['file_type'] = file_path.suffix.lower()[1:]
+    
+    return docs
+
+
+def load_documents(data_dir: str) -> List[Document]:
+    """Load documents from the data directory."""
+    documents = []
+    
+    for file_path in iter_data_files(data_dir):
+        try:
+            docs = load_file(file_path)
+            documents.extend(docs)
+            print(f"Loaded {len(docs)} documents from {file_path.name}")
+        except Exception as e:
+            print(f"Error loading {file_path}: {e}")
     
     return documents
 
@@ -93,71 +134,526 @@ def categorize_documents(documents: List[Document]) -> Dict[str, List[Document]]
     return categorized
 
 
-def create_vector_store(documents: List[Document], collection_name: str, embeddings) -> Chroma:
-    """Create or update a ChromaDB vector store."""
-    # Split documents into chunks
+def split_documents(documents: List[Document]) -> List[Document]:
+    """Split documents into chunks."""
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200,
         length_function=len,
     )
     
-    splits = text_splitter.split_documents(documents)
-    print(f"Split documents into {len(splits)} chunks")
+    return text_splitter.split_documents(documents)
+
+
+def file_hash(file_path: Path) -> str:
+    """Hash a file's contents."""
+    return hashlib.sha256(file_path.read_bytes()).hexdigest()
+
+
+def assign_chunk_ids(relative_path: str, chunks: List[Document]) -> List[str]:
+    """Derive deterministic chunk IDs from the source path and chunk content.
     
-    # Create persistent ChromaDB
-    chroma_db = Chroma.from_documents(
-        documents=splits,
-        embedding=embeddings,
-        persist_directory=settings.chroma_db_path,
-        collection_name=collection_name,
-    )
+    Identical chunks within a file are told apart by occurrence rather than
+    position, so an unchanged chunk keeps its ID when text elsewhere moves.
+    """
+    occurrences: Counter = Counter()
+    ids = []
+    
+    for index, chunk in enumerate(chunks):
+        content_hash = hashlib.sha256(chunk.page_content.encode('utf-8')).hexdigest()
+        occurrence = occurrences[content_hash]
+        occurrences[content_hash] += 1
+        
+        chunk_key = f"{relative_path}\x00{content_hash}\x00{occurrence}"
+        ids.append(hashlib.sha256(chunk_key.encode('utf-8')).hexdigest()[:32])
+        chunk.metadata['chunk_index'] = index
+    
+    return ids
+
+
+def load_manifest() -> Dict[str, Dict]:
+    """Load the ingest manifest (file hash and chunk IDs per source file)."""
+    manifest_path = os.path.join(settings.chroma_db_path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f).get('files', {})
+
+
+def save_manifest(files: Dict[str, Dict]) -> None:
+    """Persist the ingest manifest next to the Chroma store."""
+    os.makedirs(settings.chroma_db_path, exist_ok=True)
+    manifest_path = os.path.join(settings.chroma_db_path, MANIFEST_FILE)
+    
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'files': files}, f, indent=2, sort_keys=True)
+
+
+def chunk_file(file_path: Path, relative_path: str) -> Dict[str, Tuple[List[str], List[Document]]]:
+    """Load, categorize and split one file into ID-tagged chunks per collection."""
+    chunks_by_collection = {}
+    
+    for category, docs in categorize_documents(load_file(file_path)).items():
+        if not docs:
+            continue
+        chunks = split_documents(docs)
+        collection_name = f"{settings.chroma_collection_name}_{category}"
+        chunks_by_collection[collection_name] = (assign_chunk_ids(relative_path, chunks), chunks)
+    
+    return chunks_by_collection
+
+
+def parse_file(file_path: Path, relative_path: str, known_hash: Optional[str]) -> Tuple:
+    """Parse stage, run in a worker process: hash a file and, if changed, chunk it.
+    
+    Returns (relative_path, hash, chunks_by_collection, seconds, error). The
+    chunks are None when the file is unchanged or could not be loaded.
+    """
+    started = time.perf_counter()
+    digest = known_hash
+    try:
+        # The file may be unreadable, or deleted since the directory was scanned
+        digest = file_hash(file_path)
+        if digest == known_hash:
+            return relative_path, digest, None, time.perf_counter() - started, None
+        
+        current = chunk_file(file_path, relative_path)
+    except Exception as e:
+        return relative_path, digest, None, time.perf_counter() - started, str(e)
+    
+    return relative_path, digest, current, time.perf_counter() - started, None
+
+
+class StageStats:
+    """Item count and busy time of one pipeline stage."""
+    
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, items: int, seconds: float) -> None:
+        """Add work done by one stage worker."""
+        with self._lock:
+            self.items += items
+            self.seconds += seconds
+    
+    def report(self, wall_seconds: float) -> str:
+        """One-line throughput summary."""
+        rate = self.items / wall_seconds if wall_seconds else 0.0
+        return f"  - {self.name}: {self.items} {self.unit} in {self.seconds:.2f}s busy, {rate:.1f} {self.unit}/s"
+
+
+class IngestPipeline:
+    """Streaming ingest: parse in processes, embed in batches, upsert from one writer.
+    
+    Stages are connected by bounded queues so a slow embedding API applies
+    back-pressure instead of letting parsed chunks pile up in memory. A file's
+    stale chunks are deleted and its manifest entry is written only after all
+    of its new chunks are stored, so a failed run is safely retried.
+    """
+    
+    def __init__(
+        self,
+        client,
+        embeddings,
+        manifest: Dict[str, Dict],
+        workers: Optional[int] = None,
+        embedding_batch_size: Optional[int] = None,
+        embedding_concurrency: Optional[int] = None,
+        upsert_batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None
+    ):
+        self.client = client
+        self.embeddings = embeddings
+        self.model_name = embedding_model_name(embeddings)
+        self.manifest = manifest
+        self.workers = max(1, workers or settings.ingest_workers)
+        self.embedding_batch_size = max(1, embedding_batch_size or settings.embedding_batch_size)
+        self.embedding_concurrency = max(1, embedding_concurrency or settings.embedding_concurrency)
+        self.upsert_batch_size = max(1, upsert_batch_size or settings.upsert_batch_size)
+        
+        queue_size = max(1, queue_size or settings.ingest_queue_size)
+        self._embed_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._upsert_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        
+        self.counts = {'unchanged': 0, 'changed': 0, 'removed': 0, 'failed': 0, 'added': 0, 'deleted': 0, 'kept': 0}
+        self.stages = {
+            'parse': StageStats('parse/split', 'files'),
+            'embed': StageStats('embed', 'chunks'),
+            'upsert': StageStats('upsert', 'chunks'),
+        }
+        
+        # Writer-thread state: chunks still to be stored per file, and what to record once they are
+        self._pending: Dict[str, int] = {}
+        self._files: Dict[str, Tuple] = {}
+        self._failed: set = set()
+        self._buffers: Dict[str, List[Tuple]] = {}
+    
+    def _collection(self, collection_name: str):
+        """Get or create a raw Chroma collection (vectors are always supplied)."""
+        return self.client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=None,
+            metadata={EMBEDDING_MODEL_KEY: self.model_name},
+        )
+    
+    def _apply_removals(self, previous: Dict[str, List[str]], current: Dict[str, Tuple[List[str], List[Document]]]) -> None:
+        """Delete chunks that are gone and refresh metadata of chunks that survived."""
+        for collection_name in set(previous) | set(current):
+            collection = self._collection(collection_name)
+            old_ids = set(previous.get(collection_name, []))
+            new_ids, chunks = current.get(collection_name, ([], []))
+            
+            stale_ids = sorted(old_ids - set(new_ids))
+            if stale_ids:
+                collection.delete(ids=stale_ids)
+                self.counts['deleted'] += len(stale_ids)
+            
+            kept = [(chunk_id, chunk) for chunk_id, chunk in zip(new_ids, chunks) if chunk_id in old_ids]
+            if kept:
+                collection.update(
+                    ids=[chunk_id for chunk_id, _ in kept],
+                    metadatas=[chunk.metadata for _, chunk in kept],
+                )
+                self.counts['kept'] += len(kept)
+    
+    def remove_file(self, relative_path: str) -> None:
+        """Delete all chunks of a file that no longer exists."""
+        self._apply_removals(self.manifest[relative_path]['chunks'], {})
+        del self.manifest[relative_path]
+        self.counts['removed'] += 1
+        print(f"Removed {relative_path}")
+    
+    def _finalize(self, relative_path: str) -> None:
+        """All new chunks of a file are stored: clean up and record it in the manifest."""
+        digest, previous, current = self._files.pop(relative_path)
+        self._pending.pop(relative_path, None)
+        
+        if relative_path in self._failed:
+            self.counts['failed'] += 1
+            return
+        
+        self._apply_removals(previous, current)
+        self.manifest[relative_path] = {
+            'hash': digest,
+            'chunks': {collection_name: ids for collection_name, (ids, _) in current.items()},
+        }
+        self.counts['changed'] += 1
+    
+    def _flush(self, collection_name: str) -> None:
+        """Upsert the buffered chunks of one collection."""
+        buffered = self._buffers.pop(collection_name, [])
+        if not buffered:
+            return
+        
+        started = time.perf_counter()
+        try:
+            self._collection(collection_name).upsert(
+                ids=[chunk_id for _, chunk_id, _, _ in buffered],
+                embeddings=[vector for _, _, _, vector in buffered],
+                metadatas=[chunk.metadata for _, _, chunk, _ in buffered],
+                documents=[chunk.page_content for _, _, chunk, _ in buffered],
+            )
+            self.counts['added'] += len(buffered)
+        except Exception as e:
+            print(f"Error upserting into {collection_name}: {e}")
+            self._failed.update(relative_path for relative_path, _, _, _ in buffered)
+        self.stages['upsert'].record(len(buffered), time.perf_counter() - started)
+        
+        finished = False
+        for relative_path, _, _, _ in buffered:
+            self._pending[relative_path] -= 1
+            finished = finished or self._pending[relative_path] == 0
+        
+        if finished:
+            for relative_path in [path for path, remaining in self._pending.items() if remaining == 0]:
+                self._finalize(relative_path)
+            save_manifest(self.manifest)
+    
+    def _writer(self) -> None:
+        """Single writer: batches upserts and finalizes files as they complete."""
+        while True:
+            message = self._upsert_queue.get()
+            if message is None:
+                break
+            
+            kind = message[0]
+            if kind == 'file':
+                _, relative_path, digest, previous, current, n_added = message
+                self._files[relative_path] = (digest, previous, current)
+                self._pending[relative_path] = n_added
+                if n_added == 0:
+                    self._finalize(relative_path)
+                    save_manifest(self.manifest)
+            elif kind == 'batch':
+                _, batch, vectors = message
+                if vectors is None:
+                    # Embedding failed: count the chunks as done but keep the file's old manifest entry
+                    self._failed.update(relative_path for relative_path, _, _, _ in batch)
+                    for relative_path, _, _, _ in batch:
+                        self._pending[relative_path] -= 1
+                    for relative_path in [path for path, remaining in self._pending.items() if remaining == 0]:
+                        self._finalize(relative_path)
+                    save_manifest(self.manifest)
+                    continue
+                
+                for (relative_path, collection_name, chunk_id, chunk), vector in zip(batch, vectors):
+                    buffer = self._buffers.setdefault(collection_name, [])
+                    buffer.append((relative_path, chunk_id, chunk, vector))
+                    if len(buffer) >= self.upsert_batch_size:
+                        self._flush(collection_name)
+        
+        for collection_name in list(self._buffers):
+            self._flush(collection_name)
+        save_manifest(self.manifest)
     
-    return chroma_db
+    def _embedder(self) -> None:
+        """Embedding worker: one API request per batch of chunks."""
+        while True:
+            batch = self._embed_queue.get()
+            if batch is None:
+                break
+            
+            started = time.perf_counter()
+            try:
+                vectors = self.embeddings.embed_documents([chunk.page_content for _, _, _, chunk in batch])
+            except Exception as e:
+                print(f"Error embedding batch of {len(batch)} chunks: {e}")
+                vectors = None
+            self.stages['embed'].record(len(batch), time.perf_counter() - started)
+            self._upsert_queue.put(('batch', batch, vectors))
+    
+    def _submit_chunks(self, relative_path: str, digest: str, current: Dict[str, Tuple[List[str], List[Document]]], batch: List[Tuple]) -> List[Tuple]:
+        """Hand a parsed file to the writer and queue its new chunks for embedding."""
+        entry = self.manifest.get(relative_path)
+        previous = entry['chunks'] if entry else {}
+        
+        added = []
+        for collection_name, (ids, chunks) in current.items():
+            old_ids = set(previous.get(collection_name, []))
+            added.extend(
+                (relative_path, collection_name, chunk_id, chunk)
+                for chunk_id, chunk in zip(ids, chunks)
+                if chunk_id not in old_ids
+            )
+        
+        # Register the file before any of its chunks can reach the writer
+        self._upsert_queue.put(('file', relative_path, digest, previous, current, len(added)))
+        
+        for item in added:
+            batch.append(item)
+            if len(batch) >= self.embedding_batch_size:
+                self._embed_queue.put(batch)
+                batch = []
+        return batch
+    
+    def run(self, files: Dict[str, Path]) -> Dict[str, int]:
+        """Run all stages over the given files (relative path -> absolute path)."""
+        started = time.perf_counter()
+        
+        writer = threading.Thread(target=self._writer, name="ingest-writer")
+        embedders = [
+            threading.Thread(target=self._embedder, name=f"ingest-embed-{i}")
+            for i in range(self.embedding_concurrency)
+        ]
+        writer.start()
+        for thread in embedders:
+            thread.start()
+        
+        batch: List[Tuple] = []
+        pending = set()
+        todo = list(files.items())
+        
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                while todo or pending:
+                    # Keep a bounded number of files in flight
+                    while todo and len(pending) < self.workers * 2:
+                        relative_path, file_path = todo.pop(0)
+                        entry = self.manifest.get(relative_path)
+                        pending.add(pool.submit(parse_file, file_path, relative_path, entry['hash'] if entry else None))
+                    
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        relative_path, digest, current, seconds, error = future.result()
+                        self.stages['parse'].record(1, seconds)
+                        
+                        if error:
+                            print(f"Error loading {relative_path}: {error}")
+                            self.counts['failed'] += 1
+                        elif current is None:
+                            self.counts['unchanged'] += 1
+                        else:
+                            batch = self._submit_chunks(relative_path, digest, current, batch)
+        finally:
+            if batch:
+                self._embed_queue.put(batch)
+            for _ in embedders:
+                self._embed_queue.put(None)
+            for thread in embedders:
+                thread.join()
+            self._upsert_queue.put(None)
+            writer.join()
+        
+        self.wall_seconds = time.perf_counter() - started
+        return self.counts
+    
+    def report(self) -> str:
+        """Per-stage throughput summary."""
+        lines = [f"Pipeline finished in {self.wall_seconds:.2f}s"]
+        lines.extend(stage.report(self.wall_seconds) for stage in self.stages.values())
+        return "\n".join(lines)
+
+
+def has_unmanaged_chunks(client) -> bool:
+    """Whether any collection holds chunks, e.g. from an ingestion that kept no manifest."""
+    for category in CATEGORIES:
+        try:
+            if client.get_collection(f"{settings.chroma_collection_name}_{category}").count():
+                return True
+        except ValueError:
+            continue  # Collection does not exist yet
+    return False
 
 
-def main():
+def ingest(data_dir: str, embeddings, full: bool = False) -> Dict[str, int]:
+    """Sync the Chroma collections with the files under data_dir.
+    
+    Incremental by default: unchanged files are skipped without being parsed,
+    changed files only re-embed chunks whose content changed, and chunks from
+    removed files are deleted. With full=True the collections are rebuilt, as
+    they are when they hold chunks but no manifest records them.
+    """
+    client = chromadb.PersistentClient(path=settings.chroma_db_path)
+    manifest = {} if full else load_manifest()
+    if not full and not manifest and has_unmanaged_chunks(client):
+        # Chunks stored without a manifest have random IDs and would all be added again
+        print("Collections exist but no ingest manifest was found; rebuilding them")
+        full = True
+    pipeline = IngestPipeline(client, embeddings, manifest)
+    
+    for category in CATEGORIES:
+        collection_name = f"{settings.chroma_collection_name}_{category}"
+        if full:
+            try:
+                client.delete_collection(collection_name)
+            except ValueError:
+                pass  # Collection does not exist yet
+            continue
+        
+        try:
+            existing = client.get_collection(collection_name)
+        except ValueError:
+            continue  # Collection does not exist yet
+        
+        # Never mix vectors from two embedding models in one collection
+        check_embedding_model(collection_name, existing.metadata, pipeline.model_name)
+    
+    data_path = Path(data_dir)
+    files = {file_path.relative_to(data_path).as_posix(): file_path for file_path in iter_data_files(data_dir)}
+    
+    # Delete chunks of files that no longer exist
+    for relative_path in sorted(set(manifest) - set(files)):
+        pipeline.remove_file(relative_path)
+    save_manifest(manifest)
+    
+    counts = pipeline.run(files)
+    print(pipeline.report())
+    
+    export_indexes(client, pipeline.model_name, force=bool(full or counts['changed'] or counts['removed']))
+    
+    return counts
+
+
+def export_indexes(client, model_name: str, force: bool = False) -> None:
+    """Export the collections to the in-process NumPy vector and BM25 keyword indexes.
+    
+    Only indexes that are missing are exported unless force is set.
+    """
+    for category in CATEGORIES:
+        collection_name = f"{settings.chroma_collection_name}_{category}"
+        vectors_path = os.path.join(index_dir(numpy_index.INDEX_DIR), f"{collection_name}.npy")
+        lexical_path = os.path.join(index_dir(bm25_index.INDEX_DIR), f"{collection_name}.json")
+        export_vectors = force or not os.path.exists(vectors_path)
+        export_lexical = force or not os.path.exists(lexical_path)
+        if not (export_vectors or export_lexical):
+            continue
+        
+        try:
+            collection = client.get_collection(collection_name)
+        except ValueError:
+            continue  # Collection does not exist yet
+        
+        if export_vectors:
+            started = time.perf_counter()
+            count = numpy_index.export_collection(collection, model_name)
+            print(f"Exported {count} vectors of {collection_name} to the NumPy index in {time.perf_counter() - started:.2f}s")
+        
+        if export_lexical:
+            started = time.perf_counter()
+            count = bm25_index.export_collection(collection)
+            print(f"Exported {count} chunks of {collection_name} to the BM25 index in {time.perf_counter() - started:.2f}s")
+
+
+def new_kb_version() -> str:
+    """A knowledge-base version that differs from every earlier one, even within a second."""
+    now_ns = time.time_ns()
+    return time.strftime("%Y%m%d%H%M%S", time.localtime(now_ns // 10**9)) + f".{now_ns % 10**9:09d}"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Ingest the data/ directory into ChromaDB.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild all collections from scratch instead of syncing changed files only",
+    )
+    return parser.parse_args(argv)
+
+
+def main(full: bool = False):
     """Main ingestion function."""
     print("Starting data ingestion pipeline...")
     
     # Check for OpenAI API key
-    if not settings.openai_api_key:
+    if settings.embedding_provider == "openai" and not settings.openai_api_key:
         print("ERROR: OPENAI_API_KEY not set in environment variables")
         print("Please set it in your .env file or environment")
         sys.exit(1)
     
-    # Initialize embeddings
-    embeddings = OpenAIEmbeddings(openai_api_key=settings.openai_api_key)
-    
-    # Load documents
-    data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
-    documents = load_documents(data_dir)
+    # Initialize embeddings (shared with the query-time vector store registry)
+    embeddings = get_registry().get_embeddings()
     
-    if not documents:
+    if not iter_data_files(DATA_DIR):
         print("No documents found. Please add documents to the data/ directory")
         print("Supported formats: .txt, .pdf, .docx")
         return
     
-    print(f"\nLoaded {len(documents)} total documents")
+    print(f"Mode: {'full rebuild' if full else 'incremental'}")
+    try:
+        stats = ingest(DATA_DIR, embeddings, full=full)
+    except EmbeddingModelMismatch as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    
+    print(f"\nFiles: {stats['changed']} changed, {stats['unchanged']} unchanged, {stats['removed']} removed, {stats['failed']} failed")
+    print(f"Chunks: {stats['added']} embedded, {stats['deleted']} deleted, {stats['kept']} reused")
     
-    # Categorize documents
-    categorized = categorize_documents(documents)
-    print(f"\nCategorized documents:")
-    print(f"  - Billing: {len(categorized['billing'])}")
-    print(f"  - Technical: {len(categorized['technical'])}")
-    print(f"  - Policy: {len(categorized['policy'])}")
+    if stats['changed'] or stats['removed'] or full:
+        # Bump the knowledge-base version so caches keyed on it are invalidated
+        write_kb_version(new_kb_version())
     
-    # Create vector stores for each category
-    for category, docs in categorized.items():
-        if docs:
-            print(f"\nCreating vector store for {category} documents...")
-            collection_name = f"{settings.chroma_collection_name}_{category}"
-            create_vector_store(docs, collection_name, embeddings)
-            print(f"Vector store created for {category}")
+    # Make any handles opened in this process pick up the new collections
+    reload_vector_stores()
     
     print("\nData ingestion complete!")
 
 
 if __name__ == "__main__":
-    main()
-
+    args = parse_args()
+    main(full=args.full)
@@ -1,17 +1,255 @@
-"""LLM provider integrations for OpenAI and AWS Bedrock."""
-from typing import Optional
+"""LLM provider integrations for OpenAI and AWS Bedrock, behind a managed gateway.
+
+Agents get a GatewayChatModel holding one model per configured provider, in
+failover order. Models of the same provider share one HTTP connection pool,
+one concurrency limit and one token-bucket rate limit. A call is retried
+with exponential backoff on transient errors, duplicated (hedged) when it is
+slow to answer, and moved to the next provider when one keeps failing.
+"""
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+import boto3
+import httpx
+from botocore.config import Config
 from langchain_openai import ChatOpenAI
 from langchain_aws import ChatBedrock
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
 from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
 from config import settings
+from metrics import LLM_GATEWAY_EVENTS, LLM_IN_FLIGHT, LLMMetricsCallback, record_error, span
+
+
+logger = logging.getLogger(__name__)
+
+
+T = TypeVar("T")
+
+# Lowercased fragments of provider errors that mean "slow down"
+RATE_LIMIT_MARKERS = ("ratelimit", "rate limit", "throttl", "too many requests")
+
+# Lowercased fragments of other provider errors worth retrying
+TRANSIENT_MARKERS = (
+    "timeout", "timed out", "connection", "serviceunavailable", "service unavailable",
+    "internalserver", "internal server", "overloaded", "modelnotready",
+)
+
+# Calls to the wrapped provider models run without the caller's callbacks:
+# the gateway reports the call (and streams its tokens) once, while each
+# provider model keeps its own metrics callback and counts every attempt.
+PROVIDER_CALL_CONFIG = {"callbacks": []}
+
+# Runs hedged synchronous calls so the first one can be raced against a duplicate;
+# more threads than the providers admit at once would only queue on their limits
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=settings.llm_openai_max_concurrency + settings.llm_bedrock_max_concurrency,
+    thread_name_prefix="llm-hedge",
+)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether a provider error is a rate limit (OpenAI 429, Bedrock throttling)."""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in RATE_LIMIT_MARKERS)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether a provider error is transient: rate limits, timeouts, dropped connections, 5xx."""
+    if is_rate_limit_error(error) or isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int) and status_code >= 500:
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in TRANSIENT_MARKERS)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter allowing bursts of one second's worth of requests."""
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        """Take a token; returns how long to wait before using it (0 if the rate is unlimited)."""
+        if self.rate <= 0:
+            return 0.0
+        
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class ProviderLimiter:
+    """Concurrency slots, rate limit and health of one provider, shared by all its models.
+
+    The slots are shared by threads and event loops alike, so they can't be an
+    asyncio.Semaphore, which is bound to one loop. Threads wait on a condition
+    variable; a coroutine queues a future on its own loop, and a freed slot is
+    handed straight to the first queued coroutine.
+    """
+    
+    def __init__(self, name: str, max_concurrency: int, requests_per_second: float):
+        self.name = name
+        self.max_concurrency = max(max_concurrency, 1)
+        self.bucket = TokenBucket(requests_per_second)
+        self.in_flight = 0
+        self.unhealthy_until = 0.0
+        self._condition = threading.Condition()
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+    
+    def _take_slot(self) -> bool:
+        """Take a concurrency slot if one is free; caller holds the condition."""
+        if self.in_flight >= self.max_concurrency:
+            return False
+        self.in_flight += 1
+        LLM_IN_FLIGHT.set(self.in_flight, provider=self.name)
+        return True
+    
+    def acquire(self) -> None:
+        """Wait for a concurrency slot and a rate-limit token."""
+        with span("llm_queue"):
+            with self._condition:
+                while not self._take_slot():
+                    self._condition.wait()
+            delay = self.bucket.reserve()
+            if delay:
+                time.sleep(delay)
+    
+    async def aacquire(self) -> None:
+        """Wait for a concurrency slot and a rate-limit token without blocking the event loop."""
+        with span("llm_queue"):
+            with self._condition:
+                waiter = None
+                if not self._take_slot():
+                    loop = asyncio.get_running_loop()
+                    waiter = (loop, loop.create_future())
+                    self._async_waiters.append(waiter)
+            try:
+                if waiter is not None:
+                    await waiter[1]
+                delay = self.bucket.reserve()
+                if delay:
+                    await asyncio.sleep(delay)
+            except BaseException:
+                with self._condition:
+                    queued = waiter is not None and waiter in self._async_waiters
+                    if queued:
+                        self._async_waiters.remove(waiter)
+                # Give the slot back unless we were still queued (or it was never granted)
+                if not queued and (waiter is None or (waiter[1].done() and not waiter[1].cancelled())):
+                    self.release()
+                raise
+    
+    def _grant(self, future: asyncio.Future) -> None:
+        """Hand a slot to a queued coroutine, on its own loop."""
+        if future.done():
+            # Cancelled while the slot was on its way: pass it on
+            self.release()
+        else:
+            future.set_result(None)
+    
+    def release(self) -> None:
+        """Give back a concurrency slot, or hand it to the first queued coroutine."""
+        with self._condition:
+            while self._async_waiters:
+                loop, future = self._async_waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return
+                except RuntimeError:
+                    # The waiter's event loop is closed
+                    continue
+            self.in_flight -= 1
+            LLM_IN_FLIGHT.set(self.in_flight, provider=self.name)
+            self._condition.notify()
+    
+    @property
+    def healthy(self) -> bool:
+        """False during the cooldown after the provider kept failing."""
+        return time.monotonic() >= self.unhealthy_until
+    
+    def mark_unhealthy(self) -> None:
+        """Route new calls to the other providers for settings.llm_failover_cooldown_seconds."""
+        self.unhealthy_until = time.monotonic() + settings.llm_failover_cooldown_seconds
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_clients: Dict[str, Any] = {}
+_shared_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """The process-wide limiter of a provider ("openai" or "bedrock")."""
+    with _shared_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = ProviderLimiter(
+                provider,
+                getattr(settings, f"llm_{provider}_max_concurrency"),
+                getattr(settings, f"llm_{provider}_requests_per_second"),
+            )
+            _limiters[provider] = limiter
+        return limiter
+
+
+def _shared_client(key: str, factory: Callable[[], Any]) -> Any:
+    """A client created once and shared by every model that uses it."""
+    with _shared_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return client
+
+
+def _http_limits() -> httpx.Limits:
+    """Connection pool size of the shared OpenAI HTTP clients."""
+    return httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_connections,
+    )
+
+
+def _bedrock_runtime_client() -> Any:
+    """Bedrock runtime client with a pool sized for the gateway and boto retries off."""
+    return boto3.client(
+        "bedrock-runtime",
+        region_name=settings.aws_region,
+        aws_access_key_id=settings.aws_access_key_id,
+        aws_secret_access_key=settings.aws_secret_access_key,
+        config=Config(
+            max_pool_connections=settings.llm_max_connections,
+            read_timeout=settings.llm_request_timeout_seconds,
+            retries={"mode": "standard", "total_max_attempts": 1},
+        ),
+    )
 
 
 def get_openai_llm(
     model_name: str = "gpt-4o-mini",
     temperature: float = 0.7,
-    max_tokens: Optional[int] = None
+    max_tokens: Optional[int] = None,
+    callbacks: Optional[List] = None
 ) -> BaseChatModel:
-    """Get OpenAI LLM instance."""
+    """Get OpenAI LLM instance (shared connection pool, retries left to the gateway)."""
     if not settings.openai_api_key:
         raise ValueError("OpenAI API key not configured")
     
@@ -20,15 +258,21 @@ def get_openai_llm(
         temperature=temperature,
         max_tokens=max_tokens,
         openai_api_key=settings.openai_api_key,
+        callbacks=callbacks,
+        max_retries=0,
+        request_timeout=settings.llm_request_timeout_seconds,
+        http_client=_shared_client("openai_http", lambda: httpx.Client(limits=_http_limits())),
+        http_async_client=_shared_client("openai_async_http", lambda: httpx.AsyncClient(limits=_http_limits())),
     )
 
 
 def get_bedrock_llm(
     model_id: Optional[str] = None,
     temperature: float = 0.7,
-    max_tokens: Optional[int] = None
+    max_tokens: Optional[int] = None,
+    callbacks: Optional[List] = None
 ) -> BaseChatModel:
-    """Get AWS Bedrock LLM instance."""
+    """Get AWS Bedrock LLM instance (shared runtime client, retries left to the gateway)."""
     if not settings.aws_access_key_id or not settings.aws_secret_access_key:
         raise ValueError("AWS credentials not configured")
     
@@ -36,27 +280,331 @@ def get_bedrock_llm(
     
     return ChatBedrock(
         model_id=model_id,
-        temperature=temperature,
-        max_tokens=max_tokens,
-        credentials_profile_name=None,
+        client=_shared_client("bedrock_runtime", _bedrock_runtime_client),
+        model_kwargs={"temperature": temperature, "max_tokens": max_tokens or 1024},
         region_name=settings.aws_region,
-        aws_access_key_id=settings.aws_access_key_id,
-        aws_secret_access_key=settings.aws_secret_access_key,
+        callbacks=callbacks,
     )
 
 
+class GatewayChatModel(BaseChatModel):
+    """Chat model that calls its providers through the gateway, in failover order.
+
+    Each provider is retried with exponential backoff on transient errors, then
+    marked unhealthy for a cooldown while calls fail over to the next one. A call
+    that has not answered (or, when streaming, produced its first token) after
+    settings.llm_hedge_after_seconds gets a duplicate on the same provider; the
+    first to succeed wins. Streams are only retried, hedged or failed over
+    before their first token.
+    """
+    
+    role: str
+    providers: List[Tuple[str, Any]]
+    
+    @property
+    def _llm_type(self) -> str:
+        return "gateway"
+    
+    def _event(self, provider: str, event: str) -> None:
+        """Count a gateway event."""
+        LLM_GATEWAY_EVENTS.inc(role=self.role, provider=provider, event=event)
+    
+    def _candidates(self) -> List[Tuple[str, Any]]:
+        """Providers to try in order: the healthy ones, or all if none is."""
+        healthy = [(name, model) for name, model in self.providers if get_limiter(name).healthy]
+        return healthy or list(self.providers)
+    
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Exponential backoff with jitter before retry number attempt + 1."""
+        return settings.llm_retry_backoff_seconds * 2 ** attempt * random.uniform(0.5, 1.0)
+    
+    def _should_retry(self, provider: str, error: Exception, attempt: int) -> bool:
+        """Count a failed attempt; True if it is worth another one on the same provider."""
+        if not is_retryable_error(error) or attempt >= settings.llm_max_retries:
+            return False
+        self._event(provider, "rate_limited" if is_rate_limit_error(error) else "retry")
+        return True
+    
+    def _give_up(self, provider: str, error: Exception) -> None:
+        """Record that a provider failed a call; transient failures also start its cooldown."""
+        logger.warning("LLM provider %s failed (%s): %s", provider, self.role, error)
+        self._event(provider, "failed")
+        if is_retryable_error(error):
+            get_limiter(provider).mark_unhealthy()
+    
+    def _call(self, request: Callable[[str, Any], T]) -> T:
+        """Run request(provider, model) with retries, failing over through the providers."""
+        error: Optional[Exception] = None
+        for index, (provider, model) in enumerate(self._candidates()):
+            if index:
+                self._event(provider, "failover")
+            attempt = 0
+            while True:
+                try:
+                    return request(provider, model)
+                except Exception as e:
+                    error = e
+                    if not self._should_retry(provider, e, attempt):
+                        break
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+            self._give_up(provider, error)
+        raise error
+    
+    async def _acall(self, request: Callable[[str, Any], Awaitable[T]]) -> T:
+        """Run request(provider, model) with retries and failover without blocking the event loop."""
+        error: Optional[Exception] = None
+        for index, (provider, model) in enumerate(self._candidates()):
+            if index:
+                self._event(provider, "failover")
+            attempt = 0
+            while True:
+                try:
+                    return await request(provider, model)
+                except Exception as e:
+                    error = e
+                    if not self._should_retry(provider, e, attempt):
+                        break
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+            self._give_up(provider, error)
+        raise error
+    
+    def _hedged(self, provider: str, start: Callable[[], T]) -> T:
+        """Run start(), racing it against a duplicate if it is slower than the hedge threshold."""
+        hedge_after = settings.llm_hedge_after_seconds
+        if not hedge_after:
+            return start()
+        
+        primary = _hedge_executor.submit(contextvars.copy_context().run, start)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+        
+        self._event(provider, "hedge")
+        backup = _hedge_executor.submit(contextvars.copy_context().run, start)
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # A request already sent can't be recalled; the slower answer is dropped
+                    if future is backup:
+                        self._event(provider, "hedge_won")
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    async def _ahedged(
+        self,
+        provider: str,
+        start: Callable[[], Awaitable[T]],
+        discard: Optional[Callable[[T], Awaitable[None]]] = None
+    ) -> T:
+        """Await start(), racing it against a duplicate if it is slower than the hedge threshold.
+
+        The losing call is cancelled; discard cleans up a loser that finished
+        successfully at the same time (e.g. closes its stream).
+        """
+        hedge_after = settings.llm_hedge_after_seconds
+        if not hedge_after:
+            return await start()
+        
+        primary = asyncio.ensure_future(start())
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return primary.result()
+            
+            self._event(provider, "hedge")
+            backup = asyncio.ensure_future(start())
+            pending = {primary, backup}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    if discard is not None:
+                        for loser in winners[1:]:
+                            await discard(loser.result())
+                    if winners[0] is backup:
+                        self._event(provider, "hedge_won")
+                    return winners[0].result()
+                error = next(iter(done)).exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                # Let cancelled calls release their concurrency slots
+                await asyncio.gather(*pending, return_exceptions=True)
+    
+    def _invoke(self, provider: str, model: Any, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> BaseMessage:
+        """One call to one provider, within its limits."""
+        limiter = get_limiter(provider)
+        limiter.acquire()
+        try:
+            return model.invoke(messages, config=PROVIDER_CALL_CONFIG, stop=stop, **kwargs)
+        finally:
+            limiter.release()
+    
+    async def _ainvoke(self, provider: str, model: Any, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> BaseMessage:
+        """One call to one provider, within its limits, without blocking the event loop."""
+        limiter = get_limiter(provider)
+        await limiter.aacquire()
+        try:
+            return await model.ainvoke(messages, config=PROVIDER_CALL_CONFIG, stop=stop, **kwargs)
+        finally:
+            limiter.release()
+    
+    def _provider_stream(self, provider: str, model: Any, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> Iterator[BaseMessage]:
+        """One streamed call to one provider, holding a slot until the stream ends."""
+        limiter = get_limiter(provider)
+        limiter.acquire()
+        try:
+            yield from model.stream(messages, config=PROVIDER_CALL_CONFIG, stop=stop, **kwargs)
+        finally:
+            limiter.release()
+    
+    async def _aprovider_stream(self, provider: str, model: Any, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> AsyncIterator[BaseMessage]:
+        """One streamed call to one provider without blocking the event loop."""
+        limiter = get_limiter(provider)
+        await limiter.aacquire()
+        try:
+            async for chunk in model.astream(messages, config=PROVIDER_CALL_CONFIG, stop=stop, **kwargs):
+                yield chunk
+        finally:
+            limiter.release()
+    
+    def _open_stream(self, provider: str, model: Any, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> Tuple[Iterator[BaseMessage], Optional[BaseMessage]]:
+        """Start a stream and wait for its first chunk (None if it is empty)."""
+        stream = self._provider_stream(provider, model, messages, stop, **kwargs)
+        try:
+            return stream, next(stream, None)
+        except BaseException:
+            stream.close()
+            raise
+    
+    async def _aopen_stream(self, provider: str, model: Any, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> Tuple[AsyncIterator[BaseMessage], Optional[BaseMessage]]:
+        """Start a stream and wait for its first chunk (None if it is empty)."""
+        stream = self._aprovider_stream(provider, model, messages, stop, **kwargs)
+        try:
+            return stream, await stream.__anext__()
+        except StopAsyncIteration:
+            return stream, None
+        except BaseException:
+            await stream.aclose()
+            raise
+    
+    @staticmethod
+    async def _aclose_stream(opened: Tuple[AsyncIterator[BaseMessage], Optional[BaseMessage]]) -> None:
+        """Close a stream that lost a hedge race."""
+        await opened[0].aclose()
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        message = self._call(lambda provider, model: self._hedged(
+            provider, lambda: self._invoke(provider, model, messages, stop, **kwargs)
+        ))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        message = await self._acall(lambda provider, model: self._ahedged(
+            provider, lambda: self._ainvoke(provider, model, messages, stop, **kwargs)
+        ))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        # Not hedged: a blocking stream can't be raced without a thread per chunk
+        stream, chunk = self._call(lambda provider, model: self._open_stream(provider, model, messages, stop, **kwargs))
+        try:
+            while chunk is not None:
+                generation = ChatGenerationChunk(message=chunk)
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.content, chunk=generation)
+                yield generation
+                chunk = next(stream, None)
+        finally:
+            stream.close()
+    
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        stream, chunk = await self._acall(lambda provider, model: self._ahedged(
+            provider,
+            lambda: self._aopen_stream(provider, model, messages, stop, **kwargs),
+            discard=self._aclose_stream
+        ))
+        try:
+            while chunk is not None:
+                generation = ChatGenerationChunk(message=chunk)
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+                yield generation
+                chunk = await stream.__anext__()
+        except StopAsyncIteration:
+            pass
+        finally:
+            await stream.aclose()
+
+
+def _provider_models(order: str, factories: Dict[str, Callable[[], BaseChatModel]]) -> List[Tuple[str, BaseChatModel]]:
+    """The models of the configured providers, in failover order; unconfigured ones are skipped."""
+    models = []
+    for provider in (name.strip() for name in order.split(",")):
+        if provider not in factories:
+            continue
+        try:
+            models.append((provider, factories[provider]()))
+        except Exception as e:
+            # Provider not configured (e.g. missing credentials); fail over to the others
+            logger.warning("Skipping LLM provider %s: %s", provider, e)
+            record_error("llm_provider_init")
+            continue
+    if not models:
+        raise ValueError(f"No LLM provider configured among: {order}")
+    return models
+
+
 def get_router_llm() -> BaseChatModel:
-    """Get LLM for routing decisions (cost-effective, fast)."""
-    # Use Bedrock for routing (fast and cost-effective)
-    try:
-        return get_bedrock_llm(temperature=0.1, max_tokens=100)
-    except Exception:
-        # Fallback to OpenAI if Bedrock not available
-        return get_openai_llm(model_name="gpt-4o-mini", temperature=0.1, max_tokens=100)
+    """Get LLM for routing decisions (cost-effective, fast): Bedrock first, then OpenAI."""
+    callbacks = [LLMMetricsCallback("router")]
+    providers = _provider_models(settings.llm_router_providers, {
+        "bedrock": lambda: get_bedrock_llm(temperature=0.1, max_tokens=100, callbacks=callbacks),
+        "openai": lambda: get_openai_llm(model_name="gpt-4o-mini", temperature=0.1, max_tokens=100, callbacks=callbacks),
+    })
+    return GatewayChatModel(role="router", providers=providers)
 
 
 def get_generator_llm() -> BaseChatModel:
-    """Get LLM for response generation (high quality)."""
-    # Use OpenAI for high-quality responses
-    return get_openai_llm(model_name="gpt-4o-mini", temperature=0.7)
-
+    """Get LLM for response generation (high quality): OpenAI first, then Bedrock."""
+    callbacks = [LLMMetricsCallback("generator")]
+    providers = _provider_models(settings.llm_generator_providers, {
+        "openai": lambda: get_openai_llm(model_name="gpt-4o-mini", temperature=0.7, callbacks=callbacks),
+        "bedrock": lambda: get_bedrock_llm(temperature=0.7, callbacks=callbacks),
+    })
+    return GatewayChatModel(role="generator", providers=providers)
@@ -1,14 +1,28 @@
 """FastAPI application with chat endpoint."""
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from typing import AsyncIterator
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import AsyncIterator, Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import json
-from models import ChatRequest, ChatResponse
+import logging
+import threading
+import time
+from models import BatchChatRequest, ChatRequest, ChatResponse
 from agents.orchestrator import OrchestratorAgent
+from agents.cag_cache import get_cag_cache
+from vector_store import get_embedding_cache_stats
+from batch_runner import BatchRunner
 from config import settings
+from metrics import REQUESTS, REQUEST_SECONDS, record_error, render_metrics
 import uuid
 
+# Handled errors and background events of every module go to stderr
+logging.basicConfig(level=settings.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Customer Service AI Agent", version="1.0.0")
 
 # CORS middleware
@@ -20,8 +34,85 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize orchestrator
-orchestrator = OrchestratorAgent()
+# The orchestrator is built on first use (or by the warm-up task), so importing
+# this module never touches the LLM providers or the vector store
+_orchestrator: Optional[OrchestratorAgent] = None
+_orchestrator_lock = threading.Lock()
+
+# Warm-up progress reported by /ready
+warmup_state: Dict[str, Any] = {"status": "pending", "error": None}
+
+
+def get_orchestrator() -> OrchestratorAgent:
+    """Get the shared orchestrator, constructing it on first use."""
+    global _orchestrator
+    if _orchestrator is None:
+        with _orchestrator_lock:
+            if _orchestrator is None:
+                _orchestrator = OrchestratorAgent()
+    return _orchestrator
+
+
+def warm_up() -> None:
+    """Build the orchestrator and preload agent contexts."""
+    warmup_state["status"] = "warming_up"
+    try:
+        get_orchestrator().warm_up()
+        warmup_state["status"] = "ready"
+    except Exception as e:
+        logger.error("Error during warm-up: %s", e)
+        record_error("warmup")
+        warmup_state["status"] = "failed"
+        warmup_state["error"] = str(e)
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    """Optionally warm up in the background so the server binds immediately."""
+    if settings.warmup_on_startup:
+        asyncio.get_running_loop().run_in_executor(None, warm_up)
+    else:
+        warmup_state["status"] = "ready"
+    
+    # Rebuild cached agent contexts in the background whenever ingestion bumps the KB version
+    get_cag_cache().start()
+
+# Bounded executor for the "threadpool" fallback mode
+executor: Optional[ThreadPoolExecutor] = None
+if settings.orchestrator_mode == "threadpool":
+    executor = ThreadPoolExecutor(
+        max_workers=settings.orchestrator_max_workers,
+        thread_name_prefix="orchestrator",
+    )
+
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    """Release orchestrator worker threads on shutdown."""
+    get_cag_cache().stop()
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+async def run_orchestrator(query: str, session_id: str, chat_history: List[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Run the orchestrator without blocking the event loop."""
+    if executor is not None:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor,
+            functools.partial(
+                get_orchestrator().process,
+                query=query,
+                session_id=session_id,
+                chat_history=chat_history
+            )
+        )
+    
+    return await get_orchestrator().aprocess(
+        query=query,
+        session_id=session_id,
+        chat_history=chat_history
+    )
 
 
 @app.get("/")
@@ -36,9 +127,33 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness endpoint: 200 once warm-up has completed, 503 until then."""
+    if warmup_state["status"] == "ready":
+        status = {
+            "status": "ready",
+            "contexts": get_cag_cache().stats(),
+            "embedding_cache": get_embedding_cache_stats(),
+        }
+        if _orchestrator is not None:
+            status["sessions"] = _orchestrator.sessions.stats()["sessions"]
+            if _orchestrator.response_cache is not None:
+                status["response_cache"] = _orchestrator.response_cache.stats()
+        return status
+    return JSONResponse(status_code=503, content=warmup_state)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """Chat endpoint that processes user messages through the orchestrator."""
+    started = time.perf_counter()
     try:
         # Generate session ID if not provided
         session_id = request.session_id or str(uuid.uuid4())
@@ -52,49 +167,69 @@ async def chat(request: ChatRequest):
             ]
         
         # Process through orchestrator
-        result = orchestrator.process(
+        result = await run_orchestrator(
             query=request.message,
             session_id=session_id,
             chat_history=chat_history
         )
         
+        REQUESTS.inc(endpoint="chat", agent_type=result["agent_type"], status="ok")
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="chat", agent_type=result["agent_type"])
         return ChatResponse(**result)
     
     except Exception as e:
+        REQUESTS.inc(endpoint="chat", status="error")
+        record_error("chat")
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
 
 async def stream_chat_response(message: str, session_id: str, chat_history: list = None) -> AsyncIterator[str]:
     """Stream chat response token by token."""
+    started = time.perf_counter()
     try:
-        # Process through orchestrator (non-streaming for now)
-        result = orchestrator.process(
+        agent_type = ""
+        agent_types = []
+        
+        async for event in get_orchestrator().astream(
             query=message,
             session_id=session_id,
             chat_history=chat_history
-        )
-        
-        # Stream the response word by word (simulated streaming)
-        response = result["response"]
-        words = response.split()
-        
-        for word in words:
-            chunk = {
-                "token": word + " ",
-                "agent_type": result["agent_type"],
-                "done": False
-            }
+        ):
+            if "agent_type" in event:
+                # Announce the routing decision before generation starts
+                agent_type = event["agent_type"]
+                agent_types = event["agent_types"]
+                chunk = {
+                    "token": "",
+                    "agent_type": agent_type,
+                    "agent_types": agent_types,
+                    "session_id": session_id,
+                    "done": False
+                }
+            else:
+                chunk = {
+                    "token": event["token"],
+                    "agent_type": agent_type,
+                    "done": False
+                }
             yield f"data: {json.dumps(chunk)}\n\n"
         
         # Send final chunk
         final_chunk = {
             "token": "",
-            "agent_type": result["agent_type"],
+            "agent_type": agent_type,
+            "agent_types": agent_types,
+            "session_id": session_id,
             "done": True
         }
         yield f"data: {json.dumps(final_chunk)}\n\n"
+        
+        REQUESTS.inc(endpoint="chat_stream", agent_type=agent_type, status="ok")
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="chat_stream", agent_type=agent_type)
     
     except Exception as e:
+        REQUESTS.inc(endpoint="chat_stream", status="error")
+        record_error("chat_stream")
         error_chunk = {
             "error": str(e),
             "done": True
@@ -124,6 +259,26 @@ async def chat_stream(request: ChatRequest):
     )
 
 
+async def stream_batch_results(items: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Answer a batch and stream one JSON line per item as it completes."""
+    async for result in BatchRunner(get_orchestrator()).run(items):
+        status = "error" if result["error"] else "ok"
+        REQUESTS.inc(endpoint="chat_batch", agent_type=result["agent_type"], status=status)
+        if status == "ok":
+            REQUEST_SECONDS.observe(result["timing"]["total_ms"] / 1000, endpoint="chat_batch", agent_type=result["agent_type"])
+        yield json.dumps(result) + "\n"
+
+
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest):
+    """Batch chat endpoint: stand-alone questions answered with batched routing and retrieval.
+    
+    Results stream back as JSON lines in completion order, each with its item id.
+    """
+    items = [item.model_dump() for item in request.items]
+    return StreamingResponse(stream_batch_results(items), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -132,4 +287,3 @@ if __name__ == "__main__":
         port=settings.api_port,
         reload=True
     )
-
@@ -0,0 +1,345 @@
+"""Prometheus-style metrics: request and stage latency histograms, cache and token counters."""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+# Latency buckets in seconds, from in-process work up to slow LLM generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Agent handling the current request; set by the orchestrator so shared code
+# (embedding, vector search, LLM callbacks) can label its measurements
+current_agent_type: ContextVar[str] = ContextVar("current_agent_type", default="")
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    """Render integers without a trailing .0."""
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class _Metric:
+    """Base class for labeled metrics."""
+    
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Label values in declaration order; missing labels are empty."""
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    def _labels(self, key: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+        """Render a label set, e.g. {stage="route",le="0.1"}."""
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+    
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+    
+    def render(self) -> List[str]:
+        """HELP/TYPE header followed by all samples."""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ] + self._samples()
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add to the counter of a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def value(self, **labels: str) -> float:
+        """Current value of a label set."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [
+                f"{self.name}{self._labels(key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())
+            ]
+
+
+class Gauge(Counter):
+    """Value that can be set and removed per label set, e.g. info-style metrics."""
+    
+    kind = "gauge"
+    
+    def set(self, value: float, **labels: str) -> None:
+        """Set the value of a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def remove_matching(self, **labels: str) -> None:
+        """Drop every label set whose values match the given labels."""
+        positions = [(self.labelnames.index(name), str(value)) for name, value in labels.items()]
+        with self._lock:
+            for key in [key for key in self._values if all(key[i] == value for i, value in positions)]:
+                del self._values[key]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+    
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+    
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * len(self.buckets), 0.0, 0]
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{self._labels(key, {'le': repr(bound)})} {bucket_count}")
+                lines.append(f"{self.name}_bucket{self._labels(key, {'le': '+Inf'})} {count}")
+                lines.append(f"{self.name}_sum{self._labels(key)} {repr(total)}")
+                lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together by the /metrics endpoint."""
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+    
+    def register(self, metric: _Metric) -> Any:
+        """Add a metric and return it."""
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "chat_requests_total", "Chat requests by endpoint, agent type and outcome.",
+    ("endpoint", "agent_type", "status"),
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "chat_request_duration_seconds", "End-to-end chat request latency.",
+    ("endpoint", "agent_type"),
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "stage_duration_seconds", "Time spent in each stage of a request.",
+    ("stage", "agent_type"),
+))
+LLM_CALLS = REGISTRY.register(Counter(
+    "llm_calls_total", "LLM calls by role and outcome.",
+    ("role", "agent_type", "status"),
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "LLM tokens by role and kind (prompt, cached_prompt or completion).",
+    ("role", "agent_type", "kind"),
+))
+PROMPT_PREFIX = REGISTRY.register(Gauge(
+    "prompt_prefix_info", "Static prompt prefix in use per agent type: template version and content hash.",
+    ("agent_type", "version", "prefix_hash"),
+))
+PROMPT_PREFIX_TOKENS = REGISTRY.register(Gauge(
+    "prompt_prefix_tokens", "Estimated tokens in the static prompt prefix per agent type.",
+    ("agent_type",),
+))
+ROUTING_DECISIONS = REGISTRY.register(Counter(
+    "routing_decisions_total", "Routing decisions by method (sticky, fast_path, llm, fallback) and agent type; a multi-intent query counts once per agent.",
+    ("method", "agent_type"),
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss).",
+    ("cache", "result"),
+))
+SPECULATIVE_DISCARDS = REGISTRY.register(Counter(
+    "speculative_retrievals_discarded_total", "Speculative retrievals of agents the router did not pick: cancelled, or wasted (could not be stopped and ran to completion).",
+    ("agent_type", "outcome"),
+))
+ERRORS = REGISTRY.register(Counter(
+    "errors_total", "Errors caught and handled, by component.",
+    ("component",),
+))
+LLM_GATEWAY_EVENTS = REGISTRY.register(Counter(
+    "llm_gateway_events_total", "LLM gateway events by role and provider (retry, rate_limited, hedge, hedge_won, failover, failed).",
+    ("role", "provider", "event"),
+))
+LLM_IN_FLIGHT = REGISTRY.register(Gauge(
+    "llm_in_flight_requests", "LLM requests holding a concurrency slot, per provider.",
+    ("provider",),
+))
+
+
+@contextmanager
+def span(stage: str, agent_type: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """Time a stage of the current request.
+
+    Yields the label dict so the block can fill in the agent type once known
+    (e.g. routing); by default it is the agent handling the current request.
+    """
+    labels = {"agent_type": current_agent_type.get() if agent_type is None else agent_type}
+    started = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage, agent_type=labels["agent_type"])
+
+
+@contextmanager
+def agent_scope(agent_type: str) -> Iterator[None]:
+    """Attribute everything measured inside the block to an agent type."""
+    token = current_agent_type.set(agent_type)
+    try:
+        yield
+    finally:
+        current_agent_type.reset(token)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache hit or miss."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_error(component: str) -> None:
+    """Count an error that was handled (and logged) by a component."""
+    ERRORS.inc(component=component)
+
+
+def record_prompt_prefix(agent_type: str, version: str, prefix_hash: str, tokens: int) -> None:
+    """Publish the static prompt prefix an agent currently sends, replacing the previous one."""
+    PROMPT_PREFIX.remove_matching(agent_type=agent_type)
+    PROMPT_PREFIX.set(1, agent_type=agent_type, version=version, prefix_hash=prefix_hash)
+    PROMPT_PREFIX_TOKENS.set(tokens, agent_type=agent_type)
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return REGISTRY.render()
+
+
+def _token_usage(response: LLMResult) -> Optional[Tuple[int, int]]:
+    """(prompt, completion) token counts reported by the provider, if any."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    
+    llm_output = response.llm_output or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage")
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    return None
+
+
+def _cached_prompt_tokens(response: LLMResult) -> int:
+    """Prompt tokens the provider served from its prompt cache, if reported."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            cached = (usage.get("input_token_details") or {}).get("cache_read")
+            if cached:
+                return cached
+    
+    llm_output = response.llm_output or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    # OpenAI reports prompt_tokens_details.cached_tokens, Anthropic cache_read_input_tokens
+    return (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or usage.get("cache_read_input_tokens") or 0
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Counts LLM calls and their token usage.
+
+    When the provider reports no usage (e.g. while streaming), the number of
+    streamed chunks is counted as completion tokens instead.
+    """
+    
+    # Only counters are touched, so there is no point in hopping to a thread
+    run_inline = True
+    
+    def __init__(self, role: str):
+        self.role = role
+        self._streamed: Dict[UUID, int] = {}
+    
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> None:
+        self._streamed[run_id] = 0
+    
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._streamed[run_id] = 0
+    
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if token:
+            self._streamed[run_id] = self._streamed.get(run_id, 0) + 1
+    
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        streamed = self._streamed.pop(run_id, 0)
+        agent_type = current_agent_type.get()
+        usage = _token_usage(response)
+        prompt_tokens, completion_tokens = usage if usage else (0, streamed)
+        
+        LLM_CALLS.inc(role=self.role, agent_type=agent_type, status="ok")
+        if prompt_tokens:
+            LLM_TOKENS.inc(prompt_tokens, role=self.role, agent_type=agent_type, kind="prompt")
+        if completion_tokens:
+            LLM_TOKENS.inc(completion_tokens, role=self.role, agent_type=agent_type, kind="completion")
+        cached_tokens = _cached_prompt_tokens(response)
+        if cached_tokens:
+            LLM_TOKENS.inc(cached_tokens, role=self.role, agent_type=agent_type, kind="cached_prompt")
+    
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._streamed.pop(run_id, None)
+        LLM_CALLS.inc(role=self.role, agent_type=current_agent_type.get(), status="error")
@@ -19,6 +19,17 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     """Response model for chat endpoint."""
     response: str
-    agent_type: str
+    agent_type: str  # Primary agent
     session_id: str
+    agent_types: List[str] = []  # Every agent that contributed, primary first
 
+
+class BatchChatItem(BaseModel):
+    """One question of a batch chat request."""
+    id: Optional[str] = None  # Echoed in the result; defaults to the item's position
+    message: str
+
+
+class BatchChatRequest(BaseModel):
+    """Request model for batch chat endpoint."""
+    items: List[BatchChatItem]
@@ -0,0 +1,202 @@
+"""Memory-mapped NumPy vector index, an in-process alternative to querying Chroma."""
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from config import index_dir, settings
+
+
+# Subdirectory of the index files, see config.index_dir()
+INDEX_DIR = "numpy_index"
+
+# k-means iterations when building the IVF partition
+KMEANS_ITERATIONS = 10
+
+# Rows scored per matrix multiplication while building the partition
+KMEANS_CHUNK_ROWS = 65536
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length so a dot product is a cosine similarity."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for every row, computed in chunks."""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), KMEANS_CHUNK_ROWS):
+        block = vectors[start:start + KMEANS_CHUNK_ROWS]
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def _kmeans(vectors: np.ndarray, n_clusters: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical k-means: unit-length centroids and the cluster of every row."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+    
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        
+        # Empty clusters keep their previous centroid
+        filled = counts > 0
+        centroids[filled] = _normalize_rows(sums[filled])
+    
+    return centroids, _assign(vectors, centroids)
+
+
+def _write_atomic(path: str, write) -> None:
+    """Write a file under a temporary name and move it into place."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def build_index(
+    collection_name: str,
+    ids: List[str],
+    embeddings: List[List[float]],
+    documents: List[str],
+    metadatas: List[Dict[str, Any]],
+    model_name: str,
+    directory: Optional[str] = None
+) -> None:
+    """Write a collection's vectors as a float32 matrix plus its documents.
+
+    Collections of at least settings.numpy_index_ivf_threshold vectors also
+    get an inverted-file partition, so queries only score the closest lists.
+    """
+    directory = directory or index_dir(INDEX_DIR)
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, collection_name)
+    
+    if ids:
+        matrix = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+    _write_atomic(f"{base}.npy", lambda f: np.save(f, matrix))
+    
+    ivf_path = f"{base}.ivf.npz"
+    if len(ids) >= settings.numpy_index_ivf_threshold:
+        n_lists = max(1, int(np.sqrt(len(ids))))
+        centroids, assignments = _kmeans(matrix, n_lists)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+        _write_atomic(ivf_path, lambda f: np.savez(f, centroids=centroids, order=order, offsets=offsets))
+    elif os.path.exists(ivf_path):
+        os.remove(ivf_path)
+    
+    payload = {"model": model_name, "ids": ids, "documents": documents, "metadatas": metadatas}
+    _write_atomic(f"{base}.json", lambda f: f.write(json.dumps(payload).encode("utf-8")))
+
+
+def export_collection(collection, model_name: str, directory: Optional[str] = None) -> int:
+    """Export a Chroma collection to a NumPy index; returns the number of vectors."""
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    build_index(
+        collection.name,
+        data["ids"],
+        data["embeddings"],
+        data["documents"],
+        data["metadatas"],
+        model_name,
+        directory,
+    )
+    return len(data["ids"])
+
+
+class NumpyIndex:
+    """Exact (or IVF-partitioned) cosine top-k over a memory-mapped matrix."""
+    
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        model_name: str,
+        ivf: Optional[Dict[str, np.ndarray]] = None
+    ):
+        self.matrix = matrix
+        self.documents = documents
+        self.metadatas = metadatas
+        self.model_name = model_name
+        self.ivf = ivf
+    
+    @classmethod
+    def load(cls, collection_name: str, directory: Optional[str] = None) -> Optional["NumpyIndex"]:
+        """Open an exported index, or None if the collection was never exported."""
+        base = os.path.join(directory or index_dir(INDEX_DIR), collection_name)
+        if not os.path.exists(f"{base}.npy") or not os.path.exists(f"{base}.json"):
+            return None
+        
+        with open(f"{base}.json", encoding="utf-8") as f:
+            payload = json.load(f)
+        try:
+            matrix = np.load(f"{base}.npy", mmap_mode="r")
+        except ValueError:
+            matrix = np.load(f"{base}.npy")  # Empty arrays cannot be memory-mapped
+        
+        ivf = None
+        if os.path.exists(f"{base}.ivf.npz"):
+            with np.load(f"{base}.ivf.npz") as data:
+                ivf = {name: data[name] for name in ("centroids", "order", "offsets")}
+        
+        return cls(matrix, payload["documents"], payload["metadatas"], payload["model"], ivf)
+    
+    def __len__(self) -> int:
+        return len(self.documents)
+    
+    def _uses_ivf(self) -> bool:
+        """Whether queries probe a subset of the inverted lists."""
+        return self.ivf is not None and settings.numpy_index_ivf_nprobe < len(self.ivf["centroids"])
+    
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        """Rows in the inverted lists closest to a query."""
+        n_probe = settings.numpy_index_ivf_nprobe
+        probed = np.argpartition(-(self.ivf["centroids"] @ query), n_probe - 1)[:n_probe]
+        offsets, order = self.ivf["offsets"], self.ivf["order"]
+        return np.concatenate([order[offsets[i]:offsets[i + 1]] for i in probed])
+    
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the k highest scores, best first."""
+        if k < len(scores):
+            positions = np.argpartition(-scores, k - 1)[:k]
+        else:
+            positions = np.arange(len(scores))
+        return positions[np.argsort(-scores[positions])]
+    
+    def search(self, query_vectors: np.ndarray, k: int = 5) -> List[List[Tuple[int, float]]]:
+        """Top-k (row, cosine similarity) pairs for each query vector."""
+        queries = _normalize_rows(np.atleast_2d(np.asarray(query_vectors, dtype=np.float32)))
+        if not len(self) or k <= 0:
+            return [[] for _ in queries]
+        
+        if not self._uses_ivf():
+            # All queries are scored in a single matrix multiplication
+            all_scores = queries @ self.matrix.T
+            return [
+                [(int(row), float(scores[row])) for row in self._top_k(scores, k)]
+                for scores in all_scores
+            ]
+        
+        results = []
+        for query in queries:
+            rows = self._candidates(query)
+            scores = self.matrix[rows] @ query
+            results.append([(int(rows[p]), float(scores[p])) for p in self._top_k(scores, k)])
+        return results
+    
+    def search_documents(self, query_vectors: np.ndarray, k: int = 5) -> List[List[Document]]:
+        """Top-k documents for each query vector."""
+        return [
+            [Document(page_content=self.documents[row], metadata=self.metadatas[row] or {}) for row, _ in hits]
+            for hits in self.search(query_vectors, k)
+        ]
@@ -0,0 +1,138 @@
+"""Semantic response cache for repeated customer questions."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from config import settings
+from metrics import record_cache
+
+
+class CachedResponse:
+    """A cached answer together with the normalized embedding of its question."""
+    
+    __slots__ = ("vector", "response", "agent_type", "kb_version", "created_at")
+    
+    def __init__(self, vector: np.ndarray, response: str, agent_type: str, kb_version: str):
+        self.vector = vector
+        self.response = response
+        self.agent_type = agent_type
+        self.kb_version = kb_version
+        self.created_at = time.monotonic()
+
+
+class SemanticResponseCache:
+    """Embedding-keyed answer cache with per-agent LRU scopes and TTL expiry.
+
+    Each agent type has its own bounded scope so one busy agent cannot evict
+    another's answers. Entries are tagged with the knowledge-base version they
+    were generated against and never match under a different version.
+    """
+    
+    def __init__(
+        self,
+        similarity_threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        self.similarity_threshold = (
+            settings.response_cache_similarity_threshold if similarity_threshold is None else similarity_threshold
+        )
+        self.max_entries = settings.response_cache_max_entries if max_entries is None else max_entries
+        self.ttl_seconds = settings.response_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._lock = threading.Lock()
+        self._scopes: Dict[str, "OrderedDict[int, CachedResponse]"] = {}
+        self._matrices: Dict[str, tuple] = {}
+        self._next_id = 0
+        self._hits = 0
+        self._misses = 0
+    
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 array."""
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+    
+    def _matrix(self, agent_type: str) -> tuple:
+        """Stacked vectors of a scope, rebuilt only after the scope changes."""
+        cached = self._matrices.get(agent_type)
+        if cached is None:
+            entries = self._scopes[agent_type]
+            ids = list(entries.keys())
+            matrix = np.stack([entries[i].vector for i in ids]) if ids else None
+            cached = (ids, matrix)
+            self._matrices[agent_type] = cached
+        return cached
+    
+    def _expire(self, agent_type: str, kb_version: str) -> None:
+        """Drop entries that are past their TTL or from another knowledge-base version."""
+        entries = self._scopes[agent_type]
+        now = time.monotonic()
+        stale = [
+            entry_id for entry_id, entry in entries.items()
+            if entry.kb_version != kb_version or now - entry.created_at > self.ttl_seconds
+        ]
+        for entry_id in stale:
+            del entries[entry_id]
+        if stale:
+            self._matrices.pop(agent_type, None)
+    
+    def lookup(self, query_vector: List[float], kb_version: str) -> Optional[CachedResponse]:
+        """Find the most similar cached answer above the similarity threshold."""
+        vector = self._normalize(query_vector)
+        
+        with self._lock:
+            best: Optional[CachedResponse] = None
+            best_score = self.similarity_threshold
+            best_scope, best_id = None, None
+            
+            for agent_type in list(self._scopes.keys()):
+                self._expire(agent_type, kb_version)
+                ids, matrix = self._matrix(agent_type)
+                if matrix is None or matrix.shape[1] != vector.shape[0]:
+                    continue
+                
+                scores = matrix @ vector
+                index = int(np.argmax(scores))
+                if scores[index] >= best_score:
+                    best_score = float(scores[index])
+                    best_scope, best_id = agent_type, ids[index]
+                    best = self._scopes[agent_type][best_id]
+            
+            if best is None:
+                self._misses += 1
+                record_cache("response", hit=False)
+                return None
+            
+            self._scopes[best_scope].move_to_end(best_id)
+            self._hits += 1
+            record_cache("response", hit=True)
+            return best
+    
+    def store(self, query_vector: List[float], kb_version: str, agent_type: str, response: str) -> None:
+        """Cache an answer, evicting the least recently used entry of its scope if full."""
+        if self.max_entries <= 0:
+            return
+        entry = CachedResponse(self._normalize(query_vector), response, agent_type, kb_version)
+        
+        with self._lock:
+            entries = self._scopes.setdefault(agent_type, OrderedDict())
+            entries[self._next_id] = entry
+            self._next_id += 1
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._matrices.pop(agent_type, None)
+    
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size per scope."""
+        with self._lock:
+            total = self._hits + self._misses
+            stats = {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
+            for agent_type, entries in self._scopes.items():
+                stats[f"entries_{agent_type}"] = len(entries)
+            return stats
@@ -0,0 +1,172 @@
+"""Retrieval modes: dense vector search, BM25 keyword search, or both fused by rank."""
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from config import settings
+from vector_store import asearch_documents, asearch_documents_batch, get_registry, search_documents
+from metrics import record_error, span
+
+
+logger = logging.getLogger(__name__)
+
+
+# Rank offset of reciprocal rank fusion; damps the weight of the very top ranks
+RRF_K = 60
+
+# Runs the vector side of synchronous hybrid searches next to the keyword side
+_executor = ThreadPoolExecutor(thread_name_prefix="hybrid-search")
+
+
+def _document_key(doc: Document) -> Tuple[str, str]:
+    """Identity of a chunk across retrievers."""
+    return doc.metadata.get("source", ""), doc.page_content
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 5, rrf_k: int = RRF_K) -> List[Document]:
+    """Merge ranked lists, scoring each chunk by the sum of 1 / (rrf_k + rank)."""
+    scores: Dict[Tuple[str, str], float] = {}
+    documents: Dict[Tuple[str, str], Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _document_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    
+    # Ties keep the order in which the chunks were first seen
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:k]]
+
+
+def lexical_search(query: str, collection_name: str, k: int = 5) -> Optional[List[Document]]:
+    """BM25 search without any embedding call; None if the collection has no keyword index."""
+    index = get_registry().get_lexical_index(collection_name)
+    if index is None:
+        return None
+    
+    with span("lexical_search"):
+        return index.search_documents(query, k)
+
+
+def _fuse(vector_docs: Optional[List[Document]], lexical_docs: Optional[List[Document]], k: int) -> List[Document]:
+    """Fuse whichever result lists are available."""
+    rankings = [docs for docs in (vector_docs, lexical_docs) if docs]
+    if not rankings:
+        return []
+    return reciprocal_rank_fusion(rankings, k)
+
+
+def _vector_timeout(lexical_results) -> Optional[float]:
+    """How long to wait for vector search: bounded only when keyword results can stand in."""
+    return None if lexical_results is None else settings.hybrid_vector_timeout_seconds
+
+
+def _vector_failed(error: BaseException) -> None:
+    """Report a vector search that was dropped from a hybrid search."""
+    if isinstance(error, (FutureTimeoutError, asyncio.TimeoutError)):
+        logger.warning("Vector search timed out after %ss, using keyword results", settings.hybrid_vector_timeout_seconds)
+        record_error("vector_search_timeout")
+    else:
+        logger.warning("Error in vector search, using keyword results: %s", error)
+        record_error("vector_search")
+
+
+def hybrid_search(query: str, collection_name: str, k: int = 5) -> List[Document]:
+    """Vector and BM25 search run in parallel, fused by reciprocal rank.
+
+    If vector search fails or exceeds settings.hybrid_vector_timeout_seconds,
+    the keyword results are used alone.
+    """
+    candidates = max(k, settings.hybrid_candidates)
+    context = contextvars.copy_context()
+    vector_future = _executor.submit(context.run, search_documents, query, collection_name, candidates)
+    lexical_docs = lexical_search(query, collection_name, candidates)
+    
+    try:
+        vector_docs = vector_future.result(timeout=_vector_timeout(lexical_docs))
+    except Exception as e:
+        _vector_failed(e)
+        vector_docs = None
+    
+    return _fuse(vector_docs, lexical_docs, k)
+
+
+async def ahybrid_search(query: str, collection_name: str, k: int = 5) -> List[Document]:
+    """Vector and BM25 search run concurrently without blocking the event loop."""
+    candidates = max(k, settings.hybrid_candidates)
+    vector_task = asyncio.create_task(asearch_documents(query, collection_name, candidates))
+    lexical_docs = await asyncio.to_thread(lexical_search, query, collection_name, candidates)
+    
+    try:
+        vector_docs = await asyncio.wait_for(vector_task, timeout=_vector_timeout(lexical_docs))
+    except Exception as e:
+        _vector_failed(e)
+        vector_docs = None
+    
+    return _fuse(vector_docs, lexical_docs, k)
+
+
+def retrieve_documents(query: str, collection_name: str, k: int = 5) -> List[Document]:
+    """Search a collection with the mode selected by settings.retrieval_mode.
+
+    Collections without a keyword index fall back to vector search.
+    """
+    mode = settings.retrieval_mode
+    if mode == "lexical":
+        docs = lexical_search(query, collection_name, k)
+        if docs is not None:
+            return docs
+    elif mode == "hybrid":
+        return hybrid_search(query, collection_name, k)
+    return search_documents(query, collection_name, k=k)
+
+
+async def aretrieve_documents(query: str, collection_name: str, k: int = 5) -> List[Document]:
+    """Search a collection with the configured mode without blocking the event loop."""
+    mode = settings.retrieval_mode
+    if mode == "lexical":
+        docs = await asyncio.to_thread(lexical_search, query, collection_name, k)
+        if docs is not None:
+            return docs
+    elif mode == "hybrid":
+        return await ahybrid_search(query, collection_name, k)
+    return await asearch_documents(query, collection_name, k=k)
+
+
+def _lexical_search_batch(queries: List[str], collection_name: str, k: int) -> List[Optional[List[Document]]]:
+    """BM25 search for every query; entries are None if the collection has no keyword index."""
+    return [lexical_search(query, collection_name, k) for query in queries]
+
+
+async def aretrieve_documents_batch(queries: List[str], collection_name: str, k: int = 5) -> List[List[Document]]:
+    """Search a collection for many queries with the configured mode, one result list per query.
+
+    The vector side embeds all queries in one call and searches them together;
+    keyword search is cheap enough to run per query. In hybrid mode a failed
+    or timed-out vector search falls back to the keyword results, as in
+    hybrid_search().
+    """
+    if not queries:
+        return []
+    
+    mode = settings.retrieval_mode
+    if mode == "lexical":
+        results = await asyncio.to_thread(_lexical_search_batch, queries, collection_name, k)
+        if results[0] is not None:
+            return results
+    elif mode == "hybrid":
+        candidates = max(k, settings.hybrid_candidates)
+        vector_task = asyncio.create_task(asearch_documents_batch(queries, collection_name, candidates))
+        lexical_results = await asyncio.to_thread(_lexical_search_batch, queries, collection_name, candidates)
+        try:
+            vector_results = await asyncio.wait_for(vector_task, timeout=_vector_timeout(lexical_results[0]))
+        except Exception as e:
+            _vector_failed(e)
+            vector_results = [None] * len(queries)
+        return [
+            _fuse(vector_docs, lexical_docs, k)
+            for vector_docs, lexical_docs in zip(vector_results, lexical_results)
+        ]
+    return await asearch_documents_batch(queries, collection_name, k=k)
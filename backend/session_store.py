@@ -0,0 +1,222 @@
+"""Server-side conversation sessions with a token-budgeted history window."""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from config import settings
+
+
+# Longest excerpt of a message kept in the rolling summary
+SUMMARY_SNIPPET_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def history_to_messages(chat_history: Optional[List[Dict[str, str]]]) -> List[BaseMessage]:
+    """Convert role/content dicts into chat messages for a prompt.
+
+    History goes after the agent's system prompt, and Anthropic models on
+    Bedrock reject a system message anywhere but first, so the session
+    summary is sent as a human message.
+    """
+    messages: List[BaseMessage] = []
+    for message in chat_history or []:
+        role, content = message.get("role"), message.get("content", "")
+        if role == "user":
+            messages.append(HumanMessage(content=content))
+        elif role == "assistant":
+            messages.append(AIMessage(content=content))
+        elif role == "system":
+            messages.append(HumanMessage(content=content))
+    return messages
+
+
+class Session:
+    """A conversation: recent messages verbatim, older ones folded into a summary."""
+    
+    __slots__ = ("session_id", "messages", "summary", "last_agent_type", "updated_at")
+    
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.messages: List[Dict[str, str]] = []
+        self.summary = ""
+        self.last_agent_type = ""
+        self.updated_at = time.time()
+    
+    def history(self) -> List[Dict[str, str]]:
+        """The conversation as role/content dicts, summary first."""
+        history = []
+        if self.summary:
+            history.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        return history + list(self.messages)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "summary": self.summary,
+            "last_agent_type": self.last_agent_type,
+            "updated_at": self.updated_at,
+        }
+    
+    @classmethod
+    def from_dict(cls, session_id: str, data: Dict[str, Any]) -> "Session":
+        session = cls(session_id)
+        session.messages = data.get("messages", [])
+        session.summary = data.get("summary", "")
+        session.last_agent_type = data.get("last_agent_type", "")
+        session.updated_at = data.get("updated_at", session.updated_at)
+        return session
+
+
+class SessionStore:
+    """Conversation history keyed by session_id.
+
+    Sessions live in a bounded in-memory LRU and expire after a TTL of
+    inactivity; an optional SQLite file keeps them across restarts. Each
+    session keeps its most recent messages within a token budget and folds
+    older ones into a short rolling summary, so prompt size stays bounded no
+    matter how long the conversation runs.
+    """
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        history_token_budget: Optional[int] = None,
+        summary_token_budget: Optional[int] = None,
+        path: Optional[str] = None
+    ):
+        self.max_entries = settings.session_max_entries if max_entries is None else max_entries
+        self.ttl_seconds = settings.session_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.history_token_budget = (
+            settings.session_history_token_budget if history_token_budget is None else history_token_budget
+        )
+        self.summary_token_budget = (
+            settings.session_summary_token_budget if summary_token_budget is None else summary_token_budget
+        )
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Session]" = OrderedDict()
+        self._db = None
+        
+        path = settings.session_store_path if path is None else path
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, data TEXT, updated_at REAL)"
+            )
+            self._db.commit()
+    
+    def _expired(self, session: Session) -> bool:
+        return time.time() - session.updated_at > self.ttl_seconds
+    
+    def _remember(self, session: Session) -> None:
+        """Insert into the in-memory LRU; caller holds the lock."""
+        self._memory[session.session_id] = session
+        self._memory.move_to_end(session.session_id)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def _load(self, session_id: str) -> Optional[Session]:
+        """Look a live session up in memory, then on disk; caller holds the lock."""
+        session = self._memory.get(session_id)
+        if session is None and self._db is not None:
+            row = self._db.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None:
+                session = Session.from_dict(session_id, json.loads(row[0]))
+        
+        if session is None:
+            return None
+        if self._expired(session):
+            self._delete(session_id)
+            return None
+        
+        self._remember(session)
+        return session
+    
+    def _delete(self, session_id: str) -> None:
+        """Forget a session in memory and on disk; caller holds the lock."""
+        self._memory.pop(session_id, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._db.commit()
+    
+    def get(self, session_id: str) -> Optional[Session]:
+        """Get a session, or None if it does not exist or has expired."""
+        with self._lock:
+            return self._load(session_id)
+    
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        """Summary and recent messages of a session (empty for a new session)."""
+        with self._lock:
+            session = self._load(session_id)
+            return session.history() if session else []
+    
+    def window(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """The most recent messages that fit in the history token budget."""
+        kept: List[Dict[str, str]] = []
+        used = 0
+        for message in reversed(messages):
+            used += estimate_tokens(message.get("content", ""))
+            if used > self.history_token_budget and kept:
+                break
+            kept.append(message)
+        return list(reversed(kept))
+    
+    @staticmethod
+    def _summary_line(message: Dict[str, str]) -> str:
+        """One-line excerpt of a message for the rolling summary."""
+        content = " ".join(message.get("content", "").split())
+        if len(content) > SUMMARY_SNIPPET_CHARS:
+            content = content[:SUMMARY_SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+        role = "User" if message.get("role") == "user" else "Assistant"
+        return f"- {role}: {content}"
+    
+    def _compact(self, session: Session) -> None:
+        """Fold the oldest messages into the summary until the window fits the budget."""
+        recent = self.window(session.messages)
+        folded = session.messages[:len(session.messages) - len(recent)]
+        if not folded:
+            return
+        
+        lines = session.summary.splitlines() + [self._summary_line(message) for message in folded]
+        
+        # Keep the newest summary lines that fit the summary budget
+        kept: List[str] = []
+        used = 0
+        for line in reversed(lines):
+            used += estimate_tokens(line)
+            if used > self.summary_token_budget:
+                break
+            kept.append(line)
+        
+        session.summary = "\n".join(reversed(kept))
+        session.messages = recent
+    
+    def append_turn(self, session_id: str, question: str, answer: str, agent_type: str) -> None:
+        """Record a question and its answer, compacting the history if needed."""
+        with self._lock:
+            session = self._load(session_id) or Session(session_id)
+            session.messages.append({"role": "user", "content": question})
+            session.messages.append({"role": "assistant", "content": answer})
+            session.last_agent_type = agent_type
+            session.updated_at = time.time()
+            self._compact(session)
+            self._remember(session)
+            
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(session.to_dict()), session.updated_at)
+                )
+                self._db.commit()
+    
+    def stats(self) -> Dict[str, float]:
+        """Number of sessions held in memory."""
+        with self._lock:
+            return {"sessions": len(self._memory)}
@@ -0,0 +1,81 @@
+"""Tests for refreshing cached (CAG) contexts after another process re-ingests the knowledge base."""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from agents.cag_cache import CAGCacheManager
+from benchmarks.stubs import install_stub_embeddings
+from config import settings
+from vector_store import get_registry, reload_vector_stores, search_documents
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs an incremental ingestion with the stub embeddings, like run_ingest.py would
+INGEST_SCRIPT = """
+import sys
+sys.path.insert(0, {backend!r})
+from config import settings
+settings.chroma_db_path = {db!r}
+settings.embedding_cache_path = None
+from benchmarks.stubs import install_stub_embeddings
+import ingest_data
+from vector_store import get_registry, write_kb_version
+install_stub_embeddings()
+ingest_data.ingest({data!r}, get_registry().get_embeddings())
+write_kb_version(ingest_data.new_kb_version())
+"""
+
+
+def ingest_in_subprocess(data_dir: Path, db_path: Path) -> None:
+    """Ingest data_dir into db_path from a separate Python process."""
+    script = INGEST_SCRIPT.format(backend=BACKEND_DIR, db=str(db_path), data=str(data_dir))
+    subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, cwd=BACKEND_DIR)
+
+
+@pytest.fixture
+def knowledge_base(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "chroma_db_path", str(tmp_path / "chroma_db"))
+    monkeypatch.setattr(settings, "embedding_cache_path", None)
+    monkeypatch.setattr(settings, "retrieval_backend", "chroma")
+    install_stub_embeddings()
+    reload_vector_stores()
+    data_dir = tmp_path / "data" / "policy"
+    data_dir.mkdir(parents=True)
+    yield data_dir
+    reload_vector_stores()
+
+
+def test_refresh_sees_ingestion_from_another_process(knowledge_base, tmp_path):
+    """A refresh after an out-of-process ingestion rebuilds contexts from the new vectors."""
+    policy_file = knowledge_base / "privacy_policy.txt"
+    data_dir = tmp_path / "data"
+    db_path = tmp_path / "chroma_db"
+    
+    def load_policy():
+        docs = search_documents("privacy policy retention", f"{settings.chroma_collection_name}_policy", k=10)
+        return "\n".join(doc.page_content for doc in docs), docs
+    
+    cache = CAGCacheManager(refresh_interval=0)
+    cache.register("policy", load_policy)
+    
+    policy_file.write_text("Privacy policy: we keep customer data for 30 days.", encoding="utf-8")
+    ingest_in_subprocess(data_dir, db_path)
+    assert "30 days" in cache.get("policy").text
+    
+    policy_file.write_text("Privacy policy: we keep customer data for 90 days.", encoding="utf-8")
+    ingest_in_subprocess(data_dir, db_path)
+    
+    assert cache.refresh() == ["policy"]
+    text = cache.get("policy").text
+    assert "90 days" in text
+    assert "30 days" not in text
+    
+    # The registry's Chroma client sees the new collection contents too
+    assert get_registry().get(f"{settings.chroma_collection_name}_policy") is not None
@@ -0,0 +1,73 @@
+"""Tests for context packing: overlap trimming, merging adjacent chunks and the token budget."""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.documents import Document
+
+from agents.context_builder import build_context, merge_adjacent, pack
+from session_store import estimate_tokens
+
+# Text the ingestion splitter repeats at the end of one chunk and the start of the next
+OVERLAP = "refunds are issued to the original payment method"
+
+
+def chunk(index: int, text: str, source: str = "billing/invoice_faq.txt") -> Document:
+    """A retrieved chunk as ingestion stores it."""
+    return Document(page_content=text, metadata={"source": source, "chunk_index": index})
+
+
+def test_merge_trims_splitter_overlap():
+    """Consecutive chunks are joined once, without repeating the text they share."""
+    first = chunk(0, f"Annual plans can be cancelled within 30 days; {OVERLAP}")
+    second = chunk(1, f"{OVERLAP} within 5 business days.")
+    
+    merged = merge_adjacent([second, first])
+    
+    assert len(merged) == 1
+    assert merged[0].page_content == f"Annual plans can be cancelled within 30 days; {OVERLAP} within 5 business days."
+    assert merged[0].metadata["chunk_index"] == 0
+    assert merged[0].metadata["chunk_end"] == 1
+
+
+def test_merge_keeps_chunks_apart_across_index_gaps():
+    """Only consecutive chunk_index values merge; the runs keep the rank of their best chunk."""
+    docs = [
+        chunk(3, "Invoices list every seat added during the month."),
+        chunk(0, "Invoices are issued on the first day of the month."),
+        chunk(1, "Each invoice can be downloaded as a PDF."),
+        chunk(0, "Passwords must be at least 12 characters.", source="technical/setup_guide.txt"),
+    ]
+    
+    merged = merge_adjacent(docs)
+    
+    assert [doc.page_content for doc in merged] == [
+        "Invoices list every seat added during the month.",
+        "Invoices are issued on the first day of the month.\nEach invoice can be downloaded as a PDF.",
+        "Passwords must be at least 12 characters.",
+    ]
+
+
+def test_pack_truncates_oversized_first_document():
+    """A top document larger than the whole budget is cut at a word boundary instead of dropped."""
+    long_doc = Document(page_content=" ".join(f"word{i}" for i in range(2000)), metadata={"source": "a"})
+    small_doc = Document(page_content="Short answer.", metadata={"source": "b"})
+    
+    packed = pack([long_doc, small_doc], token_budget=50)
+    
+    assert packed[0].metadata["source"] == "a"
+    assert long_doc.page_content.startswith(packed[0].page_content)
+    assert not packed[0].page_content.endswith(" ")
+    assert sum(estimate_tokens(doc.page_content) for doc in packed) <= 50
+
+
+def test_build_context_drops_chunks_of_excluded_context():
+    """A chunk already in the cached static context is not repeated in the retrieved one."""
+    static = [Document(page_content=f"Policy: {OVERLAP} within 5 business days.")]
+    docs = [chunk(0, OVERLAP), chunk(7, "Refund requests go through the billing portal.")]
+    
+    context = build_context(docs, token_budget=100, exclude=static)
+    
+    assert [doc.page_content for doc in context] == ["Refund requests go through the billing portal."]
@@ -0,0 +1,91 @@
+"""Tests for keyword retrieval: BM25 scoring, reciprocal rank fusion and the hybrid fallback."""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import time
+
+from langchain_core.documents import Document
+
+import retrieval
+from bm25_index import BM25Index, build_index, tokenize
+from config import settings
+
+CHUNKS = [
+    "To reset your password open Settings and choose Security.",
+    "Error ERR-429 means the API rate limit was exceeded; retry after the api.retry_after_ms delay.",
+    "Invoices are emailed monthly. Invoices list every charge and every refund.",
+    "Invoices can be downloaded from the billing page " + "of the customer portal " * 20 + ".",
+]
+
+
+def exported_index(directory: str) -> BM25Index:
+    """Export the chunks as a collection and load it back."""
+    build_index("kb_test", CHUNKS, [{"row": row} for row in range(len(CHUNKS))], directory)
+    return BM25Index.load("kb_test", directory)
+
+
+def doc(text: str, source: str = "kb.txt") -> Document:
+    """A retrieved chunk."""
+    return Document(page_content=text, metadata={"source": source})
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    """Error codes and config keys match whole and by their parts."""
+    assert tokenize("What is ERR-429?") == ["err-429", "err", "429"]
+    assert "api.retry_after_ms" in tokenize("set api.retry_after_ms")
+
+
+def test_bm25_ranks_exact_terms_and_short_chunks_first(tmp_path):
+    """An exact identifier finds its chunk; repeated terms and shorter chunks score higher."""
+    index = exported_index(str(tmp_path))
+    
+    assert [row for row, _ in index.search("ERR-429", k=3)] == [1]
+    assert [row for row, _ in index.search("invoices", k=3)] == [2, 3]
+    assert index.search_documents("password security", k=1)[0].metadata == {"row": 0}
+
+
+def test_bm25_leaves_out_chunks_without_query_terms(tmp_path):
+    """Rows sharing no term with the query are not returned, and k bounds the rest."""
+    index = exported_index(str(tmp_path))
+    
+    assert index.search("kubernetes helm chart", k=5) == []
+    assert len(index.search("invoices error password", k=2)) == 2
+    assert BM25Index.load("kb_missing", str(tmp_path)) is None
+
+
+def test_rrf_favors_chunks_found_by_both_retrievers():
+    """A chunk ranked by both lists beats one ranked first by a single list."""
+    vector = [doc("a"), doc("b"), doc("c")]
+    lexical = [doc("d"), doc("b"), doc("a")]
+    
+    fused = retrieval.reciprocal_rank_fusion([vector, lexical], k=3)
+    
+    assert [d.page_content for d in fused] == ["a", "b", "d"]
+
+
+def test_rrf_tells_chunks_apart_by_source_and_keeps_first_seen_order_on_ties():
+    """Equal text from different sources stays separate; tied scores keep their first order."""
+    fused = retrieval.reciprocal_rank_fusion([[doc("same", "a.txt")], [doc("same", "b.txt")]], k=5)
+    
+    assert [d.metadata["source"] for d in fused] == ["a.txt", "b.txt"]
+
+
+def test_hybrid_search_falls_back_to_keyword_results(monkeypatch):
+    """A failing or slow vector search leaves the keyword results, in their order."""
+    lexical = [doc("x"), doc("y")]
+    monkeypatch.setattr(retrieval, "lexical_search", lambda query, collection_name, k: lexical)
+    monkeypatch.setattr(settings, "hybrid_vector_timeout_seconds", 0.05)
+    
+    def failing_search(query, collection_name, k):
+        raise RuntimeError("connection reset")
+    
+    def slow_search(query, collection_name, k):
+        time.sleep(0.5)
+        return [doc("z")]
+    
+    for search in (failing_search, slow_search):
+        monkeypatch.setattr(retrieval, "search_documents", search)
+        assert [d.page_content for d in retrieval.hybrid_search("q", "kb_test", k=2)] == ["x", "y"]
@@ -0,0 +1,91 @@
+"""Tests for incremental ingestion: added, edited and deleted files, and knowledge-base versions."""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import chromadb
+import pytest
+
+import ingest_data
+from benchmarks.stubs import install_stub_embeddings
+from config import settings
+from vector_store import get_kb_version, get_registry, reload_vector_stores
+
+BILLING_COLLECTION = f"{settings.chroma_collection_name}_billing"
+
+# Paragraphs long enough that the invoice FAQ splits into several chunks
+PARAGRAPHS = [
+    f"Invoice question {n}: " + " ".join(f"invoices for plan {n} are issued monthly with line item {i}." for i in range(20))
+    for n in range(4)
+]
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "chroma_db_path", str(tmp_path / "chroma_db"))
+    monkeypatch.setattr(settings, "embedding_cache_path", None)
+    monkeypatch.setattr(settings, "ingest_workers", 1)
+    monkeypatch.setattr(settings, "openai_api_key", "unused-with-stub-embeddings")
+    monkeypatch.setattr(ingest_data, "DATA_DIR", str(tmp_path / "data"))
+    install_stub_embeddings()
+    reload_vector_stores()
+    (tmp_path / "data" / "billing").mkdir(parents=True)
+    yield tmp_path / "data"
+    reload_vector_stores()
+
+
+def stored_chunks() -> list:
+    """Texts of the chunks in the billing collection."""
+    client = chromadb.PersistentClient(path=settings.chroma_db_path)
+    try:
+        return client.get_collection(BILLING_COLLECTION).get()["documents"]
+    except ValueError:
+        return []
+
+
+def test_incremental_ingest_add_edit_delete(data_dir):
+    """Each run re-embeds only what changed and leaves no stale chunks behind."""
+    faq = data_dir / "billing" / "invoice_faq.txt"
+    embeddings = get_registry().get_embeddings()
+    
+    faq.write_text("\n\n".join(PARAGRAPHS), encoding="utf-8")
+    counts = ingest_data.ingest(str(data_dir), embeddings)
+    assert counts["changed"] == 1
+    chunks = stored_chunks()
+    assert len(chunks) == counts["added"] > 1
+    
+    counts = ingest_data.ingest(str(data_dir), embeddings)
+    assert (counts["unchanged"], counts["changed"], counts["added"]) == (1, 0, 0)
+    
+    faq.write_text("\n\n".join(PARAGRAPHS[:-1] + ["Invoices can also be paid by bank transfer."]), encoding="utf-8")
+    counts = ingest_data.ingest(str(data_dir), embeddings)
+    assert counts["changed"] == 1
+    assert counts["kept"] > 0
+    assert 0 < counts["added"] < len(chunks)
+    text = "\n".join(stored_chunks())
+    assert "bank transfer" in text
+    assert "Invoice question 3" not in text
+    
+    faq.unlink()
+    counts = ingest_data.ingest(str(data_dir), embeddings)
+    assert counts["removed"] == 1
+    assert stored_chunks() == []
+    assert ingest_data.load_manifest() == {}
+
+
+def test_kb_version_changes_on_every_changing_run(data_dir):
+    """Every run that changes the knowledge base writes a new version; a no-op run keeps it."""
+    faq = data_dir / "billing" / "invoice_faq.txt"
+    versions = []
+    
+    for text in PARAGRAPHS[:3]:
+        faq.write_text(text, encoding="utf-8")
+        ingest_data.main()
+        versions.append(get_kb_version())
+    ingest_data.main()
+    
+    assert len(set(versions)) == len(versions)
+    assert get_kb_version() == versions[-1]
+    assert len({ingest_data.new_kb_version() for _ in range(1000)}) == 1000
@@ -0,0 +1,72 @@
+"""Tests for the LLM gateway: retries and provider failover, without calling any API."""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from typing import Any, List
+from langchain_aws.chat_models.bedrock import _format_anthropic_messages
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from benchmarks.stubs import StubChatModel
+from config import settings
+from llm_providers import GatewayChatModel
+from session_store import SessionStore, history_to_messages
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class RateLimitedModel(StubChatModel):
+    """Stub provider that is always rate limited."""
+    
+    def _generate(self, messages: List[BaseMessage], *args: Any, **kwargs: Any):
+        raise RateLimitError("Too many requests")
+
+
+class AnthropicBedrockModel(StubChatModel):
+    """Stub provider that formats its prompt the way ChatBedrock does for Anthropic models."""
+    
+    answer: str = "Answered by Bedrock."
+    
+    def _generate(self, messages: List[BaseMessage], *args: Any, **kwargs: Any):
+        _format_anthropic_messages(messages)
+        return super()._generate(messages, *args, **kwargs)
+
+
+def summarized_history() -> list:
+    """History of a session long enough to have a rolling summary."""
+    store = SessionStore(history_token_budget=40, summary_token_budget=200, path="")
+    for turn in range(6):
+        store.append_turn("s", f"Question {turn} about my invoice and the charges on it?", f"Answer {turn} " * 10, "billing")
+    history = store.history("s")
+    assert history[0]["content"].startswith("Summary of the earlier conversation")
+    return history
+
+
+def test_failover_to_bedrock_with_summarized_history(monkeypatch):
+    """A summarized session still fails over from OpenAI to Anthropic on Bedrock."""
+    monkeypatch.setattr(settings, "llm_max_retries", 0)
+    monkeypatch.setattr(settings, "llm_failover_cooldown_seconds", 0.0)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are a billing specialist."),
+        MessagesPlaceholder("history", optional=True),
+        ("human", "{question}"),
+    ])
+    gateway = GatewayChatModel(role="generator", providers=[
+        ("openai", RateLimitedModel()),
+        ("bedrock", AnthropicBedrockModel()),
+    ])
+    chain = prompt | gateway | StrOutputParser()
+    
+    answer = chain.invoke({
+        "history": history_to_messages(summarized_history()),
+        "question": "Why was I charged twice?",
+    })
+    
+    assert answer == "Answered by Bedrock."
+
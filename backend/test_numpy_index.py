@@ -0,0 +1,83 @@
+"""Tests for the NumPy vector index: exact search, IVF search and the exact fallback."""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+from config import settings
+from numpy_index import NumpyIndex, build_index
+
+
+def clustered_vectors(n_clusters: int = 16, per_cluster: int = 25, dimensions: int = 32) -> np.ndarray:
+    """Unit vectors scattered around random cluster centers, like topical chunks."""
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(n_clusters, dimensions))
+    vectors = np.repeat(centers, per_cluster, axis=0) + 0.3 * rng.normal(size=(n_clusters * per_cluster, dimensions))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def exported_index(directory: str, vectors: np.ndarray) -> NumpyIndex:
+    """Export vectors as a collection and load it back."""
+    ids = [f"chunk-{row}" for row in range(len(vectors))]
+    metadatas = [{"row": row} for row in range(len(vectors))]
+    build_index("kb_test", ids, vectors.tolist(), ids, metadatas, "hashing-256", directory)
+    return NumpyIndex.load("kb_test", directory)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    """Brute-force top-k rows per query."""
+    return [list(np.argsort(-(vectors @ query))[:k]) for query in queries]
+
+
+def test_exact_search_matches_brute_force(tmp_path, monkeypatch):
+    """Below the IVF threshold every row is scored and results are exact, best first."""
+    monkeypatch.setattr(settings, "numpy_index_ivf_threshold", 10_000)
+    vectors = clustered_vectors()
+    index = exported_index(str(tmp_path), vectors)
+    
+    assert index.ivf is None
+    hits = index.search(vectors[:20], k=5)
+    assert [[row for row, _ in query_hits] for query_hits in hits] == exact_top_k(vectors, vectors[:20], 5)
+    assert hits[0][0] == (0, pytest.approx(1.0, abs=1e-5))
+    assert index.search_documents(vectors[3], k=1)[0][0].metadata == {"row": 3}
+
+
+def test_ivf_search_finds_nearest_neighbors(tmp_path, monkeypatch):
+    """Above the threshold queries probe the closest lists and still find their neighbors."""
+    monkeypatch.setattr(settings, "numpy_index_ivf_threshold", 100)
+    monkeypatch.setattr(settings, "numpy_index_ivf_nprobe", 4)
+    vectors = clustered_vectors()
+    index = exported_index(str(tmp_path), vectors)
+    
+    assert index._uses_ivf()
+    assert len(index.ivf["centroids"]) == int(np.sqrt(len(vectors)))
+    queries = vectors[::10]
+    expected = exact_top_k(vectors, queries, 10)
+    hits = index.search(queries, k=10)
+    recall = np.mean([len({row for row, _ in found} & set(exact)) / 10 for found, exact in zip(hits, expected)])
+    assert recall >= 0.9
+    assert all(found[0][0] == exact[0] for found, exact in zip(hits, expected))
+
+
+def test_ivf_falls_back_to_exact_when_probing_every_list(tmp_path, monkeypatch):
+    """With nprobe at least the number of lists, search scores every row exactly."""
+    monkeypatch.setattr(settings, "numpy_index_ivf_threshold", 100)
+    vectors = clustered_vectors()
+    index = exported_index(str(tmp_path), vectors)
+    monkeypatch.setattr(settings, "numpy_index_ivf_nprobe", len(index.ivf["centroids"]))
+    
+    assert not index._uses_ivf()
+    hits = index.search(vectors[:20], k=5)
+    assert [[row for row, _ in query_hits] for query_hits in hits] == exact_top_k(vectors, vectors[:20], 5)
+
+
+def test_empty_collection_returns_no_hits(tmp_path):
+    """An exported empty collection loads and answers every query with no hits."""
+    build_index("kb_empty", [], [], [], [], "hashing-256", str(tmp_path))
+    index = NumpyIndex.load("kb_empty", str(tmp_path))
+    
+    assert index.search(np.ones((2, 8)), k=3) == [[], []]
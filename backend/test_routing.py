@@ -0,0 +1,65 @@
+"""Tests for query routing: local fast path and stickiness vs multi-intent fan-out."""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import json
+from typing import List
+
+import pytest
+from langchain_core.messages import BaseMessage
+
+from benchmarks import stubs
+from benchmarks.stubs import install_stub_llms
+from config import settings
+
+# Agents the stub router LLM picks for a keyword found in the query
+ROUTER_KEYWORDS = (("billing", ("invoice", "charged")), ("technical", ("crash", "error")), ("policy", ("gdpr", "privacy")))
+
+
+def stub_router_reply(self, messages: List[BaseMessage]) -> str:
+    """Router LLM stub that lists every agent whose keywords appear in the query."""
+    if messages and "query router" in str(messages[0].content):
+        query = str(messages[-1].content).lower()
+        agents = [agent for agent, keywords in ROUTER_KEYWORDS if any(keyword in query for keyword in keywords)]
+        return json.dumps({"agents": agents or ["technical"]})
+    return self.answer
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    monkeypatch.setattr(settings, "fast_router_enabled", True)
+    monkeypatch.setattr(settings, "sticky_routing", "always")
+    monkeypatch.setattr(stubs.StubChatModel, "_reply", stub_router_reply)
+    install_stub_llms()
+    
+    from agents.orchestrator import OrchestratorAgent
+    return OrchestratorAgent()
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("My invoice is wrong, and also the dashboard crashes on login", ["billing", "technical"]),
+    ("I was charged twice and also want to delete my account data under GDPR", ["billing", "policy"]),
+    ("Where is my invoice? Also, the API keeps throwing an error.", ["billing", "technical"]),
+])
+def test_multi_intent_query_fans_out(orchestrator, query, expected):
+    """Queries joining requests on different topics skip the fast path and sticky routing."""
+    assert orchestrator._classify_query(query, previous_agent_type="billing") == expected
+
+
+def test_single_intent_query_stays_local(orchestrator):
+    """A plain follow-up is still routed locally, without the router LLM."""
+    assert orchestrator._classify_query("thanks, that helps", previous_agent_type="policy") == ["policy"]
+
+
+@pytest.mark.parametrize("query, previous_agent_type", [
+    ("Can I also pay by card?", "billing"),
+    ("Does that also apply to annual plans?", "billing"),
+    ("Can I also export my data?", "policy"),
+    ("I also get error 500 when calling the API", "technical"),
+])
+def test_also_follow_up_stays_local(orchestrator, query, previous_agent_type):
+    """A single-topic follow-up with "also" is routed without the router LLM."""
+    assert orchestrator._local_route(query, previous_agent_type) == previous_agent_type
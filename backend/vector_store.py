@@ -1,29 +1,384 @@
 """Vector store utilities for ChromaDB."""
+import asyncio
+import logging
 import os
-from typing import List, Optional
-from langchain_openai import OpenAIEmbeddings
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import chromadb
+from chromadb.api.client import SharedSystemClient
+import numpy as np
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from config import settings
+from embedding_providers import get_embedding_model
+from numpy_index import NumpyIndex
+from bm25_index import BM25Index
+from metrics import record_cache, record_error, span
 
 
-def get_vector_store(collection_name: str) -> Optional[Chroma]:
-    """Get a ChromaDB vector store instance."""
-    if not os.path.exists(settings.chroma_db_path):
-        return None
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that caches query vectors.
+
+    Keys are the embedding model name plus the whitespace-normalized text, so a
+    request embeds its query at most once no matter how many components look
+    it up. The in-memory LRU is bounded; an optional SQLite file keeps vectors
+    across restarts. Document embeddings (ingestion) pass through uncached.
+    """
     
-    embeddings = OpenAIEmbeddings(openai_api_key=settings.openai_api_key)
+    def __init__(self, embeddings: Embeddings, max_entries: Optional[int] = None, cache_path: Optional[str] = None):
+        self.embeddings = embeddings
+        self.model_name = embedding_model_name(embeddings)
+        self.max_entries = settings.embedding_cache_max_entries if max_entries is None else max_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._db = None
+        
+        cache_path = settings.embedding_cache_path if cache_path is None else cache_path
+        if cache_path:
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self._db.commit()
     
-    try:
-        vector_store = Chroma(
-            persist_directory=settings.chroma_db_path,
-            embedding_function=embeddings,
-            collection_name=collection_name,
+    def _key(self, text: str) -> str:
+        """Cache key for a text under the current embedding model."""
+        return f"{self.model_name}\x00{' '.join(text.split())}"
+    
+    def _get(self, key: str) -> Optional[List[float]]:
+        """Look a vector up in memory, then on disk."""
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                record_cache("embedding", hit=True)
+                return vector
+            
+            if self._db is not None:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32).tolist()
+                    self._remember(key, vector)
+                    self._hits += 1
+                    record_cache("embedding", hit=True)
+                    return vector
+            
+            self._misses += 1
+            record_cache("embedding", hit=False)
+            return None
+    
+    def _remember(self, key: str, vector: List[float]) -> None:
+        """Insert into the in-memory LRU; caller holds the lock."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def _put(self, key: str, vector: List[float]) -> None:
+        """Store a vector in memory and, if configured, on disk."""
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (key, np.asarray(vector, dtype=np.float32).tobytes())
+                )
+                self._db.commit()
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing a cached vector when available."""
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            with span("embed"):
+                vector = self.embeddings.embed_query(text)
+            self._put(key, vector)
+        return vector
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query asynchronously, reusing a cached vector when available."""
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            with span("embed"):
+                vector = await self.embeddings.aembed_query(text)
+            self._put(key, vector)
+        return vector
+    
+    def _lookup_many(self, texts: List[str]) -> Tuple[List[str], List[Optional[List[float]]], List[int]]:
+        """Cache keys, cached vectors (None on a miss) and the positions of unique misses."""
+        keys = [self._key(text) for text in texts]
+        vectors = [self._get(key) for key in keys]
+        first_miss: Dict[str, int] = {}
+        for i, (key, vector) in enumerate(zip(keys, vectors)):
+            if vector is None:
+                first_miss.setdefault(key, i)
+        return keys, vectors, list(first_miss.values())
+    
+    def _fill_many(
+        self,
+        keys: List[str],
+        vectors: List[Optional[List[float]]],
+        misses: List[int],
+        embedded: List[List[float]]
+    ) -> List[List[float]]:
+        """Cache freshly embedded vectors and place them at every position sharing their key."""
+        fresh = {}
+        for i, vector in zip(misses, embedded):
+            self._put(keys[i], vector)
+            fresh[keys[i]] = vector
+        return [vector if vector is not None else fresh[key] for key, vector in zip(keys, vectors)]
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, sending all cache misses in one request.
+
+        Misses go through embed_documents, which batches them for every
+        provider used here and yields the same vectors as embed_query.
+        """
+        keys, vectors, misses = self._lookup_many(texts)
+        embedded: List[List[float]] = []
+        if misses:
+            with span("embed"):
+                embedded = self.embeddings.embed_documents([texts[i] for i in misses])
+        return self._fill_many(keys, vectors, misses, embedded)
+    
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries asynchronously, sending all cache misses in one request."""
+        keys, vectors, misses = self._lookup_many(texts)
+        embedded: List[List[float]] = []
+        if misses:
+            with span("embed"):
+                embedded = await self.embeddings.aembed_documents([texts[i] for i in misses])
+        return self._fill_many(keys, vectors, misses, embedded)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents without caching."""
+        return self.embeddings.embed_documents(texts)
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents asynchronously without caching."""
+        return await self.embeddings.aembed_documents(texts)
+    
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for the query cache."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "entries": len(self._memory),
+            }
+
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    """Identifier of the model behind an embeddings client."""
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.model_name
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+# Collection metadata key recording which embedding model built the collection
+EMBEDDING_MODEL_KEY = "embedding_model"
+
+
+class EmbeddingModelMismatch(ValueError):
+    """A collection was built with a different embedding model than the configured one."""
+
+
+def check_embedding_model(collection_name: str, metadata: Optional[dict], model_name: str) -> None:
+    """Reject a collection whose vectors come from another embedding model.
+    
+    Collections ingested before the model was recorded are accepted.
+    """
+    built_with = (metadata or {}).get(EMBEDDING_MODEL_KEY)
+    if built_with and built_with != model_name:
+        raise EmbeddingModelMismatch(
+            f"Collection {collection_name} was built with embedding model {built_with!r} "
+            f"but {model_name!r} is configured; re-run ingestion with --full"
         )
-        return vector_store
-    except Exception as e:
-        print(f"Error loading vector store: {e}")
-        return None
+
+
+class VectorStoreRegistry:
+    """Process-lifetime registry of ChromaDB collections.
+
+    Holds a single embedding client and a single persistent Chroma client, and
+    opens each collection at most once. All agents share the same handles.
+    """
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._embeddings: Optional[CachedEmbeddings] = None
+        self._client = None
+        self._stores: Dict[str, Chroma] = {}
+        self._indexes: Dict[str, NumpyIndex] = {}
+        self._lexical: Dict[str, BM25Index] = {}
+    
+    def get_embeddings(self) -> CachedEmbeddings:
+        """Get the shared, query-caching embedding client, creating it on first use."""
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = CachedEmbeddings(get_embedding_model())
+            return self._embeddings
+    
+    def set_embeddings(self, embeddings: CachedEmbeddings) -> None:
+        """Replace the shared embedding client and reopen collections with it."""
+        with self._lock:
+            self._embeddings = embeddings
+            self._stores = {}
+            self._indexes = {}
+    
+    def _get_client(self):
+        """Get the shared persistent Chroma client, creating it on first use."""
+        if self._client is None:
+            self._client = chromadb.PersistentClient(path=settings.chroma_db_path)
+        return self._client
+    
+    def get(self, collection_name: str) -> Optional[Chroma]:
+        """Get the vector store for a collection, opening it on first use."""
+        store = self._stores.get(collection_name)
+        if store is not None:
+            return store
+        
+        with self._lock:
+            store = self._stores.get(collection_name)
+            if store is not None:
+                return store
+            
+            # Don't cache a miss, so the store becomes available once ingestion runs
+            if not os.path.exists(settings.chroma_db_path):
+                return None
+            
+            try:
+                embeddings = self.get_embeddings()
+                store = Chroma(
+                    client=self._get_client(),
+                    embedding_function=embeddings,
+                    collection_name=collection_name,
+                )
+                check_embedding_model(collection_name, store._collection.metadata, embeddings.model_name)
+            except Exception as e:
+                logger.error("Error loading vector store: %s", e)
+                return None
+            
+            self._stores[collection_name] = store
+            return store
+    
+    def get_index(self, collection_name: str) -> Optional[NumpyIndex]:
+        """Get the exported NumPy index of a collection, loading it on first use."""
+        index = self._indexes.get(collection_name)
+        if index is not None:
+            return index
+        
+        with self._lock:
+            index = self._indexes.get(collection_name)
+            if index is not None:
+                return index
+            
+            # Don't cache a miss, so the index becomes available once ingestion runs
+            try:
+                index = NumpyIndex.load(collection_name)
+                if index is None:
+                    return None
+                check_embedding_model(
+                    collection_name,
+                    {EMBEDDING_MODEL_KEY: index.model_name},
+                    self.get_embeddings().model_name
+                )
+            except Exception as e:
+                logger.error("Error loading vector index: %s", e)
+                return None
+            
+            self._indexes[collection_name] = index
+            return index
+    
+    def get_lexical_index(self, collection_name: str) -> Optional[BM25Index]:
+        """Get the BM25 index of a collection, loading it on first use."""
+        index = self._lexical.get(collection_name)
+        if index is not None:
+            return index
+        
+        with self._lock:
+            index = self._lexical.get(collection_name)
+            if index is not None:
+                return index
+            
+            # Don't cache a miss, so the index becomes available once ingestion runs
+            try:
+                index = BM25Index.load(collection_name)
+            except Exception as e:
+                logger.error("Error loading lexical index: %s", e)
+                return None
+            if index is None:
+                return None
+            
+            self._lexical[collection_name] = index
+            return index
+    
+    def reload(self) -> None:
+        """Drop all open handles so the next access reopens them from disk."""
+        with self._lock:
+            self._stores = {}
+            self._indexes = {}
+            self._lexical = {}
+            self._client = None
+            # Chroma keeps one system (with its in-memory HNSW segments) per path
+            # and would hand it back to the next client, missing writes made by
+            # another process such as run_ingest.py
+            SharedSystemClient.clear_system_cache()
+
+
+_registry = VectorStoreRegistry()
+
+# Marker written by ingestion so caches can tell when the knowledge base changed
+KB_VERSION_FILE = "kb_version"
+
+
+def get_registry() -> VectorStoreRegistry:
+    """Get the process-wide vector store registry."""
+    return _registry
+
+
+def reload_vector_stores() -> None:
+    """Reopen all collections, e.g. after ingestion has finished."""
+    _registry.reload()
+
+
+def get_kb_version() -> str:
+    """Get the knowledge-base version written by the last ingestion run."""
+    try:
+        with open(os.path.join(settings.chroma_db_path, KB_VERSION_FILE), encoding="utf-8") as f:
+            return f.read().strip() or "unversioned"
+    except OSError:
+        return "unversioned"
+
+
+def write_kb_version(version: str) -> None:
+    """Record a new knowledge-base version after ingestion."""
+    os.makedirs(settings.chroma_db_path, exist_ok=True)
+    path = os.path.join(settings.chroma_db_path, KB_VERSION_FILE)
+    
+    # Replace the file in one step so a concurrent reader never sees it half-written
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(f"{path}.tmp", path)
+
+
+def get_embedding_cache_stats() -> Dict[str, float]:
+    """Hit/miss statistics of the shared query embedding cache."""
+    return _registry.get_embeddings().stats()
+
+
+def get_vector_store(collection_name: str) -> Optional[Chroma]:
+    """Get a ChromaDB vector store instance."""
+    return _registry.get(collection_name)
 
 
 def get_retriever(collection_name: str, k: int = 5) -> Optional[object]:
@@ -34,16 +389,153 @@ def get_retriever(collection_name: str, k: int = 5) -> Optional[object]:
     return None
 
 
+def _get_index(collection_name: str) -> Optional[NumpyIndex]:
+    """The NumPy index to search, if that backend is selected and the index exists."""
+    if settings.retrieval_backend != "numpy":
+        return None
+    return _registry.get_index(collection_name)
+
+
 def search_documents(query: str, collection_name: str, k: int = 5) -> List[Document]:
     """Search for documents in a collection."""
+    index = _get_index(collection_name)
+    if index is not None:
+        try:
+            with span("vector_search"):
+                vector = _registry.get_embeddings().embed_query(query)
+                return index.search_documents(vector, k)[0]
+        except Exception as e:
+            logger.error("Error searching documents: %s", e)
+            record_error("vector_search")
+            return []
+    
+    vector_store = get_vector_store(collection_name)
+    if not vector_store:
+        return []
+    
+    try:
+        with span("vector_search"):
+            results = vector_store.similarity_search(query, k=k)
+        return results
+    except Exception as e:
+        logger.error("Error searching documents: %s", e)
+        record_error("vector_search")
+        return []
+
+
+async def asearch_documents(query: str, collection_name: str, k: int = 5) -> List[Document]:
+    """Search for documents in a collection without blocking the event loop."""
+    index = _get_index(collection_name)
+    if index is not None:
+        try:
+            with span("vector_search"):
+                vector = await _registry.get_embeddings().aembed_query(query)
+                return index.search_documents(vector, k)[0]
+        except Exception as e:
+            logger.error("Error searching documents: %s", e)
+            record_error("vector_search")
+            return []
+    
     vector_store = get_vector_store(collection_name)
     if not vector_store:
         return []
     
     try:
-        results = vector_store.similarity_search(query, k=k)
+        with span("vector_search"):
+            results = await vector_store.asimilarity_search(query, k=k)
         return results
     except Exception as e:
-        print(f"Error searching documents: {e}")
+        logger.error("Error searching documents: %s", e)
+        record_error("vector_search")
+        return []
+
+
+def _batch_sizes(queries: Sequence[str], k: Union[int, Sequence[int]]) -> List[int]:
+    """Number of results wanted for each query."""
+    if isinstance(k, int):
+        return [k] * len(queries)
+    if len(k) != len(queries):
+        raise ValueError(f"Got {len(k)} result counts for {len(queries)} queries")
+    return list(k)
+
+
+def _chroma_batch(vector_store: Chroma, vectors: List[List[float]], k: int) -> List[List[Document]]:
+    """Top-k documents for several query vectors in a single Chroma query."""
+    results = vector_store._collection.query(
+        query_embeddings=vectors,
+        n_results=k,
+        include=["documents", "metadatas"],
+    )
+    return [
+        [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)]
+        for texts, metadatas in zip(results["documents"], results["metadatas"])
+    ]
+
+
+def _search_vectors(
+    index: Optional[NumpyIndex],
+    vector_store: Optional[Chroma],
+    vectors: List[List[float]],
+    k: int
+) -> List[List[Document]]:
+    """Top-k documents per query vector from whichever backend is open."""
+    if index is not None:
+        return index.search_documents(np.asarray(vectors, dtype=np.float32), k)
+    return _chroma_batch(vector_store, vectors, k)
+
+
+def search_documents_batch(
+    queries: Sequence[str],
+    collection_name: str,
+    k: Union[int, Sequence[int]] = 5
+) -> List[List[Document]]:
+    """Search a collection for several queries at once.
+    
+    All queries are embedded in one request and scored in a single pass, and
+    each gets the documents search_documents() would return. k may be one
+    count for every query or a count per query.
+    """
+    sizes = _batch_sizes(queries, k)
+    index = _get_index(collection_name)
+    vector_store = None if index is not None else get_vector_store(collection_name)
+    if index is None and not vector_store:
+        return [[] for _ in queries]
+    if not queries:
         return []
+    
+    try:
+        with span("vector_search"):
+            vectors = _registry.get_embeddings().embed_queries(list(queries))
+            results = _search_vectors(index, vector_store, vectors, max(sizes))
+    except Exception as e:
+        logger.error("Error searching documents: %s", e)
+        record_error("vector_search")
+        return [[] for _ in queries]
+    
+    return [docs[:size] for docs, size in zip(results, sizes)]
 
+
+async def asearch_documents_batch(
+    queries: Sequence[str],
+    collection_name: str,
+    k: Union[int, Sequence[int]] = 5
+) -> List[List[Document]]:
+    """Search a collection for several queries at once without blocking the event loop."""
+    sizes = _batch_sizes(queries, k)
+    index = _get_index(collection_name)
+    vector_store = None if index is not None else get_vector_store(collection_name)
+    if index is None and not vector_store:
+        return [[] for _ in queries]
+    if not queries:
+        return []
+    
+    try:
+        with span("vector_search"):
+            vectors = await _registry.get_embeddings().aembed_queries(list(queries))
+            results = await asyncio.to_thread(_search_vectors, index, vector_store, vectors, max(sizes))
+    except Exception as e:
+        logger.error("Error searching documents: %s", e)
+        record_error("vector_search")
+        return [[] for _ in queries]
+    
+    return [docs[:size] for docs, size in zip(results, sizes)]
@@ -38,16 +38,10 @@ export default function Home() {
     setIsLoading(true);
 
     try {
-      // Prepare chat history
-      const chatHistory = messages.map((msg) => ({
-        role: msg.role,
-        content: msg.content,
-      }));
-
+      // The server keeps the conversation history for this session
       const response = await axios.post('http://localhost:8000/chat', {
         message: userMessage.content,
         session_id: sessionId,
-        chat_history: chatHistory,
       });
 
       if (!sessionId) {
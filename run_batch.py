@@ -0,0 +1,23 @@
+"""Helper script to answer a JSONL file of questions in bulk."""
+import os
+import sys
+
+# Input and output paths are relative to where the script was started
+start_dir = os.getcwd()
+
+# Change to backend directory
+backend_dir = os.path.join(os.path.dirname(__file__), 'backend')
+os.chdir(backend_dir)
+
+# Add backend to path
+sys.path.insert(0, backend_dir)
+
+# Run the batch
+if __name__ == "__main__":
+    from batch_runner import main, parse_args
+    args = parse_args()
+    main(
+        os.path.join(start_dir, args.input),
+        os.path.join(start_dir, args.output) if args.output else None,
+        concurrency=args.concurrency,
+    )
@@ -11,6 +11,7 @@ sys.path.insert(0, backend_dir)
 
 # Run ingestion
 if __name__ == "__main__":
-    from ingest_data import main
-    main()
+    from ingest_data import main, parse_args
+    args = parse_args()
+    main(full=args.full)
 